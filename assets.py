@@ -0,0 +1,141 @@
+# assets.py
+"""Asset pipeline for docs/: minified templates and CSS, content-hashed assets, precompressed siblings."""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+
+from jinja2 import FileSystemLoader
+
+try:
+    import brotli
+except ImportError:  # Optional; only .gz siblings are written without it
+    brotli = None
+
+from config import ASSETS_DIR, COMPRESS_MANIFEST_FILE, COMPRESS_EXTENSIONS, COMPRESS_MIN_BYTES
+
+_brotli_warned = False
+
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE_RE = re.compile(r'\s*([{}:;,>])\s*')
+_HTML_COMMENT_RE = re.compile(r'<!--(?!\[if).*?-->', re.S)
+_HTML_INDENT_RE = re.compile(r'\n[ \t]+')
+_HTML_BETWEEN_TAGS_RE = re.compile(r'>\s*\n\s*<')
+_BLANK_LINES_RE = re.compile(r'\n{2,}')
+
+
+def minify_css(css):
+    css = _CSS_COMMENT_RE.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = _CSS_SPACE_RE.sub(r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_html(source):
+    """Drop comments, indentation and line breaks between tags; text and inline spacing are kept.
+
+    Works on template source, so rendered pages come out minified while still streaming.
+    Script bodies only lose their indentation, which keeps line-based JS intact.
+    """
+    source = _HTML_COMMENT_RE.sub('', source)
+    source = _HTML_INDENT_RE.sub('\n', source)
+    source = _HTML_BETWEEN_TAGS_RE.sub('><', source)
+    return _BLANK_LINES_RE.sub('\n', source).strip() + '\n'
+
+
+class MinifyingLoader(FileSystemLoader):
+    """FileSystemLoader that hands Jinja minified HTML template source."""
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = super().get_source(environment, template)
+        if template.endswith('.html'):
+            source = minify_html(source)
+        return source, filename, uptodate
+
+
+def build_css_asset(source_path, docs_dir):
+    """Minify a stylesheet into docs/assets/<name>.<hash>.css and return its path relative to docs.
+
+    Older builds of the same stylesheet are removed once the new one is in place.
+    """
+    with open(source_path, 'r', encoding='utf-8') as f:
+        css = minify_css(f.read()).encode('utf-8')
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    name = f"{stem}.{hashlib.sha256(css).hexdigest()[:10]}.css"
+    assets_dir = os.path.join(docs_dir, ASSETS_DIR)
+    os.makedirs(assets_dir, exist_ok=True)
+    path = os.path.join(assets_dir, name)
+    if not os.path.exists(path):
+        with open(path + '.tmp', 'wb') as f:
+            f.write(css)
+        os.replace(path + '.tmp', path)
+        logging.info(f"Built asset {ASSETS_DIR}/{name} ({len(css)} bytes)")
+    for other in os.listdir(assets_dir):
+        if other.startswith(stem + '.') and not other.startswith(name):
+            os.remove(os.path.join(assets_dir, other))
+    return f"{ASSETS_DIR}/{name}"
+
+
+def precompress(docs_dir):
+    """Write .gz (and .br with brotli installed) next to every compressible file whose content changed.
+
+    A file is re-hashed only when its size or mtime moved, and recompressed only when its
+    hash differs from the one recorded in COMPRESS_MANIFEST_FILE. Siblings of deleted files go too.
+    """
+    global _brotli_warned
+    if brotli is None and not _brotli_warned:
+        logging.warning("brotli is not installed; writing .gz siblings only (pip install brotli for .br)")
+        _brotli_warned = True
+    manifest_path = os.path.join(docs_dir, COMPRESS_MANIFEST_FILE)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    suffixes = ['.gz'] + (['.br'] if brotli else [])
+
+    new_manifest = {}
+    compressed = 0
+    for dirpath, _, filenames in os.walk(docs_dir):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            rel = os.path.relpath(path, docs_dir).replace(os.sep, '/')
+            if rel == COMPRESS_MANIFEST_FILE or not filename.endswith(COMPRESS_EXTENSIONS):
+                continue
+            stat = os.stat(path)
+            if stat.st_size < COMPRESS_MIN_BYTES:
+                continue
+            entry = manifest.get(rel, {})
+            siblings_present = all(os.path.exists(path + suffix) for suffix in suffixes)
+            if entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime_ns and siblings_present:
+                new_manifest[rel] = entry
+                continue
+            with open(path, 'rb') as f:
+                content = f.read()
+            digest = hashlib.sha256(content).hexdigest()
+            if entry.get('sha256') != digest or not siblings_present:
+                _write(path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+                if brotli:
+                    _write(path + '.br', brotli.compress(content))
+                compressed += 1
+            new_manifest[rel] = {'sha256': digest, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+    for rel in set(manifest) - set(new_manifest):
+        for suffix in ('.gz', '.br'):
+            sibling = os.path.join(docs_dir, rel + suffix)
+            if os.path.exists(sibling):
+                os.remove(sibling)
+
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(new_manifest, f, separators=(',', ':'), sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    logging.info(f"Precompressed {compressed} of {len(new_manifest)} files ({', '.join(suffixes)})")
+    return compressed
+
+
+def _write(path, payload):
+    with open(path + '.tmp', 'wb') as f:
+        f.write(payload)
+    os.replace(path + '.tmp', path)
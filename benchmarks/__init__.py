@@ -0,0 +1 @@
+# Benchmarks are run from the repository root, e.g. `python -m benchmarks.message_layout`.
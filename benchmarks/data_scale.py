@@ -0,0 +1,220 @@
+# benchmarks/data_scale.py
+"""Time and memory of the data and render paths on synthetic headlines.json files of growing size.
+
+Run from the repository root:
+    python -m benchmarks.data_scale [--scales 1000 10000 100000] [--paths load save render]
+    python -m benchmarks.data_scale --baseline benchmarks/results/<earlier run>.json
+    python -m benchmarks.data_scale --generate 1000000 /tmp/headlines.json
+
+Each scale gets a synthetic history (config.WEBSITES sources, CJK titles, per-site URL
+shapes, PER_DAY items a day) in a scratch directory, since data_manager and PageGenerator
+work on ./headlines.json and ./docs. Every path is timed (best of --repeat runs) and run once
+more under tracemalloc for peak memory, so tracing does not skew the timings; memory covers this
+process only, not render pool workers. Logging is muted while a path runs.
+
+Results are written to benchmarks/results/data_scale-<timestamp>.json; pass --baseline
+with an earlier file to print the change of every figure next to it.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from config import WEBSITES
+from data_manager import deduplicate_items, ensure_groups, load_previous_data, normalize_url, save_data, seen_urls
+from page_generator import PageGenerator
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+PER_DAY = 150
+PATHS = ['load', 'save', 'normalize', 'dedup', 'render', 'render_warm']
+
+_PLACES = ["北京", "上海", "天津", "重庆", "浙江", "福建", "贵州", "青海", "云南", "海南", "内蒙古", "黑龙江",
+           "广东", "新疆", "西藏", "四川", "湖北", "山东", "江苏", "河南"]
+_SUBJECTS = ["国务院", "外交部", "国家统计局", "国台办", "中央网信办", "国家发展改革委", "财政部", "商务部",
+             "省委常委会", "市人民政府", "解放军", "海关总署"]
+_PHRASES = ["发布一批干部任前公示通告", "任免国家工作人员", "召开新闻发布会", "调研经济运行情况",
+            "部署安全生产工作", "会见外国代表团", "发布最新统计数据", "答记者问", "印发关于进一步优化营商环境的通知",
+            "举行例行记者会", "公布前三季度国民经济运行情况", "就台湾地区领导人讲话发表谈话",
+            "推进高质量发展取得新成效", "开展专项整治行动", "召开全体会议研究部署下一阶段重点工作"]
+
+
+def _url(rng, site_url, day, n):
+    """An article URL shaped like the ones the scraper collects from that site."""
+    host = site_url.split('/')[2]
+    if 'people.com.cn' in host:
+        return f"http://{host}/n1/{day:%Y/%m%d}/c{rng.randint(1000, 999999)}-{40000000 + n}.html"
+    if 'thepaper.cn' in host:
+        return f"https://www.thepaper.cn/newsDetail_forward_{28000000 + n}"
+    if 'globaltimes.cn' in host:
+        return f"https://www.globaltimes.cn/page/{day:%Y%m}/{1300000 + n}.shtml"
+    if 'guancha.cn' in host:
+        return f"https://www.guancha.cn/internation/{day:%Y_%m_%d}_{700000 + n}.shtml"
+    if host.endswith('gov.cn'):
+        path = '/'.join(site_url.split('/')[3:-1]) or 'xwdt'
+        return f"https://{host}/{path}/{day:%Y%m}/t{day:%Y%m%d}_{5000000 + n}.html"
+    return f"{site_url.rstrip('/')}/{day:%Y%m%d}/{n}.html"
+
+
+def _title(rng):
+    title = rng.choice(_PLACES + _SUBJECTS) + rng.choice(_PHRASES)
+    if rng.random() < 0.3:
+        title += f"（第{rng.randint(1, 60)}期）"
+    return title
+
+
+def synthetic_data(n_items, per_day=PER_DAY, seed=0, end=None):
+    """headlines.json content with n_items items, per_day a day, ending on `end` (default today).
+
+    Busy sites get most items, as in production. English titles are placeholders of a
+    realistic length; the benchmarked paths never look at their wording.
+    """
+    rng = random.Random(seed)
+    sites = list(WEBSITES.items())
+    weights = [1.0 / (i + 1) for i in range(len(sites))]
+    end = end or date.today()
+    n_days = max(1, -(-n_items // per_day))
+    headlines = {}
+    processed_urls = []
+    n = 0
+    for offset in range(n_days - 1, -1, -1):
+        day = end - timedelta(days=offset)
+        items = []
+        for _ in range(min(per_day, n_items - n)):
+            source, site_url = rng.choices(sites, weights)[0]
+            url = _url(rng, site_url, day, n)
+            items.append({
+                "chinese_title": _title(rng),
+                "english_title": "Headline %d on %s" % (n, " ".join(rng.choice(
+                    ["policy", "economy", "cadres", "Taiwan", "statistics", "diplomacy"]) for _ in range(rng.randint(4, 12)))),
+                "url": url,
+                "source": source,
+                "date": f"{day:%Y-%m-%d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00",
+            })
+            processed_urls.append(url)
+            n += 1
+        headlines[day.isoformat()] = items
+    return {"headlines": headlines, "processed_urls": processed_urls, "last_run": f"{end:%Y-%m-%d} 00:00:00"}
+
+
+def _run_path(path, data):
+    """Run one path in the current (scratch) directory; returns the items it handled."""
+    if path == 'load':
+        return len(load_previous_data()['processed_urls'])
+    if path == 'save':
+        save_data(dict(data, processed_urls=set(data['processed_urls'])))
+        return len(data['processed_urls'])
+    if path == 'normalize':
+        return len({normalize_url(url) for url in data['processed_urls']})
+    items = [item for day in data['headlines'].values() for item in day]
+    if path == 'dedup':
+        seen_urls.clear()
+        unique = deduplicate_items(items + items[::10])  # One in ten items seen twice, as on re-scraped pages
+        seen_urls.clear()
+        return len(unique)
+    if path == 'render':
+        shutil.rmtree('docs', ignore_errors=True)
+    PageGenerator('docs').generate_pages(dict(data, headlines={d: list(i) for d, i in data['headlines'].items()}))
+    return len(items)
+
+
+def _measure(path, data, repeat):
+    """(best seconds of `repeat` runs, peak traced bytes) of one path; 'render' always starts from an empty docs/."""
+    logging.disable(logging.CRITICAL)
+    try:
+        seconds = math.inf
+        for _ in range(repeat):
+            started = time.perf_counter()
+            _run_path(path, data)
+            seconds = min(seconds, time.perf_counter() - started)
+        tracemalloc.start()
+        try:
+            _run_path(path, data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    finally:
+        logging.disable(logging.NOTSET)
+    return seconds, peak
+
+
+def run_scale(n_items, paths, per_day, repeat=1):
+    data = synthetic_data(n_items, per_day)
+    ensure_groups(data)  # As after load_previous_data; save and render then use them as a run does
+    workdir = tempfile.mkdtemp(prefix='data_scale-')
+    cwd = os.getcwd()
+    try:
+        os.chdir(workdir)
+        os.symlink(os.path.join(REPO_ROOT, 'templates'), 'templates')
+        logging.disable(logging.CRITICAL)
+        save_data(dict(data, processed_urls=set(data['processed_urls'])))  # headlines.json and its groups file
+        logging.disable(logging.NOTSET)
+        results = {"file_bytes": os.path.getsize('headlines.json')}
+        if 'render_warm' in paths and 'render' not in paths:
+            _run_path('render', data)  # A warm run needs a rendered site to compare against
+        for path in paths:
+            seconds, peak = _measure(path, data, repeat)
+            results[path] = {"seconds": round(seconds, 4), "peak_bytes": peak}
+        return results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _change(current, previous):
+    if not previous:
+        return ""
+    return f" ({(current - previous) / previous:+.0%})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--paths", nargs="+", choices=PATHS, default=PATHS)
+    parser.add_argument("--per-day", type=int, default=PER_DAY)
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per path; the best is kept")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/data_scale-<timestamp>.json)")
+    parser.add_argument("--generate", nargs=2, metavar=("ITEMS", "FILE"), help="only write a synthetic headlines.json")
+    args = parser.parse_args()
+
+    if args.generate:
+        with open(args.generate[1], 'w', encoding='utf-8') as f:
+            json.dump(synthetic_data(int(args.generate[0]), args.per_day), f, ensure_ascii=False, indent=2)
+        return
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)["scales"]
+
+    print(f"{'items':>8} {'path':<12} {'seconds':>16} {'peak MiB':>16}")
+    scales = {}
+    for n_items in args.scales:
+        results = scales[str(n_items)] = run_scale(n_items, args.paths, args.per_day, args.repeat)
+        previous = baseline.get(str(n_items), {})
+        for path in args.paths:
+            seconds, peak = results[path]["seconds"], results[path]["peak_bytes"] / 2 ** 20
+            old = previous.get(path, {})
+            old_seconds = old.get("seconds")
+            old_peak = old["peak_bytes"] / 2 ** 20 if "peak_bytes" in old else None
+            print(f"{n_items:>8} {path:<12} {f'{seconds:.3f}{_change(seconds, old_seconds)}':>16} "
+                  f"{f'{peak:.1f}{_change(peak, old_peak)}':>16}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"data_scale-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({"created": time.strftime('%Y-%m-%d %H:%M:%S'), "per_day": args.per_day, "repeat": args.repeat,
+                   "scales": scales}, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/message_layout.py
+"""Compare the bin-packing message layout with the old greedy fill.
+
+Run from the repository root:
+    python -m benchmarks.message_layout [--items 1000 5000] [--sites 40] [--repeat 5]
+"""
+import argparse
+import html
+import math
+import random
+import time
+
+from config import MAX_MESSAGE_LENGTH
+from message_layout import pack_messages, telegram_length
+
+_PROVINCES = ["北京", "浙江", "福建", "贵州", "青海", "云南", "海南", "内蒙古", "黑龙江", "广东"]
+_PHRASES = ["发布一批干部任前公示通告", "国务院任免国家工作人员", "召开新闻发布会", "调研经济运行情况",
+            "部署安全生产工作", "会见外国代表团", "发布最新统计数据"]
+
+
+def synthetic_items_by_site(n_items, n_sites, seed=0):
+    """Site-skewed synthetic run: a few busy sites and a long tail, realistic title lengths."""
+    rng = random.Random(seed)
+    sites = [f"Site {i:02d}" for i in range(n_sites)]
+    weights = [1.0 / (i + 1) for i in range(n_sites)]
+    items_by_site = {}
+    for n in range(n_items):
+        site = rng.choices(sites, weights)[0]
+        chinese = rng.choice(_PROVINCES) + rng.choice(_PHRASES) + "（" + str(rng.randint(1, 999)) + "）"
+        english = rng.choice([chinese, f"Headline {n} about " + " ".join(rng.choice(["policy", "economy", "cadres", "Taiwan", "statistics"]) for _ in range(rng.randint(4, 12)))])
+        items_by_site.setdefault(site, []).append({
+            "chinese_title": html.escape(chinese),
+            "english_title": html.escape(english),
+            "url": f"https://example.gov.cn/{site.replace(' ', '').lower()}/2025/{n:06d}.html",
+            "source": site,
+        })
+    return items_by_site
+
+
+def legacy_pack(items_by_site):
+    """The greedy fill prepare_telegram_messages used before pack_messages (raw string lengths)."""
+    messages, current = [], ""
+    for site_name, items in items_by_site.items():
+        header = f"<b>📰 Updates from {html.escape(site_name)}</b>\n\n"
+        header_cont = f"<b>📰 Updates from {html.escape(site_name)} (cont.)</b>\n\n"
+        if current and len(current) + 2 + len(header) > MAX_MESSAGE_LENGTH:
+            messages.append(current)
+            current = header
+        else:
+            current = header if not current else current + "\n\n" + header
+        for item in items:
+            text = (f"• <b>{html.escape(item['english_title'])}</b>\n"
+                    f"  ({html.escape(item['chinese_title'])})\n"
+                    f"  <a href='{html.escape(item['url'])}'>Read more</a>\n\n")
+            if len(current) + len(text) > MAX_MESSAGE_LENGTH:
+                messages.append(current)
+                current = header_cont + text
+            else:
+                current += text
+    if current.strip():
+        messages.append(current)
+    return messages
+
+
+def _time(fn, arg, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 1000, 2500, 5000])
+    parser.add_argument("--sites", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'items':>6} {'lower':>6} {'legacy':>7} {'packed':>7} {'legacy ms':>10} {'packed ms':>10} {'max len':>8}")
+    for n_items in args.items:
+        items_by_site = synthetic_items_by_site(n_items, args.sites)
+        legacy, legacy_time = _time(legacy_pack, items_by_site, args.repeat)
+        packed, packed_time = _time(pack_messages, items_by_site, args.repeat)
+        total = sum(telegram_length(m) for m in packed)
+        lower_bound = math.ceil(total / MAX_MESSAGE_LENGTH)
+        longest = max(telegram_length(m) for m in packed)
+        print(f"{n_items:>6} {lower_bound:>6} {len(legacy):>7} {len(packed):>7} "
+              f"{legacy_time * 1000:>10.1f} {packed_time * 1000:>10.1f} {longest:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/notifier_throughput.py
+"""End-to-end Telegram delivery time and API-call count against the local Bot API stand-in.
+
+Run from the repository root:
+    python -m benchmarks.notifier_throughput [--items 10 100 1000 5000] [--retry-after-rate 0.05]
+
+Each run packs synthetic items with prepare_telegram_messages, stages them in an in-memory
+Outbox and delivers them with deliver_outbox to telegram_stub_server.StubTelegramServer, so the real client,
+rate limiter and retry handling are exercised. By default the limiter uses Telegram's
+per-chat limits from config (about one message per second after the burst); pass
+--unthrottled to measure the sending code alone.
+"""
+import argparse
+import asyncio
+import time
+
+from telegram import Bot
+
+from benchmarks.message_layout import synthetic_items_by_site
+from config import (TELEGRAM_CHAT_RATE, TELEGRAM_CHAT_BURST, TELEGRAM_GLOBAL_RATE, TELEGRAM_GLOBAL_BURST)
+from notifier import deliver_outbox, prepare_telegram_messages
+from outbox import Outbox
+from rate_limiter import TelegramRateLimiter
+from telegram_stub_server import StubTelegramServer
+
+CHAT_ID = "1000"
+
+
+async def _run(server, n_items, n_sites, unthrottled):
+    items_by_site = synthetic_items_by_site(n_items, n_sites)
+    if unthrottled:
+        limiter = TelegramRateLimiter(global_rate=1e6, global_burst=1e6, chat_rate=1e6, chat_burst=1e6)
+    else:
+        limiter = TelegramRateLimiter(TELEGRAM_GLOBAL_RATE, TELEGRAM_GLOBAL_BURST,
+                                      TELEGRAM_CHAT_RATE, TELEGRAM_CHAT_BURST)
+    server.reset()
+    started = time.perf_counter()
+    messages = await prepare_telegram_messages(items_by_site)
+    outbox = Outbox(":memory:")
+    outbox.stage("benchmark", {CHAT_ID: messages})
+    outbox.commit_run("benchmark")
+    async with Bot(token="123:stub", base_url=server.base_url) as bot:
+        sent = await deliver_outbox(bot, outbox, limiter)
+    outbox.close()
+    elapsed = time.perf_counter() - started
+    return len(messages), sent, elapsed, dict(server.calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--sites", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.03, help="stub latency per call, seconds")
+    parser.add_argument("--retry-after-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--bad-request-rate", type=float, default=0.0)
+    parser.add_argument("--unthrottled", action="store_true", help="disable the client-side rate limiter")
+    args = parser.parse_args()
+
+    print(f"{'items':>6} {'parts':>6} {'sent':>6} {'calls':>6} {'429':>5} {'400':>5} {'seconds':>8} {'parts/s':>8}")
+    with StubTelegramServer(latency=args.latency, retry_after_rate=args.retry_after_rate,
+                            retry_after=args.retry_after, bad_request_rate=args.bad_request_rate) as server:
+        for n_items in args.items:
+            parts, sent, elapsed, calls = asyncio.run(_run(server, n_items, args.sites, args.unthrottled))
+            print(f"{n_items:>6} {parts:>6} {sent:>6} {calls.get('sendMessage', 0):>6} "
+                  f"{calls.get('sendMessage:429', 0):>5} {calls.get('sendMessage:400', 0):>5} "
+                  f"{elapsed:>8.2f} {sent / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# benchmarks/parsers.py
+"""Extraction speed and memory per selector family and parser backend, over recorded listing pages.
+
+benchmarks/fixtures/ holds one synthetic listing page per selector family, shaped like the
+site's markup (index.json marks them "recorded": "synthetic"). --record replaces them with real
+pages (the first site in config.WEBSITES using each family); runs use whichever copies are saved:
+    python -m benchmarks.parsers --record
+    python -m benchmarks.parsers [--families GT_SELECTOR SC_SELECTOR] [--parsers html.parser lxml] [--seconds 2]
+
+Each row runs scraper.extract_headlines (decode, parse, select, urljoin, dedup check)
+on one fixture, with the processed set holding every link on the page as on a normal
+run, where most links were seen before. The decode, parse and select columns time those
+steps alone; ops/s is for the whole extraction. Allocations come from the difference of two
+tracemalloc snapshots taken around the parse while the tree is still referenced: blocks is the
+number of allocations the parsed tree holds and tree KiB their size.
+Backends that are not installed (lxml, html5lib) are skipped.
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+import config
+from config import SITE_SELECTORS, WEBSITES
+from feeds import slugify
+from scraper import decode_page, extract_headlines, fetch_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+PARSERS = {'html.parser': None, 'lxml': 'lxml', 'html5lib': 'html5lib'}  # Backend -> module it needs
+
+
+def selector_families():
+    """{family: (selector, [site names])} for every *_SELECTOR constant in config that a site uses."""
+    families = {}
+    for name in dir(config):
+        selector = getattr(config, name)
+        if not name.endswith('_SELECTOR') or not isinstance(selector, str):
+            continue
+        sites = [site for site, site_selector in SITE_SELECTORS.items() if site_selector == selector]
+        if sites:
+            families[name] = (selector, sites)
+    return families
+
+
+def record(families, fixtures_dir=FIXTURES_DIR):
+    """Fetch one enabled site per family and save its raw bytes plus index.json (site, url, time)."""
+    os.makedirs(fixtures_dir, exist_ok=True)
+    index_path = os.path.join(fixtures_dir, 'index.json')
+    index = _load_index(fixtures_dir)
+    for family, (_, sites) in families.items():
+        site = next((site for site in sites if site in WEBSITES), None)
+        if site is None:
+            print(f"{family}: no enabled site in config.WEBSITES, skipped")
+            continue
+        url = WEBSITES[site]
+        try:
+            content = fetch_page(url).content
+        except Exception as e:
+            print(f"{family}: failed to fetch {url}: {e}")
+            continue
+        filename = f"{family.lower()}-{slugify(site)}.html"
+        with open(os.path.join(fixtures_dir, filename), 'wb') as f:
+            f.write(content)
+        index[family] = {"site": site, "url": url, "file": filename,
+                         "recorded": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        print(f"{family}: recorded {site} ({len(content)} bytes)")
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+
+def _load_index(fixtures_dir):
+    try:
+        with open(os.path.join(fixtures_dir, 'index.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _best(fn, seconds):
+    """Best time of one call to fn, calling it repeatedly for about `seconds` (at least three times)."""
+    best, calls = float('inf'), 0
+    deadline = time.perf_counter() + seconds
+    while calls < 3 or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+        calls += 1
+    return best
+
+
+def bench(site, url, content, parser, seconds):
+    """Figures for one fixture and backend."""
+    selector = SITE_SELECTORS[site]
+    text = decode_page(content)
+    soup = BeautifulSoup(text, parser)
+    seen = {item['url'] for item in extract_headlines(site, url, content, set(), parser=parser)}
+
+    decode = _best(lambda: decode_page(content), seconds / 4)
+    parse = _best(lambda: BeautifulSoup(text, parser), seconds / 4)
+    select = _best(lambda: soup.select(selector), seconds / 4)
+    full = _best(lambda: extract_headlines(site, url, content, set(seen), parser=parser), seconds / 4)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tree = BeautifulSoup(text, parser)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    allocated = after.compare_to(before, 'filename')
+    del tree
+    return {"bytes": len(content), "links": len(soup.select(selector)),
+            "decode_ms": decode * 1000, "parse_ms": parse * 1000, "select_ms": select * 1000,
+            "ops_per_sec": 1 / full, "blocks": sum(stat.count_diff for stat in allocated),
+            "tree_kib": sum(stat.size_diff for stat in allocated) / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", action="store_true", help="fetch and save fresh fixtures, then exit")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--families", nargs="+", help="e.g. GT_SELECTOR (default: every recorded family)")
+    parser.add_argument("--parsers", nargs="+", choices=list(PARSERS), default=list(PARSERS))
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent per fixture and backend")
+    args = parser.parse_args()
+
+    families = selector_families()
+    if args.families:
+        families = {family: families[family] for family in args.families}
+    if args.record:
+        record(families, args.fixtures)
+        return
+
+    index = _load_index(args.fixtures)
+    if not index:
+        print(f"No fixtures in {args.fixtures}; run with --record first.")
+        return
+    parsers = [name for name in args.parsers if PARSERS[name] is None or importlib.util.find_spec(PARSERS[name])]
+
+    logging.disable(logging.CRITICAL)
+    print(f"{'family':<22} {'parser':<11} {'KiB':>6} {'links':>6} {'decode ms':>10} {'parse ms':>9} "
+          f"{'select ms':>10} {'ops/s':>8} {'blocks':>8} {'tree KiB':>9}")
+    for family in families:
+        if family not in index:
+            continue
+        fixture = index[family]
+        with open(os.path.join(args.fixtures, fixture['file']), 'rb') as f:
+            content = f.read()
+        for name in parsers:
+            r = bench(fixture['site'], fixture['url'], content, name, args.seconds)
+            print(f"{family:<22} {name:<11} {r['bytes'] / 1024:>6.0f} {r['links']:>6} {r['decode_ms']:>10.2f} "
+                  f"{r['parse_ms']:>9.2f} {r['select_ms']:>10.2f} {r['ops_per_sec']:>8.1f} {r['blocks']:>8} {r['tree_kib']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# bot_commands.py
+"""Long-polling bot that answers questions about the collected headlines.
+
+    /latest <source>   newest items from a source (name or part of it)
+    /search <keyword>  items whose title contains the keyword (Chinese or English)
+    /day <YYYY-MM-DD>  everything collected on a date
+
+Run with `python bot_commands.py`. Answers come from an in-memory HeadlineIndex that is
+extended with only the new items whenever headlines.json changes on disk. Each query's
+results are kept under its id, so Next/Prev only slice them.
+"""
+import html
+import json
+import logging
+import os
+import time
+import uuid
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.constants import ParseMode
+from telegram.ext import Application, CallbackQueryHandler, CommandHandler, ContextTypes
+
+import config
+from headline_index import HeadlineIndex
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - [%(module)s] %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+HELP_TEXT = (
+    "<b>China News Bot</b>\n\n"
+    "/latest &lt;source&gt; - newest items from a source\n"
+    "/search &lt;keyword&gt; - search titles (Chinese or English)\n"
+    "/day &lt;YYYY-MM-DD&gt; - items collected on a date"
+)
+MAX_STORED_QUERIES = 500  # Paginated queries remembered for "Next"/"Prev" buttons
+
+
+class HeadlineService:
+    """Keeps the index in step with headlines.json and remembers query results for pagination."""
+
+    def __init__(self, data_file=config.DATA_FILE):
+        self.data_file = data_file
+        self.index = HeadlineIndex()
+        self.mtime = None
+        self.queries = {}  # short id -> (command, argument, results)
+
+    def refresh(self):
+        """Index items added to headlines.json since the last refresh."""
+        try:
+            mtime = os.path.getmtime(self.data_file)
+        except OSError:
+            return
+        if mtime == self.mtime:
+            return
+        started = time.perf_counter()
+        with open(self.data_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        added = self.index.add_data(data)
+        self.mtime = mtime
+        logging.info(f"Indexed {added} new headlines ({len(self.index.docs)} total) "
+                     f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def run(self, command, argument):
+        started = time.perf_counter()
+        if command == "latest":
+            results = self.index.latest(argument)
+        elif command == "search":
+            results = self.index.search(argument)
+        else:
+            results = self.index.day(argument)
+        logging.info(f"/{command} {argument!r}: {len(results)} results in {(time.perf_counter() - started) * 1e6:.0f} µs")
+        return results
+
+    def remember(self, command, argument, results):
+        if len(self.queries) >= MAX_STORED_QUERIES:
+            self.queries.pop(next(iter(self.queries)))
+        query_id = uuid.uuid4().hex[:12]
+        self.queries[query_id] = (command, argument, results)
+        return query_id
+
+
+def format_page(command, argument, results, page):
+    """Render one page of results and its navigation buttons."""
+    page_size = config.BOT_PAGE_SIZE
+    pages = max(1, -(-len(results) // page_size))
+    page = min(max(page, 0), pages - 1)
+    title = f"<b>/{command} {html.escape(argument)}</b> - {len(results)} results"
+    if not results:
+        return title, pages
+
+    lines = [title + (f" (page {page + 1}/{pages})" if pages > 1 else ""), ""]
+    for date, item in results[page * page_size:(page + 1) * page_size]:
+        lines.append(f"• <b>{item['english_title']}</b>")
+        if item['english_title'] != item['chinese_title']:
+            lines.append(f"  ({item['chinese_title']})")
+        lines.append(f"  {date} · {html.escape(item['source'])} · <a href='{html.escape(item['url'])}'>Read more</a>")
+    return "\n".join(lines), pages
+
+
+def _keyboard(query_id, page, pages):
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton("◀ Prev", callback_data=f"page:{query_id}:{page - 1}"))
+    if page < pages - 1:
+        buttons.append(InlineKeyboardButton("Next ▶", callback_data=f"page:{query_id}:{page + 1}"))
+    return InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+def _allowed(update: Update):
+    return not config.BOT_ALLOWED_CHAT_IDS or str(update.effective_chat.id) in config.BOT_ALLOWED_CHAT_IDS
+
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not _allowed(update):
+        return
+    await update.message.reply_text(HELP_TEXT, parse_mode=ParseMode.HTML)
+
+
+def _query_command(command, usage):
+    async def handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not _allowed(update):
+            return
+        argument = " ".join(context.args).strip()
+        if not argument:
+            await update.message.reply_text(f"Usage: {usage}")
+            return
+        service = context.application.bot_data["service"]
+        service.refresh()
+        results = service.run(command, argument)
+        text, pages = format_page(command, argument, results, 0)
+        query_id = service.remember(command, argument, results)
+        await update.message.reply_text(text, parse_mode=ParseMode.HTML, disable_web_page_preview=True,
+                                        reply_markup=_keyboard(query_id, 0, pages))
+    return handler
+
+
+async def page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    if not _allowed(update):
+        return
+    _, query_id, page = query.data.split(":")
+    service = context.application.bot_data["service"]
+    if query_id not in service.queries:
+        await query.edit_message_reply_markup(reply_markup=None)
+        return
+    command, argument, results = service.queries[query_id]
+    text, pages = format_page(command, argument, results, int(page))
+    await query.edit_message_text(text, parse_mode=ParseMode.HTML, disable_web_page_preview=True,
+                                  reply_markup=_keyboard(query_id, int(page), pages))
+
+
+def main():
+    if not config.TELEGRAM_TOKEN:
+        logging.critical("TELEGRAM_TOKEN is not set. Exiting.")
+        return
+    service = HeadlineService()
+    service.refresh()
+
+    application = Application.builder().token(config.TELEGRAM_TOKEN).build()
+    application.bot_data["service"] = service
+    application.add_handler(CommandHandler(["start", "help"], help_command))
+    application.add_handler(CommandHandler("latest", _query_command("latest", "/latest <source>")))
+    application.add_handler(CommandHandler("search", _query_command("search", "/search <keyword>")))
+    application.add_handler(CommandHandler("day", _query_command("day", "/day <YYYY-MM-DD>")))
+    application.add_handler(CallbackQueryHandler(page_callback, pattern=r"^page:"))
+    logging.info("Bot command server started; polling for updates...")
+    application.run_polling()
+
+
+if __name__ == "__main__":
+    main()
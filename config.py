@@ -9,15 +9,54 @@ import logging
 # --- Environment Variables ---
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+# Bot API endpoint; point at telegram_stub_server.py (e.g. http://127.0.0.1:8081/bot) for local runs
+TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot')
 MS_TRANSLATOR_KEY = os.getenv('MS_TRANSLATOR_KEY')
 MS_TRANSLATOR_REGION = os.getenv('MS_TRANSLATOR_REGION', 'global')
 
 # --- File Paths and Limits ---
 DATA_FILE = "headlines.json"
+GROUPS_FILE = os.getenv('GROUPS_FILE', 'headline_groups.marshal') # (date, source) buckets of DATA_FILE, so loading it does not regroup every item
+OUTBOX_FILE = os.getenv('OUTBOX_FILE', 'outbox.sqlite3') # Durable queue of Telegram message parts
+OUTBOX_MAX_ATTEMPTS = 10 # Runs that may retry a part before it is marked failed
+OUTBOX_RETENTION_DAYS = 14 # Delivered/failed parts are kept this long for inspection
+DIGEST_FILE = os.getenv('DIGEST_FILE', 'digest.sqlite3') # Items waiting for the next digest
+SUBSCRIPTIONS_FILE = os.getenv('SUBSCRIPTIONS_FILE', 'subscriptions.json') # See subscriptions.example.json
+TRANSLATION_CACHE_FILE = os.getenv('TRANSLATION_CACHE_FILE', 'translation_cache.sqlite3')
+TRANSLATION_CACHE_MAX_ENTRIES = 200000 # Least recently used translations are evicted beyond this
+
+# --- Translation Memory (slot templates for formulaic headlines) ---
+TM_MIN_SUPPORT = 2 # Agreeing past headlines needed before a template is trusted
+TM_MIN_FIXED_CHARS = 6 # Chinese characters a frame must keep outside its slot
+TM_MAX_SLOT_CHARS = 4 # Longest Chinese slot value (e.g. 内蒙古, 黑龙江)
+TM_MAX_SLOT_WORDS = 4 # Longest English slot value
+TM_MAX_EXEMPLARS = 20000 # Most recent headline pairs used for learning
 MAX_MESSAGE_LENGTH = 4000  # Telegram's limit is 4096
+
+# --- Telegram Rate Limits (token buckets: messages per second and burst size) ---
+TELEGRAM_GLOBAL_RATE = 30 # Bot-wide limit across all chats
+TELEGRAM_GLOBAL_BURST = 30
+TELEGRAM_CHAT_RATE = 1 # Per private chat
+TELEGRAM_CHAT_BURST = 3
+TELEGRAM_GROUP_RATE_PER_MINUTE = 20 # Per group or channel (negative chat ids)
+TELEGRAM_GROUP_BURST = 5
+TELEGRAM_MAX_RETRIES = 5 # Attempts per message part
+TELEGRAM_RETRY_BASE_DELAY = 2 # Seconds; doubled on each retry after a TelegramError
 REQUESTS_TIMEOUT = 20 # Timeout for website requests
 TRANSLATOR_TIMEOUT = 10 # Timeout for translation requests
 TRANSLATOR_API_VERSION = '3.0'
+TRANSLATOR_MAX_BATCH_ELEMENTS = 1000 # Translator v3 accepts up to 1000 array elements per request
+TRANSLATOR_MAX_BATCH_CHARS = 50000 # ...and up to 50,000 characters across all elements
+TRANSLATOR_CHARS_PER_MINUTE = int(os.getenv('TRANSLATOR_CHARS_PER_MINUTE', '33000')) # Sliding-window quota we stay under
+TRANSLATOR_MAX_RETRIES = 3 # Retries for a request answered with 429 before it is left pending
+
+# --- Scrape/Translate Pipeline ---
+SCRAPER_WORKERS = 5 # Concurrent site fetches
+TRANSLATION_QUEUE_SIZE = int(os.getenv('TRANSLATION_QUEUE_SIZE', '200')) # Scrapers block when this many items are waiting
+TRANSLATION_WORKERS = int(os.getenv('TRANSLATION_WORKERS', '2'))
+TRANSLATION_BATCH_SIZE = 100 # Items gathered into one translate_items call
+TRANSLATION_BATCH_WAIT = 0.5 # Seconds a worker waits to fill a batch before translating what it has
+TRANSLATION_REQUESTS_PER_SECOND = float(os.getenv('TRANSLATION_REQUESTS_PER_SECOND', '5')) # Translator API requests started per second, across all workers (0 = unlimited)
 
 # --- Website Configuration ---
 WEBSITES = {
@@ -70,23 +109,52 @@ WEBSITES = {
     #"MND Special PC": "http://www.mod.gov.cn/gfbw/xwfyr/ztjzh/index.html"
 
 }
-# ----------------ENGLISH_WEBSITES-------------------------------
-ENGLISH_WEBSITES = ["GT China Politics",
-                    "GT China Society",
-                    "GT China Diplomacy",
-                    "GT China Military",
-                    "GT China Science",
-                    "GT Source Voice",
-                    "GT Source Insight",
-                    "GT Source Ecomony",
-                    "GT Source Comments",
-                    "GT Opinion Editorial",
-                    "GT Opinion Observer",
-                    "GT Opinion Asian Review",
-                    "GT Opinion Toptalk",
-                    "GT Opinion Viewpoint",
-                    "GT Indepth"
-                ] # Add the names of your English websites here
+# --- Digest Mode ---
+# When enabled, new items are collected across runs and sent as one ranked digest per day;
+# only DIGEST_PRIORITY_SOURCES are still sent as soon as they are found.
+DIGEST_MODE = os.getenv('DIGEST_MODE', '').lower() in ('1', 'true', 'yes')
+DIGEST_SCHEDULE = os.getenv('DIGEST_SCHEDULE', '08:00') # Daily, HH:MM in DIGEST_TIMEZONE
+DIGEST_TIMEZONE = os.getenv('DIGEST_TIMEZONE', 'Asia/Taipei')
+DIGEST_MAX_ITEMS = 150
+DIGEST_MAX_ITEMS_PER_SOURCE = 15
+DIGEST_SENT_RETENTION_DAYS = 30 # Titles already digested are left out of later digests for this long
+DIGEST_PRIORITY_SOURCES = [
+    # "Taiwan Affairs Office",
+]
+
+# --- Static Site (docs/) ---
+SITE_INDEX_DAYS = 7 # Days shown in full on index.html; older days have their own pages under docs/days/
+SITE_MANIFEST_FILE = 'manifest.json' # Content hash per rendered page, inside the docs directory
+SOURCE_PAGE_ITEMS = 200 # Newest items listed on each docs/sources/<source>.html page
+JINJA_BYTECODE_CACHE_DIR = os.getenv('JINJA_BYTECODE_CACHE_DIR', '.jinja_cache') # Compiled templates kept between runs
+RENDER_BUFFER_SIZE = 1 << 16 # Bytes buffered before a streamed page is written out
+SEARCH_DIR = 'search' # Sharded client-side search index, inside the docs directory
+SEARCH_DOC_CHUNK = 500 # Documents per search/docs/<n>.json file
+FEEDS_DIR = 'feeds' # Atom and JSON Feed files, inside the docs directory
+FEED_MAX_ITEMS = 50 # Newest items per feed
+FEED_MAX_DATES = 60 # Dates of history the feeds look back over; quiet or disabled sources do not make them walk further
+SITE_BASE_URL = os.getenv('SITE_BASE_URL', '') # Public URL of docs/, used for feed ids and links
+ASSETS_DIR = 'assets' # Content-hashed stylesheets, inside the docs directory
+COMPRESS_MANIFEST_FILE = 'compress-manifest.json' # Hash, size and mtime of every precompressed file, inside the docs directory (gitignored: mtimes differ between checkouts)
+COMPRESS_EXTENSIONS = ('.html', '.css', '.js', '.json', '.xml') # Files that get .gz (and .br) siblings
+COMPRESS_MIN_BYTES = 256 # Smaller files are not worth compressing
+RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', str(os.cpu_count() or 1))) # Processes rendering pages and feeds
+RENDER_CHUNK_SIZE = 16 # Render jobs sent to a worker at a time
+RENDER_PARALLEL_MIN_JOBS = 32 # Fewer jobs than this render in-process; a pool would only add startup time
+
+# --- Bot Commands (bot_commands.py) ---
+BOT_PAGE_SIZE = 10 # Results per message; more are reached with Next/Prev buttons
+# Comma-separated chat ids allowed to query the bot; empty means anyone
+BOT_ALLOWED_CHAT_IDS = {c.strip() for c in os.getenv('BOT_ALLOWED_CHAT_IDS', '').split(',') if c.strip()}
+
+# --- Language Detection ---
+# Titles are translated when at least this share of their letters are CJK ideographs
+CJK_RATIO_THRESHOLD = 0.3
+CJK_MIN_RUN = 2 # ...or when they contain this many CJK ideographs in a row (mixed titles such as '中国 and US hold talks 会谈')
+# Per-site overrides of the detector: True = always translate, False = never translate
+TRANSLATION_OVERRIDES = {
+    # "Guancha Chinese Diplomacy": True,
+}
 
 # --- CSS Selectors ---
 # Grouped for readability
@@ -161,7 +229,7 @@ def validate_config():
     if not os.getenv('URL_COLLECTION_MODE'):
         if not TELEGRAM_TOKEN:
             missing_vars.append('TELEGRAM_TOKEN')
-        if not TELEGRAM_CHAT_ID:
+        if not TELEGRAM_CHAT_ID and not os.path.exists(SUBSCRIPTIONS_FILE):
             missing_vars.append('TELEGRAM_CHAT_ID')
     
     if missing_vars:
@@ -171,4 +239,27 @@ def validate_config():
     return True
 
 # Add this with your other configuration variables
-GITHUB_AUTO_PUSH = True  # Set to False if you don't want automatic pushing
\ No newline at end of file
+GITHUB_AUTO_PUSH = True  # Set to False if you don't want automatic pushing
+
+# --- Git Publishing (git_manager.py) ---
+# 'changes' commits only changed files under GIT_PUBLISH_PATHS and keeps GIT_DATA_FILES on a
+# separate data branch; empty (the default) leaves publishing to the Pages workflow as before.
+GIT_PUBLISH_MODE = os.getenv('GIT_PUBLISH_MODE', '').lower()
+GIT_REMOTE = os.getenv('GIT_REMOTE', 'origin')
+GIT_PUBLISH_PATHS = ['docs']
+GIT_DATA_FILES = [DATA_FILE, GROUPS_FILE]
+GIT_DATA_BRANCH = os.getenv('GIT_DATA_BRANCH', 'data')
+GIT_DATA_SQUASH_DAYS = 7 # The data branch is rewritten as one commit once its oldest commit is this old
+
+# --- Run Metrics (metrics.py) ---
+METRICS_PREFIX = 'china_news'  # Prefix of every metric name in the Prometheus textfile
+RUN_REPORT_FILE = os.getenv('RUN_REPORT_FILE', 'run_report.json')  # JSON summary of the last run
+METRICS_TEXTFILE = os.getenv('METRICS_TEXTFILE', 'metrics.prom')  # Point at the node_exporter textfile directory to collect it
+
+# --- Profiling (profiler.py) ---
+# Also enabled with `python main.py --profile [--profile-tasks]`
+PROFILE = os.getenv('PROFILE', '').lower() in ('1', 'true', 'yes')
+PROFILE_ASYNCIO_TASKS = os.getenv('PROFILE_ASYNCIO_TASKS', '').lower() in ('1', 'true', 'yes') # Time every asyncio task too
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profile') # One timestamped directory of artifacts per profiled run
+PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', '30')) # Rows per table in summary.txt
+PROFILE_TRACEMALLOC_FRAMES = 10 # Stack depth kept per allocation
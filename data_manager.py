@@ -1,11 +1,16 @@
 # data_manager.py
 import json
 import logging
-from config import DATA_FILE
+import marshal
+from config import DATA_FILE, GROUPS_FILE
+from metrics import timed
 import os
 from datetime import datetime
 from urllib.parse import urlparse, urlunparse
 
+# Derived from data["headlines"] and never written to headlines.json (groups go to GROUPS_FILE)
+DERIVED_KEYS = ("groups", "dirty_dates")
+
 def normalize_url(url):
     """Normalize URL to ensure consistent comparison"""
     parsed = urlparse(url)
@@ -39,6 +44,10 @@ def load_previous_data():
                 processed_urls = {normalize_url(url) for url in data.get('processed_urls', [])}
                 logging.info(f"Loaded {len(processed_urls)} processed URLs from headlines.json")
                 data['processed_urls'] = processed_urls
+                for key in DERIVED_KEYS:
+                    data.pop(key, None)  # Files written before these were kept out of it
+                data['groups'] = _load_groups(data['headlines'])
+                ensure_groups(data)
                 return data
     except Exception as e:
         logging.error(f"Error loading headlines.json: {e}")
@@ -46,8 +55,9 @@ def load_previous_data():
     logging.warning("No existing headlines.json found or error loading it. Starting fresh.")
     return empty_data
 
+@timed("save_data")
 def save_data(data):
-    """Save headlines data with proper formatting"""
+    """Save headlines data with proper formatting. Returns True if the file was written."""
     try:
         # Ensure processed_urls contains normalized URLs and is converted to list for JSON
         if isinstance(data.get('processed_urls'), set):
@@ -59,15 +69,20 @@ def save_data(data):
         url_count = len(data['processed_urls'])
         
         with open('headlines.json', 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+            json.dump({key: value for key, value in data.items() if key not in DERIVED_KEYS},
+                      f, ensure_ascii=False, indent=2)
         
         logging.info(f"Saved headlines.json with {url_count} processed URLs")
+        if 'groups' in data:
+            _save_groups(data)
         
         # Convert back to set for continued use
         data['processed_urls'] = set(data['processed_urls'])
+        return True
         
     except Exception as e:
         logging.error(f"Error saving headlines.json: {e}")
+        return False
 
 seen_urls = set()  # This will store normalized URLs
 deduplicated_items_by_site = {}
@@ -88,4 +103,64 @@ def deduplicate_items(items):
         else:
             logging.warning(f"Duplicate URL found and filtered: {item['url']} (normalized: {normalized_url})")
     
-    return unique_items
\ No newline at end of file
+    return unique_items
+
+def ensure_groups(data):
+    """Return data["groups"], {date: {source: [positions in headlines[date]]}}.
+
+    Only dates without buckets, and dirty dates (mark_dirty) whose buckets no longer
+    account for every item, are grouped; add_headlines keeps the buckets current and
+    load_previous_data starts from the ones saved in GROUPS_FILE.
+    """
+    headlines = data.setdefault("headlines", {})
+    groups = data.setdefault("groups", {})
+    for date in groups.keys() - headlines.keys():
+        del groups[date]
+    for date in (headlines.keys() - groups.keys()) | (data.get("dirty_dates", set()) & headlines.keys()):
+        buckets = groups.get(date)
+        if buckets is None or sum(len(positions) for positions in buckets.values()) != len(headlines[date]):
+            groups[date] = _group(headlines[date])
+    return groups
+
+def _group(items):
+    buckets = {}
+    for position, item in enumerate(items):
+        buckets.setdefault(item['source'], []).append(position)
+    return buckets
+
+def _load_groups(headlines):
+    """Buckets from GROUPS_FILE for the dates whose item count still matches; items are only ever appended."""
+    try:
+        with open(GROUPS_FILE, 'rb') as f:
+            stored = marshal.load(f)
+        return {date: buckets for date, (count, buckets) in stored.items()
+                if date in headlines and len(headlines[date]) == count}
+    except (OSError, EOFError, ValueError, TypeError, AttributeError):
+        return {}  # Missing, unreadable or written by another Python version; every date is regrouped
+
+def _save_groups(data):
+    """Write every date's item count and buckets to GROUPS_FILE.
+
+    marshal reads the plain lists back several times faster than json, and faster than
+    regrouping the items; the file is only a cache of data["headlines"].
+    """
+    payload = {date: (len(data['headlines'][date]), buckets)
+               for date, buckets in data['groups'].items() if date in data['headlines']}
+    with open(GROUPS_FILE + '.tmp', 'wb') as f:
+        marshal.dump(payload, f)
+    os.replace(GROUPS_FILE + '.tmp', GROUPS_FILE)
+
+def mark_dirty(data, date):
+    """Record that the items of date changed in this process, so their pages get re-rendered."""
+    data.setdefault("dirty_dates", set()).add(date)
+
+def add_headlines(data, date, items):
+    """Append items to data["headlines"][date], filing each one in its (date, source) bucket."""
+    if items:
+        mark_dirty(data, date)
+    groups = data["groups"] if "groups" in data else ensure_groups(data)
+    buckets = groups.setdefault(date, {})
+    headlines = data["headlines"].setdefault(date, [])
+    for item in items:
+        buckets.setdefault(item['source'], []).append(len(headlines))
+        headlines.append(item)
@@ -0,0 +1,136 @@
+# digest.py
+import html
+import logging
+import sqlite3
+import time
+from datetime import datetime, time as clock_time, timedelta
+
+import pytz
+
+from config import (DIGEST_FILE, DIGEST_SCHEDULE, DIGEST_TIMEZONE, DIGEST_MAX_ITEMS,
+                    DIGEST_MAX_ITEMS_PER_SOURCE, DIGEST_PRIORITY_SOURCES, DIGEST_SENT_RETENTION_DAYS)
+from data_manager import normalize_url
+from translation_cache import normalize_text
+
+
+class DigestStore:
+    """Items waiting for the next scheduled digest, persisted in SQLite across runs.
+
+    The title keys of digested items are kept for DIGEST_SENT_RETENTION_DAYS, so a headline
+    republished under a new URL is not digested twice.
+    """
+
+    def __init__(self, path=DIGEST_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pending (
+                url TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                chinese_title TEXT NOT NULL,
+                english_title TEXT NOT NULL,
+                original_url TEXT NOT NULL,
+                title_key TEXT NOT NULL,
+                added_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS sent (title_key TEXT PRIMARY KEY, sent_at REAL NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.conn.commit()
+
+    def add(self, items):
+        """Queue items for the digest; an item already queued (same normalized URL) is ignored."""
+        now = time.time()
+        rows = [(normalize_url(item['url']), item['source'], item['chinese_title'], item['english_title'],
+                 item['url'], normalize_text(html.unescape(item['chinese_title'])), now)
+                for item in items]
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO pending VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            added = self.conn.total_changes - before
+        logging.info(f"Queued {added} items for the next digest")
+        return added
+
+    def _last_emitted(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'last_emitted'").fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def due(self, now=None):
+        """True once the most recent scheduled time has passed and no digest was sent since."""
+        tz = pytz.timezone(DIGEST_TIMEZONE)
+        now = now.astimezone(tz) if now else datetime.now(tz)
+        at = clock_time(*(int(part) for part in DIGEST_SCHEDULE.split(':')))
+        # localize() picks the offset in force on that date; replace() would keep now's across a DST change
+        scheduled = tz.localize(datetime.combine(now.date(), at))
+        if scheduled > now:
+            scheduled = tz.localize(datetime.combine(now.date() - timedelta(days=1), at))
+        last_emitted = self._last_emitted()
+        if last_emitted is None:
+            # First run in digest mode: start collecting now, first digest at the next scheduled time
+            self.mark_emitted(now, clear=False)
+            return False
+        return last_emitted < scheduled
+
+    def build(self):
+        """Rank, deduplicate and cap the pending items.
+
+        Titles already digested are left out. Titles reported by several sources collapse
+        into one entry and rank higher, then newer items. Returns (items_by_source, n_pending).
+        """
+        rows = self.conn.execute(
+            "SELECT source, chinese_title, english_title, original_url, title_key, added_at FROM pending "
+            "WHERE title_key NOT IN (SELECT title_key FROM sent)"
+        ).fetchall()
+
+        by_title = {}
+        for source, chinese_title, english_title, url, title_key, added_at in rows:
+            entry = by_title.get(title_key)
+            if entry is None:
+                by_title[title_key] = entry = {
+                    "item": {"chinese_title": chinese_title, "english_title": english_title,
+                             "url": url, "source": source},
+                    "sources": set(), "added_at": added_at,
+                }
+            entry["sources"].add(source)
+            entry["added_at"] = max(entry["added_at"], added_at)
+
+        ranked = sorted(by_title.values(), key=lambda e: (len(e["sources"]), e["added_at"]), reverse=True)
+
+        items_by_source = {}
+        selected = 0
+        for entry in ranked:
+            if selected >= DIGEST_MAX_ITEMS:
+                break
+            items = items_by_source.setdefault(entry["item"]["source"], [])
+            if len(items) >= DIGEST_MAX_ITEMS_PER_SOURCE:
+                continue
+            items.append(entry["item"])
+            selected += 1
+
+        logging.info(f"Built digest with {selected} items from {len(rows)} pending "
+                     f"({len(rows) - len(by_title)} duplicates merged, {len(by_title) - selected} over the caps)")
+        return {source: items for source, items in items_by_source.items() if items}, len(rows)
+
+    def mark_emitted(self, now=None, clear=True, sent_items=()):
+        """Clear the pending items and remember when the digest went out and which titles it carried."""
+        now = now or datetime.now(pytz.timezone(DIGEST_TIMEZONE))
+        with self.conn:
+            if clear:
+                self.conn.execute("DELETE FROM pending")
+            self.conn.executemany("INSERT OR REPLACE INTO sent VALUES (?, ?)",
+                                  [(normalize_text(html.unescape(item['chinese_title'])), now.timestamp())
+                                   for item in sent_items])
+            self.conn.execute("DELETE FROM sent WHERE sent_at < ?",
+                              (now.timestamp() - DIGEST_SENT_RETENTION_DAYS * 86400,))
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('last_emitted', ?)", (now.isoformat(),))
+
+    def close(self):
+        self.conn.close()
+
+
+def split_priority_items(items_by_site):
+    """Separate items from DIGEST_PRIORITY_SOURCES (sent right away) from the rest (queued for the digest)."""
+    priority = set(DIGEST_PRIORITY_SOURCES)
+    alerts = {site: items for site, items in items_by_site.items() if site in priority and items}
+    queued = {site: items for site, items in items_by_site.items() if site not in priority and items}
+    return alerts, queued
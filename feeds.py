@@ -0,0 +1,180 @@
+# feeds.py
+"""Atom and JSON Feed output under docs/feeds/, overall and per source in config.WEBSITES.
+
+Each feed holds the FEED_MAX_ITEMS newest items. A feed file is rewritten only when the
+fingerprint of its items changed, so unchanged feeds keep their bytes (and ETag /
+Last-Modified on the host). feeds/index.json lists every feed with its last update,
+item count and content hash, so a poller can check one small file before fetching feeds.
+"""
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+from config import FEED_MAX_DATES, FEED_MAX_ITEMS, FEEDS_DIR, SITE_BASE_URL, WEBSITES
+
+ATOM_NS = "http://www.w3.org/2005/Atom"
+FEED_TITLE = "China News Bot"
+
+
+def slugify(source):
+    """File-name-safe slug for a source; non-ASCII names get a short hash."""
+    slug = re.sub(r'[^a-z0-9]+', '-', source.lower()).strip('-')
+    if not slug or not source.isascii():
+        slug = (slug + '-' if slug else 'source-') + hashlib.sha1(source.encode('utf-8')).hexdigest()[:8]
+    return slug
+
+
+def _timestamp(item):
+    """RFC 3339 time of an item; scraped dates are naive UTC (the runner's clock)."""
+    try:
+        scraped = datetime.strptime(item.get('date', ''), "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+    return scraped.replace(tzinfo=timezone.utc).isoformat()
+
+
+def recent_items(headlines, groups=None, limit=FEED_MAX_ITEMS, max_dates=FEED_MAX_DATES):
+    """Newest items overall and per configured source, newest first.
+
+    At most the max_dates newest dates are visited, and fewer once every feed is full.
+    With the (date, source) groups index only the items that go into a feed are touched.
+    """
+    per_source = {source: [] for source in WEBSITES}
+    overall = []
+    for date in sorted(headlines, reverse=True)[:max_dates]:
+        items = headlines[date]
+        if len(overall) < limit:
+            overall.extend(reversed(items[-(limit - len(overall)):]))
+        buckets = groups[date] if groups is not None else _buckets(items)
+        for source, positions in buckets.items():
+            feed_items = per_source.get(source)
+            if feed_items is not None and len(feed_items) < limit:
+                feed_items.extend(items[position] for position in reversed(positions[-(limit - len(feed_items)):]))
+        if len(overall) >= limit and all(len(items) >= limit for items in per_source.values()):
+            break
+    return overall, per_source
+
+
+def _buckets(items):
+    buckets = {}
+    for position, item in enumerate(items):
+        buckets.setdefault(item['source'], []).append(position)
+    return buckets
+
+
+class FeedWriter:
+    def __init__(self, docs_dir):
+        self.root = os.path.join(docs_dir, FEEDS_DIR)
+        os.makedirs(self.root, exist_ok=True)
+        self.index = {}
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.root, 'index.json'), 'r', encoding='utf-8') as f:
+                return {feed['slug']: feed for feed in json.load(f).get('feeds', [])}
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def _url(self, name):
+        return f"{SITE_BASE_URL.rstrip('/')}/{FEEDS_DIR}/{name}" if SITE_BASE_URL else None
+
+    def plan(self, headlines, groups=None):
+        """Feeds whose items changed since they were last written, as (slug, title, items, fingerprint).
+
+        Unchanged feeds are carried over into self.entries as they are.
+        """
+        self.index = self._read_index()
+        overall, per_source = recent_items(headlines, groups)
+        feeds = [("all", FEED_TITLE, overall)]
+        feeds += [(slugify(source), f"{FEED_TITLE} - {source}", items) for source, items in per_source.items()]
+
+        self.entries = {}
+        changed = []
+        for slug, title, items in feeds:
+            fingerprint = hashlib.sha256(json.dumps(
+                [(item['url'], item['chinese_title'], item['english_title']) for item in items],
+                ensure_ascii=False).encode('utf-8')).hexdigest()
+            previous = self.index.get(slug)
+            unchanged = (previous and previous.get('fingerprint') == fingerprint
+                         and os.path.exists(os.path.join(self.root, f"{slug}.atom.xml"))
+                         and os.path.exists(os.path.join(self.root, f"{slug}.json")))
+            if unchanged:
+                self.entries[slug] = previous
+            else:
+                changed.append((slug, title, items, fingerprint))
+        self.total = len(feeds)
+        return changed
+
+    def write(self, slug, title, items, fingerprint):
+        """Write one feed in both formats and return its index.json entry."""
+        updated = max(filter(None, (_timestamp(item) for item in items)), default=None) \
+            or datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+        atom = self._atom(slug, title, items, updated)
+        self._write(f"{slug}.atom.xml", atom)
+        self._write(f"{slug}.json", self._json_feed(slug, title, items))
+        return {
+            "slug": slug, "title": title, "atom": f"{slug}.atom.xml", "json": f"{slug}.json",
+            "items": len(items), "updated": updated, "fingerprint": fingerprint,
+            "etag": hashlib.sha256(atom).hexdigest()[:16],
+        }
+
+    def finish(self, written_entries):
+        """Merge the entries of the feeds just written and save index.json if anything changed."""
+        for entry in written_entries:
+            self.entries[entry['slug']] = entry
+        if written_entries or self.entries.keys() != self.index.keys():
+            self._write('index.json', json.dumps({"feeds": sorted(self.entries.values(), key=lambda f: f['slug'])},
+                                                 ensure_ascii=False, indent=1).encode('utf-8'))
+        logging.info(f"Feeds: {len(written_entries)} of {self.total} regenerated")
+        return len(written_entries)
+
+    def update(self, headlines, groups=None):
+        return self.finish([self.write(*feed) for feed in self.plan(headlines, groups)])
+
+    def _write(self, name, payload):
+        path = os.path.join(self.root, name)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(payload)
+        os.replace(path + '.tmp', path)
+
+    def _atom(self, slug, title, items, updated):
+        feed = ET.Element('feed', xmlns=ATOM_NS)
+        ET.SubElement(feed, 'title').text = title
+        ET.SubElement(feed, 'id').text = self._url(f"{slug}.atom.xml") or f"urn:china-news-bot:feed:{slug}"
+        ET.SubElement(feed, 'updated').text = updated
+        ET.SubElement(ET.SubElement(feed, 'author'), 'name').text = FEED_TITLE
+        if SITE_BASE_URL:
+            ET.SubElement(feed, 'link', rel='self', href=self._url(f"{slug}.atom.xml"))
+            ET.SubElement(feed, 'link', rel='alternate', href=SITE_BASE_URL)
+        for item in items:
+            entry = ET.SubElement(feed, 'entry')
+            ET.SubElement(entry, 'title').text = html.unescape(item['english_title'])
+            ET.SubElement(entry, 'id').text = item['url']
+            ET.SubElement(entry, 'link', href=item['url'])
+            ET.SubElement(entry, 'updated').text = _timestamp(item) or updated
+            ET.SubElement(entry, 'summary').text = html.unescape(item['chinese_title'])
+            ET.SubElement(entry, 'category', term=item['source'])
+        return ET.tostring(feed, encoding='utf-8', xml_declaration=True)
+
+    def _json_feed(self, slug, title, items):
+        feed = {"version": "https://jsonfeed.org/version/1.1", "title": title}
+        if SITE_BASE_URL:
+            feed["home_page_url"] = SITE_BASE_URL
+            feed["feed_url"] = self._url(f"{slug}.json")
+        feed["items"] = []
+        for item in items:
+            entry = {"id": item['url'], "url": item['url'], "title": html.unescape(item['english_title']),
+                     "content_text": html.unescape(item['chinese_title']), "tags": [item['source']]}
+            if _timestamp(item):
+                entry["date_published"] = _timestamp(item)
+            feed["items"].append(entry)
+        return json.dumps(feed, ensure_ascii=False, indent=1).encode('utf-8')
+
+
+def update_feeds(docs_dir, headlines, groups=None):
+    return FeedWriter(docs_dir).update(headlines, groups)
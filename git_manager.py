@@ -1,13 +1,18 @@
+import os
 import subprocess
 import logging
+import time
 from datetime import datetime
 
+from config import (GIT_DATA_BRANCH, GIT_DATA_FILES, GIT_DATA_SQUASH_DAYS, GIT_PUBLISH_PATHS,
+                    GIT_REMOTE)
+
 class GitManager:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
 
-    def _run_command(self, command):
-        """Run a git command and return the result"""
+    def _run_command(self, command, check=True, strip=True):
+        """Run a git command and return its output; with check=False a failure returns None"""
         try:
             result = subprocess.run(
                 command,
@@ -15,30 +20,118 @@ class GitManager:
                 text=True,
                 check=True
             )
-            return result.stdout.strip()
+            return result.stdout.strip() if strip else result.stdout
         except subprocess.CalledProcessError as e:
+            if not check:
+                return None
             self.logger.error(f"Git command failed: {e.stderr}")
             raise
 
-    def push_changes(self):
-        """Push changes to GitHub"""
+    def _changed_files(self, paths):
+        """Paths under `paths` whose content differs from HEAD (modified, added, deleted or untracked).
+
+        A rename or copy lists both paths, so staging them also records the removal of the source.
+        """
+        output = self._run_command(['git', 'status', '--porcelain', '-z', '--untracked-files=all', '--', *paths],
+                                   strip=False)
+        entries = output.split('\0')
+        changed = []
+        i = 0
+        while i < len(entries):
+            entry = entries[i]
+            i += 1
+            if not entry:
+                continue
+            status, path = entry[:2], entry[3:]
+            changed.append((status.strip(), path))
+            if 'R' in status or 'C' in status:
+                changed.append((status.strip(), entries[i]))  # The next entry is the rename source
+                i += 1
+        return changed
+
+    def publish_changes(self):
+        """Commit and push only the published files whose content changed; skip the commit if none did.
+
+        Data files (GIT_DATA_FILES) are kept out of this history and go to the data branch instead.
+        Returns a report with the files and bytes committed.
+        """
+        report = {"files": 0, "bytes": 0, "data_bytes": 0, "data_squashed": False}
         try:
-            # Get current timestamp for commit message
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            # Add changes
-            self._run_command(['git', 'add', 'docs/*'])
-            
-            # Create commit
-            commit_message = f"Update news pages - {timestamp}"
-            self._run_command(['git', 'commit', '-m', commit_message])
-            
-            # Push changes
-            self._run_command(['git', 'push'])
-            
-            self.logger.info("Successfully pushed changes to GitHub")
-            return True
-            
+            changed = [(status, path) for status, path in self._changed_files(GIT_PUBLISH_PATHS)
+                       if path not in GIT_DATA_FILES]
+            if changed:
+                paths = [path for _, path in changed]
+                existing = [path for path in paths if os.path.exists(path)]
+                removed = [path for path in paths if not os.path.exists(path)]
+                if existing:
+                    self._run_command(['git', 'add', '-A', '--', *existing])
+                if removed:  # Deleted files and rename sources; a staged rename already left the index
+                    self._run_command(['git', 'rm', '--cached', '--quiet', '--ignore-unmatch', '--', *removed])
+                report["files"] = len(paths)
+                report["bytes"] = sum(os.path.getsize(path) for path in existing)
+                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                self._run_command(['git', 'commit', '-m', f"Update news pages - {timestamp}", '--', *paths])
+                self._run_command(['git', 'push', GIT_REMOTE, 'HEAD'])
+            else:
+                self.logger.info("No published files changed; skipping the commit")
+
+            report["data_bytes"], report["data_squashed"] = self.publish_data_files()
+            self.logger.info(f"Published {report['files']} changed files ({report['bytes']} bytes) "
+                             f"and {report['data_bytes']} bytes of data to '{GIT_DATA_BRANCH}'"
+                             f"{' (squashed)' if report['data_squashed'] else ''}")
+            return report
+
         except Exception as e:
-            self.logger.error(f"Failed to push changes to GitHub: {e}")
-            return False 
\ No newline at end of file
+            self.logger.error(f"Failed to publish changes to GitHub: {e}")
+            return None
+
+    def publish_data_files(self):
+        """Commit GIT_DATA_FILES to GIT_DATA_BRANCH without touching the working tree or the current branch.
+
+        The branch is rewritten as a single commit once its oldest commit is more than
+        GIT_DATA_SQUASH_DAYS old, so its history stays short. Returns (bytes committed, squashed).
+        """
+        files = [path for path in GIT_DATA_FILES if os.path.exists(path)]
+        if not files:
+            return 0, False
+        ref = f"refs/heads/{GIT_DATA_BRANCH}"
+        self._run_command(['git', 'fetch', GIT_REMOTE, f"+{ref}:{ref}"], check=False)
+        parent = self._run_command(['git', 'rev-parse', '--verify', '--quiet', ref], check=False)
+
+        entries = []
+        for path in files:
+            blob = self._run_command(['git', 'hash-object', '-w', '--', path])
+            entries.append(f"100644 blob {blob}\t{os.path.basename(path)}")
+        tree = subprocess.run(['git', 'mktree'], input='\n'.join(entries) + '\n', capture_output=True,
+                              text=True, check=True).stdout.strip()
+        if parent and self._run_command(['git', 'rev-parse', f"{parent}^{{tree}}"]) == tree:
+            self.logger.info(f"Data files unchanged; nothing to commit to '{GIT_DATA_BRANCH}'")
+            return 0, False
+
+        squash = False
+        if parent:
+            root_time = int(self._run_command(['git', 'log', '--max-parents=0', '--format=%ct', parent]).split()[-1])
+            squash = time.time() - root_time > GIT_DATA_SQUASH_DAYS * 86400
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        command = ['git', 'commit-tree', tree, '-m', f"Update data - {timestamp}"]
+        if parent and not squash:
+            command[3:3] = ['-p', parent]
+        commit = self._run_command(command)
+        self._run_command(['git', 'update-ref', ref, commit])
+        self._run_command(['git', 'push', GIT_REMOTE, f"{'+' if squash else ''}{ref}:{ref}"])
+        return sum(os.path.getsize(path) for path in files), squash
+
+    def restore_data_files(self):
+        """Check out GIT_DATA_FILES from the data branch, if it exists, before a run reads them."""
+        ref = f"refs/heads/{GIT_DATA_BRANCH}"
+        if self._run_command(['git', 'fetch', GIT_REMOTE, f"+{ref}:{ref}"], check=False) is None:
+            self.logger.info(f"No '{GIT_DATA_BRANCH}' branch on {GIT_REMOTE}; using data files from the working tree")
+            return False
+        for path in GIT_DATA_FILES:
+            # Bytes in and out, so the file is restored exactly as it was committed
+            result = subprocess.run(['git', 'show', f"{ref}:{os.path.basename(path)}"], capture_output=True)
+            if result.returncode == 0:
+                with open(path, 'wb') as f:
+                    f.write(result.stdout)
+                self.logger.info(f"Restored {path} from '{GIT_DATA_BRANCH}'")
+        return True
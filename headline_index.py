@@ -0,0 +1,154 @@
+# headline_index.py
+import bisect
+import heapq
+import html
+import re
+from collections import defaultdict
+
+_CJK_RUN_RE = re.compile('[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_WORD_RE = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset({"a", "an", "and", "as", "at", "by", "for", "in", "is", "of", "on", "or", "the", "to", "with"})
+
+
+def tokenize(text, unigrams=False):
+    """Search tokens for a title: CJK character bigrams plus lowercase English words.
+
+    A lone CJK character is kept as a unigram so one-character queries still match; with
+    unigrams, every CJK character is (for indexes that cannot look up the bigrams around one).
+    """
+    text = html.unescape(text or "").lower()
+    tokens = set()
+    for run in _CJK_RUN_RE.findall(text):
+        if len(run) == 1 or unigrams:
+            tokens.update(run)
+        if len(run) > 1:
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.update(word for word in _WORD_RE.findall(text) if word not in STOPWORDS)
+    return tokens
+
+
+class HeadlineIndex:
+    """In-memory index over headlines by date, by source and by title token.
+
+    Items are added incrementally; an item whose URL is already indexed is only
+    re-tokenized if its titles changed (a translation filled in by a later run).
+    add_data can be called again with a reloaded headlines.json: items are only ever
+    appended to a date, so it indexes just the items past each date's indexed count and
+    re-checks the ones that were still pending_translation. by_date and by_source keep
+    their document ids oldest first, so the newest results are a reversed slice.
+    """
+
+    def __init__(self):
+        self.docs = []
+        self.urls = {}  # url -> doc id
+        self.dates = []  # Indexed dates, ascending
+        self.by_date = defaultdict(list)
+        self.by_source = defaultdict(list)
+        self.indexed = {}  # date -> number of its items add_data has seen
+        self.pending = {}  # date -> positions of items indexed while pending_translation
+        self.postings = defaultdict(set)
+        self.char_bigrams = defaultdict(set)  # CJK character -> indexed bigrams containing it
+
+    def add(self, item, date):
+        """Index item; returns True if it was new or its titles changed."""
+        doc_id = self.urls.get(item['url'])
+        if doc_id is not None:
+            old = self.docs[doc_id][1]
+            if (old.get('chinese_title'), old.get('english_title')) == (item.get('chinese_title'), item.get('english_title')):
+                return False
+            for token in self._tokens(old):
+                self.postings[token].discard(doc_id)
+            self.docs[doc_id] = (self.docs[doc_id][0], item)
+        else:
+            doc_id = len(self.docs)
+            self.docs.append((date, item))
+            self.urls[item['url']] = doc_id
+            if date not in self.by_date:
+                bisect.insort(self.dates, date)
+            self.by_date[date].append(doc_id)
+            self._append_in_date_order(self.by_source[item['source']], doc_id, date)
+        for token in self._tokens(item):
+            self.postings[token].add(doc_id)
+            if len(token) == 2 and _CJK_RUN_RE.fullmatch(token):
+                self.char_bigrams[token[0]].add(token)
+                self.char_bigrams[token[1]].add(token)
+        return True
+
+    @staticmethod
+    def _tokens(item):
+        return tokenize(item.get('chinese_title')) | tokenize(item.get('english_title'))
+
+    def _append_in_date_order(self, doc_ids, doc_id, date):
+        position = len(doc_ids)
+        while position and self.docs[doc_ids[position - 1]][0] > date:
+            position -= 1  # A late item for an older date; runs keep adding to the newest ones
+        doc_ids.insert(position, doc_id)
+
+    def add_data(self, data):
+        """Index the new items of a headlines.json structure and the translations filled in since. Returns how many."""
+        added = 0
+        headlines = data.get("headlines", {})
+        for date in list(self.pending):
+            items = headlines.get(date, [])
+            for position in list(self.pending[date]):
+                item = items[position] if position < len(items) else None
+                if item is not None:
+                    added += self.add(item, date)
+                if item is None or not item.get('pending_translation'):
+                    self.pending[date].discard(position)
+            if not self.pending[date]:
+                del self.pending[date]
+        for date in sorted(headlines):
+            start = self.indexed.get(date, 0)
+            for position, item in enumerate(headlines[date][start:], start):
+                added += self.add(item, date)
+                if item.get('pending_translation'):
+                    self.pending.setdefault(date, set()).add(position)
+            self.indexed[date] = len(headlines[date])
+        return added
+
+    def _newest_first(self, doc_ids):
+        """doc_ids ordered newest first: a walk down the dates when they are a large share of the index."""
+        if len(doc_ids) * 8 < len(self.docs):
+            return sorted(doc_ids, key=lambda doc_id: (self.docs[doc_id][0], doc_id), reverse=True)
+        return [doc_id for date in reversed(self.dates) for doc_id in reversed(self.by_date[date]) if doc_id in doc_ids]
+
+    def find_sources(self, name):
+        """Sources whose name matches name exactly or, failing that, contains it (case-insensitive)."""
+        if name in self.by_source:
+            return [name]
+        needle = name.lower()
+        return [source for source in self.by_source if needle in source.lower()]
+
+    def latest(self, source_query):
+        postings = [reversed(self.by_source[source]) for source in self.find_sources(source_query)]
+        if len(postings) == 1:
+            doc_ids = postings[0]
+        else:
+            doc_ids = heapq.merge(*postings, key=lambda doc_id: (self.docs[doc_id][0], doc_id), reverse=True)
+        return [self.docs[doc_id] for doc_id in doc_ids]
+
+    def search(self, query):
+        """Items containing every token of query, newest first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        postings = sorted((self._lookup(token) for token in tokens), key=len)
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            matches &= posting
+            if not matches:
+                break
+        return [self.docs[doc_id] for doc_id in self._newest_first(matches)]
+
+    def _lookup(self, token):
+        posting = self.postings.get(token, set())
+        if len(token) == 1 and _CJK_RUN_RE.match(token):
+            # Titles are indexed by bigrams, so a one-character query matches every bigram containing it
+            posting = set(posting)
+            for bigram in self.char_bigrams.get(token, ()):
+                posting |= self.postings[bigram]
+        return posting
+
+    def day(self, date):
+        return [self.docs[doc_id] for doc_id in reversed(self.by_date.get(date, []))]
@@ -0,0 +1,64 @@
+# language_detect.py
+import logging
+import re
+import threading
+
+from config import CJK_MIN_RUN, CJK_RATIO_THRESHOLD, TRANSLATION_OVERRIDES
+
+# CJK Unified Ideographs (+ Extension A, compatibility ideographs and Extension B)
+_CJK_CHARS = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\U00020000-\U0002a6df'
+_NOT_CJK_RE = re.compile(f'[^{_CJK_CHARS}\n]+')
+_NOT_LETTER_RE = re.compile(r'(?:[^\w\n]|[\d_])+')  # Everything except letters and newlines; ideographs are letters
+_CJK_RUN_RE = re.compile(f'[{_CJK_CHARS}]{{{CJK_MIN_RUN},}}')
+
+_stats_lock = threading.Lock()
+_stats = {"checked": 0, "translate": 0, "skipped": 0, "overridden": 0}
+
+
+def cjk_ratios(titles):
+    """Share of letters that are CJK ideographs, for every title in one pass.
+
+    The titles are joined with newlines so each regex runs once over the whole batch;
+    splitting the stripped text back on the newlines gives per-title counts.
+    """
+    if not titles:
+        return []
+    joined = "\n".join(title.replace("\n", " ") for title in titles)
+    cjk_counts = [len(part) for part in _NOT_CJK_RE.sub('', joined).split("\n")]
+    letter_counts = [len(part) for part in _NOT_LETTER_RE.sub('', joined).split("\n")]
+    return [cjk / letters if letters else 0.0 for cjk, letters in zip(cjk_counts, letter_counts)]
+
+
+def needs_translation(titles, sources):
+    """Decide per title whether it has to go to the Translator.
+
+    TRANSLATION_OVERRIDES pins a site to always (True) or never (False) translate;
+    everything else is translated when its CJK ratio reaches CJK_RATIO_THRESHOLD or it
+    holds a run of CJK_MIN_RUN ideographs, so mostly-English titles with Chinese words go too.
+    """
+    decisions = []
+    overridden = 0
+    for title, source, ratio in zip(titles, sources, cjk_ratios(titles)):
+        override = TRANSLATION_OVERRIDES.get(source)
+        if override is not None:
+            overridden += 1
+            decisions.append(override)
+        else:
+            decisions.append(ratio >= CJK_RATIO_THRESHOLD or _CJK_RUN_RE.search(title) is not None)
+
+    translate = sum(decisions)
+    with _stats_lock:
+        _stats["checked"] += len(decisions)
+        _stats["translate"] += translate
+        _stats["skipped"] += len(decisions) - translate
+        _stats["overridden"] += overridden
+    return decisions
+
+
+def report():
+    """Log and return how many titles were classified and how many Translator calls that avoided."""
+    with _stats_lock:
+        stats = dict(_stats)
+    logging.info(f"Language detection: {stats['checked']} titles checked, {stats['translate']} sent for translation, "
+                 f"{stats['skipped']} already English (calls avoided), {stats['overridden']} decided by site override")
+    return stats
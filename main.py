@@ -5,15 +5,25 @@ from datetime import datetime
 from telegram import Bot
 from telegram.error import InvalidToken, TelegramError
 import concurrent.futures # To manage the executor for synchronous tasks
+import argparse
 import os
 
 # Import functions and config from our modules
 import config
-from data_manager import load_previous_data, save_data
+from data_manager import load_previous_data, save_data, add_headlines
 from scraper import scrape_site
-from notifier import prepare_telegram_messages, send_telegram_messages
+from translator import translate_items, fill_pending_translations
+from translation_cache import get_translation_cache
+from translation_memory import build_translation_memory
+import language_detect
+from pipeline import TranslationPipeline
+from notifier import prepare_telegram_messages, deliver_outbox
+from outbox import Outbox
+from digest import DigestStore, split_priority_items
+from subscriptions import load_subscriptions
 from page_generator import PageGenerator
 from git_manager import GitManager
+from metrics import get_metrics
 
 # Configure logging (do this once at the entry point)
 # Includes module name in the log format for better context
@@ -27,6 +37,11 @@ async def main_async():
     """Main asynchronous function to run the scraper and notifier."""
     logging.info("Starting scraper process...")
 
+    # In change-aware publishing the data files live on their own branch
+    git_manager = GitManager() if config.GIT_PUBLISH_MODE == 'changes' else None
+    if git_manager:
+        git_manager.restore_data_files()
+
     # Load previous data and debug
     data = load_previous_data()
     processed_urls = data.get('processed_urls', set())
@@ -47,7 +62,7 @@ async def main_async():
 
         # --- Initialize Bot ---
         try:
-            bot = Bot(token=config.TELEGRAM_TOKEN)
+            bot = Bot(token=config.TELEGRAM_TOKEN, base_url=config.TELEGRAM_API_BASE_URL)
             await bot.get_me()
             logging.info("Telegram Bot initialized successfully.")
         except InvalidToken:
@@ -69,6 +84,23 @@ async def main_async():
 
     # --- Load Data and Scrape ---
     data = load_previous_data()
+
+    subscriptions = load_subscriptions()
+    digest_store = DigestStore() if config.DIGEST_MODE else None
+
+    # Finish any deliveries an earlier run left behind before doing new work
+    outbox = Outbox()
+    outbox.recover(data.get("processed_urls", set()))
+    if bot:
+        await deliver_outbox(bot, outbox)
+
+    # Seed an empty translation cache from the translations we already have
+    translation_cache = get_translation_cache()
+    if translation_cache.size == 0:
+        translation_cache.warm_from_headlines(data)
+    # Learn slot templates for formulaic titles so they can be filled without an API call
+    translation_memory = build_translation_memory(data)
+
     # Ensure processed_urls is a set for efficient lookups during scraping
     processed_urls_set = set(data.get("processed_urls", []))
     all_new_items_by_site = {} # Store results grouped by site name {site_name: [item1, item2]}
@@ -78,9 +110,13 @@ async def main_async():
     loop = asyncio.get_running_loop()
     tasks = [] # List to hold awaitable tasks/futures
 
+    # Translation runs as its own stage: scrapers hand every new item to the pipeline's
+    # bounded queue and keep fetching while separate workers translate in batches
+    translation_pipeline = TranslationPipeline().start()
+
     # Use loop.run_in_executor to run the synchronous scrape_site concurrently
     # Use a ThreadPoolExecutor to run blocking I/O (like requests) without blocking the event loop
-    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor: # Adjust max_workers as needed
+    with concurrent.futures.ThreadPoolExecutor(max_workers=config.SCRAPER_WORKERS) as executor:
         for name, url in config.WEBSITES.items():
             # Schedule the synchronous function 'scrape_site' to run in the executor
             # Pass arguments to scrape_site after the function itself
@@ -90,7 +126,8 @@ async def main_async():
                 scrape_site,           # The synchronous function to run
                 name,                  # Argument 1 for scrape_site
                 url,                   # Argument 2 for scrape_site
-                processed_urls_set     # Argument 3 for scrape_site (passed as reference, modifications within threads need care if not using thread-safe types, but set.add is generally safe)
+                processed_urls_set,    # Argument 3 for scrape_site (passed as reference, modifications within threads need care if not using thread-safe types, but set.add is generally safe)
+                translation_pipeline.submit # Argument 4: emit new items to the translation stage
             )
             tasks.append((name, future)) # Store site name with the future
 
@@ -100,6 +137,13 @@ async def main_async():
         results = await asyncio.gather(*(future for _, future in tasks), return_exceptions=True)
         logging.info("Scraping tasks finished.")
 
+    # Let the translation stage drain everything the scrapers emitted
+    await loop.run_in_executor(None, translation_pipeline.close)
+    logging.info("Translation stage finished.")
+
+    # Give titles left pending by earlier (throttled or failed) runs another chance
+    await loop.run_in_executor(None, fill_pending_translations, data)
+
     # Process results from asyncio.gather
     for i, result in enumerate(results):
         name, _ = tasks[i] # Get the site name corresponding to the result index
@@ -141,32 +185,49 @@ async def main_async():
         
         # Only add items that aren't already in today's headlines
         new_items_to_add = [item for item in flat_new_items if item['url'] not in existing_urls]
+
+        # Safety net: translate anything the pipeline never got to
+        await loop.run_in_executor(None, translate_items,
+                                   [item for item in new_items_to_add if item['english_title'] is None])
         
         if new_items_to_add:
             # Append only new items found in this run to today's list
-            data["headlines"][today_str].extend(new_items_to_add)
+            add_headlines(data, today_str, new_items_to_add)
             logging.info(f"Added {len(new_items_to_add)} new items to today's headlines (filtered {len(flat_new_items) - len(new_items_to_add)} duplicates)")
         else:
             logging.info("No new unique items to add to today's headlines")
 
-        data["processed_urls"] = list(processed_urls_set)
-        data["last_run"] = timestamp_str
-        save_data(data)
-        logging.info("Saved updated data to headlines.json")
-
         # Skip Telegram messages in URL collection mode
+        run_id = None
         if not os.getenv('URL_COLLECTION_MODE'):
             if new_items_to_add:  # Only send messages if we have new unique items
                 logging.info(f"Preparing {len(new_items_to_add)} new updates for Telegram...")
-                messages_to_send = await prepare_telegram_messages({site: [item for item in items if item in new_items_to_add] 
-                                                                for site, items in all_new_items_by_site.items()})
-                await send_telegram_messages(bot, config.TELEGRAM_CHAT_ID, messages_to_send)
+                new_items_by_site = {site: [item for item in items if item in new_items_to_add]
+                                     for site, items in all_new_items_by_site.items()}
+                if config.DIGEST_MODE:
+                    # Only priority sources go out now; everything else waits for the digest
+                    new_items_by_site, queued_items_by_site = split_priority_items(new_items_by_site)
+                    digest_store.add([item for items in queued_items_by_site.values() for item in items])
+                # Each subscriber gets its own filtered, packed messages
+                items_by_chat = subscriptions.route(new_items_by_site)
+                messages_by_chat = {chat_id: await prepare_telegram_messages(items_by_site)
+                                    for chat_id, items_by_site in items_by_chat.items()}
+                # Stage the parts durably before the items are marked processed
+                run_id = timestamp_str
+                outbox.stage(run_id, messages_by_chat)
             else:
                 logging.info("No new unique items to send to Telegram")
         else:
             logging.info("Running in URL collection mode - skipping Telegram messages")
             logging.info(f"Total processed URLs: {len(processed_urls_set)}")
 
+        data["processed_urls"] = list(processed_urls_set)
+        data["last_run"] = timestamp_str
+        if save_data(data):
+            logging.info("Saved updated data to headlines.json")
+            if run_id:
+                outbox.commit_run(run_id)  # The items are on disk; their parts may now go out
+
     else:
         logging.info("No new items found across all websites during this run.")
         # Update last run time and save processed URLs even if no news
@@ -175,6 +236,24 @@ async def main_async():
         data["processed_urls"] = list(processed_urls_set) # Save updated set
         save_data(data)
 
+    # --- Scheduled digest ---
+    if config.DIGEST_MODE and bot and digest_store.due():
+        digest_items_by_site, pending_count = digest_store.build()
+        if digest_items_by_site:
+            heading = f"<b>🗞 Daily digest</b> ({pending_count} updates since the last digest)\n\n"
+            items_by_chat = subscriptions.route(digest_items_by_site)
+            messages_by_chat = {chat_id: await prepare_telegram_messages(items_by_site, heading=heading)
+                                for chat_id, items_by_site in items_by_chat.items()}
+            digest_run_id = f"digest-{datetime.now().isoformat()}"
+            outbox.stage(digest_run_id, messages_by_chat)
+            outbox.commit_run(digest_run_id)
+        digest_store.mark_emitted(sent_items=[item for items in digest_items_by_site.values() for item in items])
+
+    # Deliver this run's parts (and anything still queued), acking each one as it is sent
+    if bot:
+        await deliver_outbox(bot, outbox)
+    outbox.purge()
+
     # After saving data, generate the HTML pages - do this regardless of URL collection mode
     try:
         page_generator = PageGenerator()
@@ -194,14 +273,32 @@ async def main_async():
     except Exception as e:
         logging.error(f"Failed to generate HTML pages: {e}", exc_info=True)
 
+    if git_manager:
+        git_manager.publish_changes()
+
+    translation_cache.report()
+    translation_memory.report()
+    language_detect.report()
+    get_metrics().write_report()
+    get_metrics().write_prometheus()
     logging.info("Script finished.")
 
 
 def main():
     """Synchronous entry point."""
+    parser = argparse.ArgumentParser(description="Scrape, translate, notify and publish one run.")
+    parser.add_argument("--profile", action="store_true", default=config.PROFILE,
+                        help="profile the run (cProfile, tracemalloc) into PROFILE_DIR")
+    parser.add_argument("--profile-tasks", action="store_true", default=config.PROFILE_ASYNCIO_TASKS,
+                        help="with --profile, also time every asyncio task")
+    args = parser.parse_args()
     try:
-        # Use asyncio.run() which handles the event loop lifecycle cleanly
-        asyncio.run(main_async())
+        if args.profile:
+            from profiler import RunProfiler  # Only imported when profiling, so normal runs pay nothing
+            RunProfiler(task_timing=args.profile_tasks).run(main_async)
+        else:
+            # Use asyncio.run() which handles the event loop lifecycle cleanly
+            asyncio.run(main_async())
     except KeyboardInterrupt:
          logging.info("Script interrupted by user.")
          # Perform any necessary cleanup here if needed
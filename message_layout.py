@@ -0,0 +1,145 @@
+# message_layout.py
+import html
+import logging
+import re
+
+from config import MAX_MESSAGE_LENGTH
+
+_TAG_RE = re.compile(r'<[^>]+>')
+SECTION_SEPARATOR = "\n\n"
+
+
+def telegram_length(text):
+    """Length as Telegram counts it: UTF-16 code units of the text left after HTML entity parsing."""
+    visible = html.unescape(_TAG_RE.sub('', text))
+    return len(visible.encode('utf-16-le')) // 2
+
+
+class Fragment:
+    """A piece of message text with its Telegram length measured once."""
+
+    __slots__ = ("text", "length")
+
+    def __init__(self, text):
+        self.text = text
+        self.length = telegram_length(text)
+
+
+def site_header(site_name, continuation=False):
+    suffix = " (cont.)" if continuation else ""
+    return Fragment(f"<b>📰 Updates from {html.escape(site_name)}{suffix}</b>\n\n")
+
+
+def item_fragment(item):
+    if item['english_title'] == item['chinese_title']:
+        return Fragment(
+            f"• <b>{html.escape(item['english_title'])}</b>\n"
+            f"  <a href='{html.escape(item['url'])}'>Read more</a>\n\n"
+        )
+    return Fragment(
+        f"• <b>{html.escape(item['english_title'])}</b>\n"
+        f"  ({html.escape(item['chinese_title'])})\n"
+        f"  <a href='{html.escape(item['url'])}'>Read more</a>\n\n"
+    )
+
+
+class Section:
+    """A site header followed by some of that site's items; always kept together in one part."""
+
+    def __init__(self, order, header, fragments):
+        self.order = order  # (site index, chunk index) - restores reading order inside a part
+        self.header = header
+        self.fragments = fragments
+        self.length = header.length + sum(f.length for f in fragments)
+
+    def render(self):
+        return self.header.text + "".join(f.text for f in self.fragments)
+
+
+class Part:
+    def __init__(self):
+        self.sections = []
+        self.length = 0
+
+    def room_for(self, section, capacity):
+        separator = len(SECTION_SEPARATOR) if self.sections else 0
+        return self.length + separator + section.length <= capacity
+
+    def add(self, section):
+        if self.sections:
+            self.length += len(SECTION_SEPARATOR)
+        self.sections.append(section)
+        self.length += section.length
+
+    def render(self):
+        return SECTION_SEPARATOR.join(s.render() for s in sorted(self.sections, key=lambda s: s.order))
+
+
+def _split_site(site_index, site_name, fragments, capacity):
+    """Cut a site into sections that each fit a part.
+
+    Items are peeled off the end into full "(cont.)" parts until what is left fits;
+    that leading section keeps the normal header and is the only one that still needs
+    packing. Returns (leading section, list of full continuation sections in order).
+    """
+    header = site_header(site_name)
+    cont_header = site_header(site_name, continuation=True)
+    remaining = list(fragments)
+    tail_sections = []
+    while remaining and header.length + sum(f.length for f in remaining) > capacity:
+        chunk, used = [], cont_header.length
+        while remaining and used + remaining[-1].length <= capacity:
+            used += remaining[-1].length
+            chunk.append(remaining.pop())
+        chunk.reverse()
+        tail_sections.append(chunk)
+    tail_sections.reverse()
+    if not remaining and tail_sections:
+        remaining = tail_sections.pop(0)  # Everything was peeled off; the first chunk takes the normal header
+    continuation = [Section((site_index, n + 1), cont_header, chunk) for n, chunk in enumerate(tail_sections)]
+    return Section((site_index, 0), header, remaining), continuation
+
+
+def pack_messages(items_by_site, capacity=MAX_MESSAGE_LENGTH):
+    """Lay items out into as few message parts as possible, grouped by site.
+
+    Every item fragment is built and measured once. Sites too large for one part are
+    split into full continuation parts, then the remaining site sections are packed
+    first-fit decreasing, so small sites fill the gaps left by large ones instead of
+    each forcing a new part.
+    """
+    leading, full_parts = [], []
+    for site_index, (site_name, items) in enumerate(items_by_site.items()):
+        cont_header = site_header(site_name, continuation=True)
+        fragments = []
+        for item in items:
+            fragment = item_fragment(item)
+            if cont_header.length + fragment.length > capacity:
+                logging.warning(f"Single item too long ({fragment.length} chars), skipping: {item['url']}")
+                continue
+            fragments.append(fragment)
+        if not fragments:
+            continue
+
+        section, continuation = _split_site(site_index, site_name, fragments, capacity)
+        if section.fragments:
+            leading.append(section)
+        for cont_section in continuation:
+            part = Part()
+            part.add(cont_section)
+            full_parts.append(part)
+
+    parts = []
+    for section in sorted(leading, key=lambda s: s.length, reverse=True):
+        for part in parts:
+            if part.room_for(section, capacity):
+                part.add(section)
+                break
+        else:
+            part = Part()
+            part.add(section)
+            parts.append(part)
+
+    parts.extend(full_parts)
+    parts.sort(key=lambda p: min(s.order for s in p.sections))
+    return [part.render() for part in parts]
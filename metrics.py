@@ -0,0 +1,198 @@
+# metrics.py
+"""Run instrumentation: named timers, counters and gauges with optional labels (e.g. site=...).
+
+    with get_metrics().timer("scrape_fetch", site=site_name): ...
+    get_metrics().inc("scrape_bytes", len(body), site=site_name)
+    get_metrics().set("pipeline_queue_depth_max", depth, stage=name)
+
+    @timed("save_data")
+    def save_data(...): ...
+
+At the end of a run, write_report() saves a JSON summary (per-stage and per-site figures)
+and write_prometheus() a node_exporter textfile-collector file.
+"""
+import functools
+import inspect
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import METRICS_PREFIX, METRICS_TEXTFILE, RUN_REPORT_FILE
+
+
+class Metrics:
+    """Thread-safe registry; scrapers and translation workers record into it concurrently."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.timers = {}    # (name, labels) -> [count, total seconds, max seconds]
+        self.counters = {}  # (name, labels) -> value
+        self.gauges = {}    # (name, labels) -> last value set
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            timer = self.timers.setdefault(key, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the block; the time is recorded even if it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.gauges[key] = value
+
+    def report(self):
+        """Per-stage timers, per-site figures and every counter and gauge, as plain dicts."""
+        with self.lock:
+            timers = dict(self.timers)
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        finished = time.time()
+        stages, sites, other = {}, {}, []
+        for (name, labels), (count, total, longest) in sorted(timers.items()):
+            labels = dict(labels)
+            site = labels.pop('site', None)
+            figures = {"count": count, "total_seconds": round(total, 4), "max_seconds": round(longest, 4)}
+            if site is not None and not labels:
+                sites.setdefault(site, {})[f"{name}_seconds"] = round(total, 4)
+            else:
+                stages[name + ''.join(f"[{k}={v}]" for k, v in sorted(labels.items()))] = figures
+        for (name, labels), value in sorted(counters.items()):
+            labels = dict(labels)
+            site = labels.pop('site', None)
+            if site is not None and not labels:
+                sites.setdefault(site, {})[name] = value
+            else:
+                other.append({"name": name, "labels": labels, "value": value})
+        return {
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            "finished": datetime.fromtimestamp(finished).isoformat(timespec='seconds'),
+            "duration_seconds": round(finished - self.started, 3),
+            "stages": stages,
+            "sites": sites,
+            "counters": other,
+            "gauges": [{"name": name, "labels": dict(labels), "value": value}
+                       for (name, labels), value in sorted(gauges.items())],
+        }
+
+    def write_report(self, path=RUN_REPORT_FILE):
+        _atomic_write(path, json.dumps(self.report(), ensure_ascii=False, indent=2))
+        logging.info(f"Wrote run report to {path}")
+
+    def write_prometheus(self, path=METRICS_TEXTFILE):
+        """Timers become the summary <prefix>_<name>_seconds (_sum and _count samples) and the
+        gauge <prefix>_<name>_seconds_max; counters become <prefix>_<name>_total and gauges
+        <prefix>_<name>.
+
+        Each family's samples follow its # TYPE line together, as the text format requires.
+        """
+        with self.lock:
+            timers = dict(self.timers)
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        lines = []
+
+        def family(metric, kind, samples):
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.extend(f"{sample}{_labels(labels)} {value}" for sample, labels, value in samples)
+
+        for name, series in _by_name(timers):
+            base = f"{METRICS_PREFIX}_{_metric_name(name)}_seconds"
+            summary = []
+            for labels, (count, total, _) in series:
+                summary += [(f"{base}_sum", labels, f"{total:.6f}"), (f"{base}_count", labels, count)]
+            family(base, "summary", summary)
+            family(f"{base}_max", "gauge", [(f"{base}_max", labels, f"{longest:.6f}") for labels, (_, _, longest) in series])
+        for name, series in _by_name(counters):
+            metric = f"{METRICS_PREFIX}_{_metric_name(name)}_total"
+            family(metric, "counter", [(metric, labels, value) for labels, value in series])
+        for name, series in _by_name(gauges):
+            metric = f"{METRICS_PREFIX}_{_metric_name(name)}"
+            family(metric, "gauge", [(metric, labels, value) for labels, value in series])
+        for metric, value in (("run_duration_seconds", f"{time.time() - self.started:.3f}"),
+                              ("run_finished_timestamp_seconds", int(time.time()))):
+            family(f"{METRICS_PREFIX}_{metric}", "gauge", [(f"{METRICS_PREFIX}_{metric}", (), value)])
+        _atomic_write(path, '\n'.join(lines) + '\n')
+        logging.info(f"Wrote Prometheus metrics to {path}")
+
+
+def _by_name(entries):
+    """[(name, [(labels, value), ...]), ...] from a {(name, labels): value} registry, sorted."""
+    grouped = {}
+    for (name, labels), value in sorted(entries.items()):
+        grouped.setdefault(name, []).append((labels, value))
+    return list(grouped.items())
+
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{_metric_name(key)}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _atomic_write(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(path + '.tmp', path)
+
+
+_metrics = None
+
+
+def get_metrics():
+    """Return the process-wide registry."""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
+
+
+def timed(name, **labels):
+    """Decorator timing every call of a function or coroutine function under `name`."""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with get_metrics().timer(name, **labels):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_metrics().timer(name, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -1,15 +1,25 @@
 # notifier.py
 import asyncio
 import logging
-import html
 from telegram import Bot
 from telegram.constants import ParseMode
 from telegram.error import TelegramError, BadRequest, RetryAfter
 
-from config import MAX_MESSAGE_LENGTH
+from config import MAX_MESSAGE_LENGTH, TELEGRAM_MAX_RETRIES, TELEGRAM_RETRY_BASE_DELAY
+from message_layout import pack_messages, telegram_length
+from metrics import get_metrics, timed
+from rate_limiter import get_rate_limiter, retry_after_seconds
 
-async def prepare_telegram_messages(items_by_site):
-    """Prepares messages grouped by site, split to fit Telegram's limits."""
+# Outcomes of send_message_part
+SENT = "sent"            # Telegram accepted the part
+REJECTED = "rejected"    # Telegram refused it for good (e.g. BadRequest); retrying will not help
+DEFERRED = "deferred"    # Retries ran out on transient errors; worth trying again later
+
+async def prepare_telegram_messages(items_by_site, heading=None):
+    """Prepares messages grouped by site, split to fit Telegram's limits.
+
+    An optional heading (HTML) is put in front of the first part, or sent as its own part if it does not fit.
+    """
     if not items_by_site:
         logging.info("No new items found across all sites to prepare message.")
         return ["ℹ️ No new content found today."]
@@ -35,167 +45,97 @@ async def prepare_telegram_messages(items_by_site):
         logging.info("No unique items found after deduplication.")
         return ["ℹ️ No new unique content found today."]
 
-    messages = []
-    current_message = ""
-    site_needs_continuation_header = {}  # Track if a site got split {site_name: True}
-
-    for site_name, items in deduplicated_items_by_site.items():
-        # Determine header: Base or Continuation
-        safe_site_name = html.escape(site_name)
-        header_base = f"<b>📰 Updates from {safe_site_name}</b>\n\n"
-        header_cont = f"<b>📰 Updates from {safe_site_name} (cont.)</b>\n\n"
-
-        # Decide if we need the continuation header for *this* site
-        is_continuation = site_needs_continuation_header.get(site_name, False)
-        site_header = header_cont if is_continuation else header_base
-
-        # Check if the header *itself* fits in a new message (edge case)
-        if len(site_header) > MAX_MESSAGE_LENGTH:
-            logging.warning(f"Site header for '{site_name}' is too long ({len(site_header)} chars). Skipping site.")
-            continue
-
-        # Check if adding the header to the current message exceeds the limit
-        if current_message and len(current_message) + len(site_header) > MAX_MESSAGE_LENGTH:
-            messages.append(current_message)  # Finalize previous message
-            current_message = site_header  # Start new message with header
-            site_needs_continuation_header = {site_name: False}  # Reset continuation flags
-        else:
-            # Add header (either to empty message or existing one)
-            if not current_message:
-                current_message = site_header
-            else:
-                separator = "\n\n"
-                if len(current_message) + len(separator) + len(site_header) <= MAX_MESSAGE_LENGTH:
-                    current_message += separator + site_header
-                else:
-                    messages.append(current_message)
-                    current_message = site_header
-                    site_needs_continuation_header = {site_name: False}
-
-            site_needs_continuation_header[site_name] = False
-
-        # Add items for this site
-        for item in items:
-            # First check if titles are the same
-            if item['english_title'] == item['chinese_title']:
-                item_text = (
-                    f"• <b>{html.escape(item['english_title'])}</b>\n"
-                    f"  <a href='{html.escape(item['url'])}'>Read more</a>\n\n"
-                )
-            else:
-                item_text = (
-                    f"• <b>{html.escape(item['english_title'])}</b>\n"
-                    f"  ({html.escape(item['chinese_title'])})\n"
-                    f"  <a href='{html.escape(item['url'])}'>Read more</a>\n\n"
-                )
-
-            # Check if item_text itself is too large
-            if len(item_text) > MAX_MESSAGE_LENGTH:
-                logging.warning(f"Single item too long ({len(item_text)} chars), skipping: {item['url']}")
-                continue
-
-            # Check if adding this item exceeds the limit
-            if len(current_message) + len(item_text) > MAX_MESSAGE_LENGTH:
-                messages.append(current_message)
-                current_message = header_cont + item_text
-                site_needs_continuation_header[site_name] = True
-                
-                for other_site in site_needs_continuation_header:
-                    if other_site != site_name:
-                        site_needs_continuation_header[other_site] = False
-
-                if len(current_message) > MAX_MESSAGE_LENGTH:
-                    logging.warning(f"Item too long even with continuation header ({len(current_message)} chars). Sending header and item separately for {item['url']}")
-                    messages.append(header_cont)
-                    if len(item_text) <= MAX_MESSAGE_LENGTH:
-                        messages.append(item_text)
-                    else:
-                        logging.error(f"Cannot send item as it exceeds max length: {item['url']}")
-                    current_message = ""
-            else:
-                current_message += item_text
-
-    # Add the last remaining message if it's not empty
-    if current_message.strip():
-        messages.append(current_message)
+    messages = pack_messages(deduplicated_items_by_site)
 
     if not messages:
         logging.info("Prepared messages list is empty after processing items.")
         return ["ℹ️ No new content found today that could be formatted."]
 
+    if heading:
+        if telegram_length(heading + messages[0]) <= MAX_MESSAGE_LENGTH:
+            messages[0] = heading + messages[0]
+        else:
+            messages.insert(0, heading)
+
     logging.info(f"Prepared {len(messages)} message parts for Telegram.")
     return messages
 
 
-async def send_telegram_messages(bot: Bot, chat_id: str, messages: list):
-    """Sends a list of messages to Telegram, handling potential errors and rate limits."""
-    if not messages:
-        logging.info("No messages to send.")
+async def send_message_part(bot: Bot, chat_id: str, message: str, label: str, limiter=None):
+    """Sends one message part under the rate limiter, retrying transient errors.
+
+    Returns SENT, REJECTED or DEFERRED.
+    """
+    limiter = limiter or get_rate_limiter()
+    retry_count = 0
+    while retry_count < TELEGRAM_MAX_RETRIES:
+        await limiter.acquire(chat_id)
         try:
+            logging.info(f"Sending {label} to {chat_id} ({len(message)} chars)")
             await bot.send_message(
                 chat_id=chat_id,
-                text="No new headline",
+                text=message,
                 parse_mode=ParseMode.HTML,
                 disable_web_page_preview=True
             )
-            logging.debug("Successfully sent 'No new headline' message.")
+            logging.debug(f"Successfully sent {label}")
+            return SENT
+
+        except RetryAfter as e:
+            retry_after = retry_after_seconds(e)
+            logging.warning(f"Rate limit hit for {label}, holding chat {chat_id} for {retry_after} seconds")
+            limiter.retry_after(chat_id, retry_after)
+            get_metrics().inc("telegram_retry_after")
+            retry_count += 1
+
         except BadRequest as e:
-            logging.error(f"Telegram Bad Request error sending 'No new headline': {e}")
+            logging.error(f"Telegram Bad Request error sending {label}: {e}. Message length: {len(message)}")
+            logging.debug(f"Failed message content (first 500 chars): {message[:500]}...")
+            return REJECTED  # Don't retry on bad requests
+
         except TelegramError as e:
-            logging.error(f"Telegram API error sending 'No new headline': {e}")
+            wait_time = TELEGRAM_RETRY_BASE_DELAY * (2 ** retry_count)  # Exponential backoff
+            logging.error(f"Telegram API error sending {label}: {e}. Retrying in {wait_time} seconds...")
+            await asyncio.sleep(wait_time)
+            retry_count += 1
+
         except Exception as e:
-            logging.error(f"Unexpected error sending 'No new headline': {e}", exc_info=True)
-        return
-
-    base_delay = 2  # Base delay between messages in seconds
-    max_retries = 5  # Maximum number of retries per message
-
-    for i, message in enumerate(messages, 1):
-        if not message or message.isspace():
-            logging.warning(f"Skipping empty message part {i}/{len(messages)}.")
-            continue
-
-        retry_count = 0
-        while retry_count < max_retries:
-            try:
-                logging.info(f"Sending message part {i}/{len(messages)} ({len(message)} chars)")
-                await bot.send_message(
-                    chat_id=chat_id,
-                    text=message,
-                    parse_mode=ParseMode.HTML,
-                    disable_web_page_preview=True
-                )
-                logging.debug(f"Successfully sent message part {i}")
-                
-                # Add a longer delay between messages to avoid rate limits
-                if len(messages) > 1 and i < len(messages):
-                    await asyncio.sleep(base_delay)
-                break  # Message sent successfully, exit retry loop
-
-            except RetryAfter as e:
-                retry_after = int(str(e).split()[-2])  # Extract retry seconds from error
-                logging.warning(f"Rate limit hit for part {i}, waiting {retry_after} seconds")
-                await asyncio.sleep(retry_after)
-                retry_count += 1
-                continue
-
-            except BadRequest as e:
-                logging.error(f"Telegram Bad Request error sending part {i}: {e}. Message length: {len(message)}")
-                logging.debug(f"Failed message content (first 500 chars): {message[:500]}...")
-                break  # Don't retry on bad requests
-
-            except TelegramError as e:
-                wait_time = base_delay * (2 ** retry_count)  # Exponential backoff
-                logging.error(f"Telegram API error sending part {i}: {e}. Retrying in {wait_time} seconds...")
-                await asyncio.sleep(wait_time)
-                retry_count += 1
-                if retry_count >= max_retries:
-                    logging.error(f"Failed to send message part {i} after {max_retries} retries")
-
-            except Exception as e:
-                logging.error(f"Unexpected error sending Telegram message part {i}: {e}", exc_info=True)
-                break  # Don't retry on unexpected errors
-
-        # Add additional delay after retries
-        if retry_count > 0 and i < len(messages):
-            await asyncio.sleep(base_delay * 2)
\ No newline at end of file
+            logging.error(f"Unexpected error sending Telegram {label}: {e}", exc_info=True)
+            return DEFERRED  # Don't retry on unexpected errors now; leave it for a later attempt
+
+    logging.error(f"Failed to send {label} after {TELEGRAM_MAX_RETRIES} retries")
+    return DEFERRED
+
+
+@timed("deliver_outbox")
+async def deliver_outbox(bot: Bot, outbox, limiter=None):
+    """Sends every deliverable outbox part, acking each one as soon as Telegram accepts it.
+
+    Chats are served concurrently. Within a chat, delivery stops at the first part that
+    could not be sent for a transient reason, so the next run resumes in order from there.
+    Returns the number of parts delivered.
+    """
+    limiter = limiter or get_rate_limiter()
+    pending = outbox.pending()
+    if not pending:
+        return 0
+    logging.info(f"Delivering {sum(len(parts) for parts in pending.values())} outbox parts to {len(pending)} chats")
+
+    async def deliver_chat(chat_id, parts):
+        sent = 0
+        for n, (part_id, text) in enumerate(parts, 1):
+            status = await send_message_part(bot, chat_id, text, f"outbox part {n}/{len(parts)}", limiter)
+            get_metrics().inc("telegram_parts", status=status)
+            if status == SENT:
+                outbox.ack(part_id)
+                sent += 1
+            elif status == REJECTED:
+                outbox.fail(part_id, permanent=True)
+            else:
+                outbox.fail(part_id)
+                logging.warning(f"Pausing delivery to {chat_id}; {len(parts) - n + 1} parts stay queued for the next run")
+                break
+        return sent
+
+    results = await asyncio.gather(*(deliver_chat(chat_id, parts) for chat_id, parts in pending.items()))
+    return sum(results)
@@ -0,0 +1,118 @@
+# outbox.py
+import html
+import json
+import logging
+import re
+import sqlite3
+import time
+
+from config import OUTBOX_FILE, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETENTION_DAYS
+from data_manager import normalize_url
+
+_HREF_RE = re.compile(r"href='([^']*)'")
+
+# Part lifecycle: staged -> ready -> sent (or failed after too many attempts / a permanent error)
+STAGED, READY, SENT, FAILED = "staged", "ready", "sent", "failed"
+
+
+class Outbox:
+    """Durable queue of prepared Telegram message parts, stored in SQLite.
+
+    Parts are staged before headlines.json is saved and only become deliverable
+    once the run's data is safely on disk (commit_run). If the process dies in
+    between, recover() decides from the saved processed URLs whether the staged
+    parts belong to data that was saved (deliver them) or not (drop them; the
+    items will be scraped and staged again). Each part is acked as soon as
+    Telegram accepts it, so a resumed run never re-sends it.
+    """
+
+    def __init__(self, path=OUTBOX_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS parts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL,
+                chat_id TEXT NOT NULL,
+                text TEXT NOT NULL,
+                urls TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_parts_status ON parts (status, chat_id, id)")
+        self.conn.commit()
+
+    def stage(self, run_id, messages_by_chat):
+        """Durably record this run's parts; they are not delivered until commit_run(run_id)."""
+        now = time.time()
+        rows = []
+        for chat_id, messages in messages_by_chat.items():
+            for text in messages:
+                if not text or text.isspace():
+                    continue
+                urls = [html.unescape(url) for url in _HREF_RE.findall(text)]
+                rows.append((run_id, str(chat_id), text, json.dumps(urls), STAGED, now, now))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO parts (run_id, chat_id, text, urls, status, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        logging.info(f"Staged {len(rows)} message parts in outbox for run {run_id}")
+        return len(rows)
+
+    def commit_run(self, run_id):
+        with self.conn:
+            self.conn.execute("UPDATE parts SET status = ?, updated = ? WHERE run_id = ? AND status = ?",
+                              (READY, time.time(), run_id, STAGED))
+
+    def recover(self, processed_urls):
+        """Settle parts staged by a run that crashed before commit_run."""
+        staged = self.conn.execute("SELECT id, urls FROM parts WHERE status = ?", (STAGED,)).fetchall()
+        if not staged:
+            return
+        normalized = {normalize_url(url) for url in processed_urls}
+        promote, drop = [], []
+        for part_id, urls in staged:
+            saved = all(normalize_url(url) in normalized for url in json.loads(urls))
+            (promote if saved else drop).append((part_id,))
+        with self.conn:
+            self.conn.executemany(f"UPDATE parts SET status = '{READY}' WHERE id = ?", promote)
+            self.conn.executemany("DELETE FROM parts WHERE id = ?", drop)
+        logging.warning(f"Recovered outbox after an interrupted run: {len(promote)} parts queued for delivery, "
+                        f"{len(drop)} dropped because their items were never saved")
+
+    def pending(self):
+        """Deliverable parts as {chat_id: [(part_id, text), ...]} in send order."""
+        pending = {}
+        for part_id, chat_id, text in self.conn.execute(
+                "SELECT id, chat_id, text FROM parts WHERE status = ? ORDER BY chat_id, id", (READY,)):
+            pending.setdefault(chat_id, []).append((part_id, text))
+        return pending
+
+    def ack(self, part_id):
+        with self.conn:
+            self.conn.execute("UPDATE parts SET status = ?, updated = ? WHERE id = ?", (SENT, time.time(), part_id))
+
+    def fail(self, part_id, permanent=False):
+        """Count a failed attempt; the part is retired after a permanent error or OUTBOX_MAX_ATTEMPTS."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE parts SET attempts = attempts + 1, updated = ?, "
+                "status = CASE WHEN ? OR attempts + 1 >= ? THEN ? ELSE status END WHERE id = ?",
+                (time.time(), permanent, OUTBOX_MAX_ATTEMPTS, FAILED, part_id)
+            )
+
+    def purge(self):
+        """Forget delivered and failed parts older than OUTBOX_RETENTION_DAYS."""
+        cutoff = time.time() - OUTBOX_RETENTION_DAYS * 86400
+        with self.conn:
+            deleted = self.conn.execute("DELETE FROM parts WHERE status IN (?, ?) AND updated < ?",
+                                        (SENT, FAILED, cutoff)).rowcount
+        if deleted:
+            logging.info(f"Purged {deleted} old parts from outbox")
+
+    def close(self):
+        self.conn.close()
@@ -1,10 +1,21 @@
+import filecmp
+import hashlib
 import json
 import os
-from datetime import datetime
-from jinja2 import Environment, FileSystemLoader
+from datetime import datetime, timezone
+from jinja2 import Environment, FileSystemBytecodeCache
 import pytz
 import logging
 
+from assets import MinifyingLoader, build_css_asset, precompress
+from config import (JINJA_BYTECODE_CACHE_DIR, RENDER_BUFFER_SIZE, SITE_INDEX_DAYS, SITE_MANIFEST_FILE,
+                    SOURCE_PAGE_ITEMS, WEBSITES)
+from data_manager import ensure_groups
+from feeds import FeedWriter, slugify
+from metrics import timed
+from render_scheduler import run_jobs
+from search_index import update_search_index
+
 class PageGenerator:
     def __init__(self, docs_dir='docs'):
         self.docs_dir = docs_dir
@@ -17,61 +28,253 @@ class PageGenerator:
         with open(os.path.join(self.docs_dir, '.nojekyll'), 'w') as f:
             pass
         
-        # Setup Jinja2 environment
-        self.env = Environment(loader=FileSystemLoader(self.template_dir))
+        # Setup Jinja2 environment; compiled templates are kept on disk so later runs skip compilation
+        os.makedirs(JINJA_BYTECODE_CACHE_DIR, exist_ok=True)
+        self.env = Environment(loader=MinifyingLoader(self.template_dir),
+                               bytecode_cache=FileSystemBytecodeCache(JINJA_BYTECODE_CACHE_DIR))
+        self.env.filters['slug'] = slugify
+        self.feeds = None  # FeedWriter, created on first use
         
+    @timed("generate_pages")
     def generate_pages(self, data):
-        """Generate the HTML pages from the news data"""
+        """Generate the HTML pages from the news data.
+
+        Only pages whose content hash differs from docs/manifest.json are rendered; see the
+        _plan_* methods for what each kind of page hashes. Feeds, the search index and
+        precompressed siblings are likewise updated only for what changed.
+        """
         try:
-            # Get IST timezone
-            ist = pytz.timezone('Asia/Kolkata')
-            current_time = datetime.now(ist).strftime("%Y-%m-%d %H:%M:%S IST")
-            
-            # Organize news by date and then by source
-            news_by_date = {}
+            self.create_static_assets()
+
             headlines = data.get("headlines", {})
-            
+            groups = ensure_groups(data)
             # Sort dates in reverse chronological order
             sorted_dates = sorted(headlines.keys(), reverse=True)
-            
-            for date in sorted_dates:
-                # Group items by source for this date
-                items_by_source = {}
-                for item in reversed(headlines[date]):  # Reverse to keep newest first
-                    source = item['source']
-                    if source not in items_by_source:
-                        items_by_source[source] = []
-                    items_by_source[source].append(item)
-                
-                # Sort sources alphabetically
-                sorted_sources = sorted(items_by_source.keys())
-                
-                # Create the final structure for this date
-                news_by_date[date] = {
-                    'sources': sorted_sources,
-                    'items_by_source': items_by_source
-                }
-            
-            # Get the template
-            template = self.env.get_template('index.html')
-            
-            # Render the template
-            html_content = template.render(
-                current_time=current_time,
-                news_by_date=news_by_date
-            )
-            
-            # Write the rendered HTML to index.html
-            index_path = os.path.join(self.docs_dir, 'index.html')
-            with open(index_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-                
-            logging.info(f"Successfully generated HTML page with {len(news_by_date)} dates of news")
-            
+            # The newest headline's time rather than the clock, so a run without news leaves the pages as they were
+            current_time = self._last_updated(headlines[sorted_dates[0]]) if sorted_dates else None
+
+            stored = self._load_manifest()
+            manifest = stored.get('pages', {})
+            template_hash = self._template_hash()
+            day_records = stored.get('days', {}) if stored.get('templates') == template_hash else {}
+            new_day_records = {}
+            new_manifest = {}
+            jobs = []
+            planned = {}
+            day_pages = self._plan_days(sorted_dates, headlines, groups, template_hash, manifest,
+                                        day_records, data.get('dirty_dates', set()), new_day_records)
+            for kind, pages in (('day', day_pages),
+                                ('source', self._plan_sources(sorted_dates, headlines, groups, template_hash)),
+                                ('month', self._plan_months(sorted_dates, headlines, groups, template_hash))):
+                planned[kind] = 0
+                for page, digest, args in pages:
+                    if manifest.get(page) == digest and os.path.exists(os.path.join(self.docs_dir, page)):
+                        new_manifest[page] = digest
+                        continue
+                    jobs.append((kind, (page, digest) + args))
+                    planned[kind] += 1
+
+            # Pages and changed feeds are independent, so they go to the render pool together
+            feed_writer = self._feed_writer()
+            jobs += [('feed', feed) for feed in feed_writer.plan(headlines, groups)]
+            written_feeds = []
+            for kind, key, value in run_jobs(self, jobs):
+                if kind == 'feed':
+                    written_feeds.append(value)
+                else:
+                    new_manifest[key] = value
+            feed_writer.finish(written_feeds)
+
+            # Pages of dates, sources and months that are no longer in the data
+            for page in set(manifest) - set(new_manifest):
+                if page.startswith(('days/', 'sources/', 'months/')):
+                    path = os.path.join(self.docs_dir, page)
+                    if os.path.exists(path):
+                        os.remove(path)
+
+            index_dates = sorted_dates[:SITE_INDEX_DAYS]
+            older_dates = sorted_dates[SITE_INDEX_DAYS:]
+            self._render('index.html', 'index.html', root='', current_time=current_time,
+                         days=(self._group_day(date, headlines[date], groups[date]) for date in index_dates),
+                         older_days=older_dates[:SITE_INDEX_DAYS], more_days=len(older_dates) > SITE_INDEX_DAYS,
+                         total_days=len(sorted_dates))
+            self._render('archive.html', 'archive.html', root='', current_time=current_time,
+                         months=self._months(sorted_dates, headlines),
+                         sources=self._source_totals(groups))
+            new_manifest['search.html'] = template_hash
+            if manifest.get('search.html') != template_hash or not os.path.exists(os.path.join(self.docs_dir, 'search.html')):
+                self._render('search.html', 'search.html', root='')
+            update_search_index(self.docs_dir, headlines)
+            self._save_manifest({'templates': template_hash, 'pages': new_manifest, 'days': new_day_records})
+            data.pop('dirty_dates', None)
+            precompress(self.docs_dir)
+
+            logging.info(f"Successfully generated HTML pages: re-rendered {planned['day']} of {len(sorted_dates)} day pages, "
+                         f"{planned['source']} source pages and {planned['month']} month pages; "
+                         f"index with {len(index_dates)} dates of news")
+
         except Exception as e:
             logging.error(f"Error generating HTML pages: {e}", exc_info=True)
             raise
 
+    def _plan_days(self, sorted_dates, headlines, groups, template_hash, manifest, records, dirty, new_records):
+        """(page, digest, job args) for every day page.
+
+        A date's items are hashed only if it is dirty or its [item count, newer, older]
+        record changed; otherwise the digest in the manifest is reused. new_records
+        receives the records to save.
+        """
+        for i, date in enumerate(sorted_dates):
+            page = f"days/{date}.html"
+            newer = sorted_dates[i - 1] if i > 0 else None
+            older = sorted_dates[i + 1] if i + 1 < len(sorted_dates) else None
+            record = new_records[date] = [len(headlines[date]), newer, older]
+            if date not in dirty and records.get(date) == record and page in manifest:
+                digest = manifest[page]
+            else:
+                digest = self._content_hash(template_hash, newer, older, headlines[date])
+            yield page, digest, (date, headlines[date], groups[date], newer, older)
+
+    def _plan_sources(self, sorted_dates, headlines, groups, template_hash):
+        """(page, digest, job args) for every source page: its SOURCE_PAGE_ITEMS newest items by date.
+
+        Built from the (date, source) buckets, so no date's items are scanned for other sources.
+        """
+        days_by_source = {}
+        counts = {}
+        for date in sorted_dates:
+            for source, positions in groups[date].items():
+                shown = counts.get(source, 0)
+                if shown >= SOURCE_PAGE_ITEMS:
+                    continue
+                items = [headlines[date][position] for position in reversed(positions)][:SOURCE_PAGE_ITEMS - shown]
+                days_by_source.setdefault(source, []).append((date, items))
+                counts[source] = shown + len(items)
+        for source, days in days_by_source.items():
+            digest = self._content_hash(template_hash, source, days)
+            yield f"sources/{slugify(source)}.html", digest, (source, days)
+
+    def _plan_months(self, sorted_dates, headlines, groups, template_hash):
+        """(page, digest, job args) for every month page: per-day totals and per-source counts."""
+        months = self._months(sorted_dates, headlines)
+        for i, (month, days) in enumerate(months):
+            newer = months[i - 1][0] if i > 0 else None
+            older = months[i + 1][0] if i + 1 < len(months) else None
+            days = [(date, total, sorted((source, len(positions)) for source, positions in groups[date].items()))
+                    for date, total in days]
+            digest = self._content_hash(template_hash, month, newer, older, days)
+            yield f"months/{month}.html", digest, (month, days, newer, older)
+
+    @staticmethod
+    def _last_updated(items):
+        """Newest scrape time among the items, in IST; scraped dates are naive UTC."""
+        try:
+            newest = datetime.strptime(max((item.get('date', '') for item in items), default=''), "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return None
+        ist = pytz.timezone('Asia/Kolkata')
+        return newest.replace(tzinfo=timezone.utc).astimezone(ist).strftime("%Y-%m-%d %H:%M:%S IST")
+
+    @staticmethod
+    def _months(sorted_dates, headlines):
+        """[(YYYY-MM, [(date, item count), ...]), ...], newest first."""
+        months = []
+        for date in sorted_dates:
+            if not months or months[-1][0] != date[:7]:
+                months.append((date[:7], []))
+            months[-1][1].append((date, len(headlines[date])))
+        return months
+
+    @staticmethod
+    def _source_totals(groups):
+        totals = {}
+        for buckets in groups.values():
+            for source, positions in buckets.items():
+                totals[source] = totals.get(source, 0) + len(positions)
+        return sorted(totals.items())
+
+    def run_job(self, kind, args):
+        """Perform one render job from render_scheduler; returns (kind, key, value) for the manifests."""
+        if kind == 'day':
+            page, digest, date, items, positions, newer, older = args
+            self._render('day.html', page, root='../', day=self._group_day(date, items, positions),
+                         newer=newer, older=older)
+            return kind, page, digest
+        if kind == 'source':
+            page, digest, source, days = args
+            self._render('source.html', page, root='../', source=source, days=days,
+                         has_feed=source in WEBSITES)
+            return kind, page, digest
+        if kind == 'month':
+            page, digest, month, days, newer, older = args
+            self._render('month.html', page, root='../', month=month, days=days, newer=newer, older=older)
+            return kind, page, digest
+        if kind == 'feed':
+            entry = self._feed_writer().write(*args)
+            return kind, entry['slug'], entry
+        raise ValueError(f"Unknown render job kind: {kind}")
+
+    def _feed_writer(self):
+        if self.feeds is None:
+            self.feeds = FeedWriter(self.docs_dir)
+        return self.feeds
+
+    @staticmethod
+    def _group_day(date, items, positions):
+        """One date for the templates; its (source, items) groups are built when first iterated."""
+        return {'date': date, 'groups': PageGenerator._iter_sources(items, positions)}
+
+    @staticmethod
+    def _iter_sources(items, positions):
+        """Yield (source, items) from the precomputed buckets, sources alphabetical and items newest first."""
+        for source in sorted(positions):
+            yield source, [items[position] for position in reversed(positions[source])]
+
+    def _render(self, template_name, page, **context):
+        """Stream a template to docs/page through a buffered writer, replacing the old file atomically.
+
+        An identical page is left in place, mtime included, so precompress and git skip it.
+        """
+        path = os.path.join(self.docs_dir, page)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        template = self.env.get_template(template_name)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8', buffering=RENDER_BUFFER_SIZE) as f:
+            f.writelines(template.generate(**context))
+        if os.path.exists(path) and filecmp.cmp(tmp_path, path, shallow=False):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+
+    def _template_hash(self):
+        """Hash of every template, so editing one re-renders all pages."""
+        digest = hashlib.sha256()
+        for name in sorted(self.env.list_templates()):
+            with open(os.path.join(self.template_dir, name), 'rb') as f:
+                digest.update(name.encode('utf-8') + b'\0' + f.read())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _content_hash(*parts):
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.docs_dir, SITE_MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest):
+        """Write the manifest, leaving the file untouched when nothing in it changed."""
+        if manifest == self._load_manifest():
+            return
+        path = os.path.join(self.docs_dir, SITE_MANIFEST_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
     def create_initial_page(self):
         """Create a basic index.html file"""
         index_path = os.path.join(self.docs_dir, 'index.html')
@@ -110,103 +313,10 @@ class PageGenerator:
 ''')
 
     def create_static_assets(self):
-        """Create necessary static files if they don't exist"""
-        # Create style.css
-        css_file = os.path.join(self.docs_dir, 'style.css')
-        if not os.path.exists(css_file):
-            with open(css_file, 'w', encoding='utf-8') as f:
-                f.write(self.get_css_content())
-        
-        # Create favicon
-        favicon_file = os.path.join(self.docs_dir, 'favicon.ico')
-        if not os.path.exists(favicon_file):
-            # Create a simple favicon or copy from assets
-            pass
-    
-    def get_css_content(self):
-        return """
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif;
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f6f8fa;
-            line-height: 1.6;
-        }
-        
-        .header {
-            text-align: center;
-            margin-bottom: 2em;
-            padding: 1em;
-            background-color: white;
-            border-radius: 8px;
-            box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-        }
-        
-        .date-section {
-            margin-bottom: 30px;
-            background-color: white;
-            padding: 20px;
-            border-radius: 8px;
-            box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-        }
-        
-        .date-header {
-            background-color: #0366d6;
-            color: white;
-            padding: 10px 20px;
-            border-radius: 4px;
-            margin-bottom: 15px;
-        }
-        
-        .news-item {
-            border-bottom: 1px solid #eaecef;
-            padding: 15px 0;
-        }
-        
-        .news-item:last-child {
-            border-bottom: none;
-        }
-        
-        .time {
-            color: #586069;
-            font-size: 0.9em;
-        }
-        
-        .title {
-            margin: 5px 0;
-        }
-        
-        .chinese-title {
-            color: #24292e;
-            font-size: 1.1em;
-            margin-bottom: 5px;
-        }
-        
-        .english-title {
-            color: #586069;
-            font-size: 1em;
-        }
-        
-        .source {
-            color: #0366d6;
-            font-size: 0.9em;
-            margin-top: 5px;
-        }
-        
-        a {
-            color: #0366d6;
-            text-decoration: none;
-        }
-        
-        a:hover {
-            text-decoration: underline;
-        }
-        
-        .last-updated {
-            text-align: center;
-            color: #586069;
-            font-size: 0.9em;
-            margin-top: 2em;
-        }
-        """ 
\ No newline at end of file
+        """Build the content-hashed stylesheet and expose asset paths to the templates as `assets`."""
+        style = build_css_asset(os.path.join(self.template_dir, 'style.css'), self.docs_dir)
+        self.env.globals['assets'] = {'style.css': style}
+        # The unhashed stylesheet earlier versions wrote is no longer referenced
+        legacy_css = os.path.join(self.docs_dir, 'style.css')
+        if os.path.exists(legacy_css):
+            os.remove(legacy_css)
@@ -0,0 +1,165 @@
+# pipeline.py
+import logging
+import queue
+import threading
+import time
+
+from config import (TRANSLATION_QUEUE_SIZE, TRANSLATION_WORKERS, TRANSLATION_BATCH_SIZE,
+                    TRANSLATION_BATCH_WAIT)
+from metrics import get_metrics
+from translator import translate_items
+
+_STOP = object()  # Sentinel telling a translation worker to finish
+
+
+class StageMetrics:
+    """Queue depth and throughput counters for one pipeline stage.
+
+    Wait and busy times also go to the run metrics as pipeline_wait / pipeline_busy[stage=...],
+    and publish() adds the queue depth gauges pipeline_queue_depth_max / _avg[stage=...].
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.items = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.depth_total = 0
+        self.depth_samples = 0
+        self.wait_seconds = 0.0  # Producers: time blocked on a full queue. Consumers: time spent waiting for work.
+        self.busy_seconds = 0.0
+
+    def record_depth(self, depth):
+        with self.lock:
+            self.max_depth = max(self.max_depth, depth)
+            self.depth_total += depth
+            self.depth_samples += 1
+
+    def add(self, items=0, batches=0, wait_seconds=0.0, busy_seconds=0.0):
+        metrics = get_metrics()
+        if wait_seconds:
+            metrics.observe("pipeline_wait", wait_seconds, stage=self.name)
+        if busy_seconds:
+            metrics.observe("pipeline_busy", busy_seconds, stage=self.name)
+        if items:
+            metrics.inc("pipeline_items", items, stage=self.name)
+        with self.lock:
+            self.items += items
+            self.batches += batches
+            self.wait_seconds += wait_seconds
+            self.busy_seconds += busy_seconds
+
+    def summary(self):
+        with self.lock:
+            avg_depth = self.depth_total / self.depth_samples if self.depth_samples else 0.0
+            return {
+                "stage": self.name,
+                "items": self.items,
+                "batches": self.batches,
+                "max_queue_depth": self.max_depth,
+                "avg_queue_depth": round(avg_depth, 2),
+                "wait_seconds": round(self.wait_seconds, 3),
+                "busy_seconds": round(self.busy_seconds, 3),
+            }
+
+    def publish(self):
+        s = self.summary()
+        metrics = get_metrics()
+        metrics.set("pipeline_queue_depth_max", s['max_queue_depth'], stage=self.name)
+        metrics.set("pipeline_queue_depth_avg", s['avg_queue_depth'], stage=self.name)
+
+    def log(self):
+        s = self.summary()
+        logging.info(f"Stage '{s['stage']}': {s['items']} items in {s['batches']} batches, "
+                     f"queue depth max {s['max_queue_depth']} / avg {s['avg_queue_depth']}, "
+                     f"waited {s['wait_seconds']}s, busy {s['busy_seconds']}s")
+
+
+class TranslationPipeline:
+    """Bounded queue between the scraping threads and a pool of translation workers.
+
+    Scrapers call submit() for every new raw item; it blocks while the queue is full,
+    which is the backpressure that keeps scraping from running arbitrarily far ahead
+    of translation. Workers drain the queue in batches and fill in english_title in place.
+    """
+
+    def __init__(self, maxsize=TRANSLATION_QUEUE_SIZE, workers=TRANSLATION_WORKERS,
+                 batch_size=TRANSLATION_BATCH_SIZE, batch_wait=TRANSLATION_BATCH_WAIT,
+                 translate=translate_items):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.translate = translate
+        self.threads = []
+        self.intake_metrics = StageMetrics("scrape")
+        self.translate_metrics = StageMetrics("translate")
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"translate-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logging.info(f"Started translation stage with {self.workers} workers "
+                     f"(queue size {self.queue.maxsize}, batch size {self.batch_size})")
+        return self
+
+    def submit(self, item):
+        """Hand a freshly scraped item to the translation stage."""
+        started = time.monotonic()
+        self.queue.put(item)
+        self.intake_metrics.add(items=1, wait_seconds=time.monotonic() - started)
+        self.intake_metrics.record_depth(self.queue.qsize())
+
+    def close(self):
+        """Wait until every submitted item has been translated, then stop the workers."""
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        for stage in (self.intake_metrics, self.translate_metrics):
+            stage.publish()
+            stage.log()
+
+    def _next_batch(self):
+        """Block for one item, then gather more until the batch is full or batch_wait elapses.
+
+        Returns (batch, stop) where stop means the worker should exit after this batch.
+        """
+        started = time.monotonic()
+        first = self.queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.batch_wait
+        stop = False
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        self.translate_metrics.record_depth(self.queue.qsize())
+        self.translate_metrics.add(wait_seconds=time.monotonic() - started)
+        return batch, stop
+
+    def _worker(self):
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                started = time.monotonic()
+                try:
+                    self.translate(batch)
+                except Exception as e:
+                    logging.error(f"Translation stage failed for a batch of {len(batch)} items: {e}", exc_info=True)
+                self.translate_metrics.add(items=len(batch), batches=1, busy_seconds=time.monotonic() - started)
+            if stop:
+                break
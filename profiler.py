@@ -0,0 +1,105 @@
+# profiler.py
+"""Profiling mode for main.py: cProfile, tracemalloc and optional asyncio task timing for one run.
+
+Enabled with `python main.py --profile` or PROFILE=1 (add --profile-tasks or
+PROFILE_ASYNCIO_TASKS=1 for task timing). main.py only imports this module when
+profiling is on, so a normal run pays nothing. Artifacts go to PROFILE_DIR/<timestamp>/:
+
+    run.prof                cProfile stats (snakeviz, `python -m pstats`)
+    alloc-start.snapshot    tracemalloc snapshots (tracemalloc.Snapshot.load)
+    alloc-end.snapshot
+    summary.txt             top PROFILE_TOP_N functions, allocation sites, growth and tasks
+
+cProfile sees the event-loop thread only. Scrapes and translations running in executor
+threads show up as time spent waiting on them; their own timings are in the run report
+(metrics.py). tracemalloc covers every thread.
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from datetime import datetime
+
+from config import PROFILE_DIR, PROFILE_TOP_N, PROFILE_TRACEMALLOC_FRAMES
+
+
+class RunProfiler:
+    def __init__(self, out_dir=PROFILE_DIR, top_n=PROFILE_TOP_N, task_timing=False):
+        self.out_dir = os.path.join(out_dir, datetime.now().strftime("%Y%m%d-%H%M%S"))
+        self.top_n = top_n
+        self.task_timing = task_timing
+        self.tasks = {}  # Coroutine name -> [count, total seconds, max seconds]
+        self.profile = cProfile.Profile()
+
+    def run(self, coro_fn):
+        """asyncio.run(coro_fn()) under the profilers, then write the artifacts."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+        self.start_snapshot = tracemalloc.take_snapshot()
+        started = time.perf_counter()
+        self.profile.enable()
+        try:
+            return asyncio.run(self._main(coro_fn))
+        finally:
+            self.profile.disable()
+            self.wall_seconds = time.perf_counter() - started
+            self.end_snapshot = tracemalloc.take_snapshot()
+            _, self.peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.write_artifacts()
+
+    async def _main(self, coro_fn):
+        if self.task_timing:
+            asyncio.get_running_loop().set_task_factory(self._task_factory)
+        return await coro_fn()
+
+    def _task_factory(self, loop, coro, **kwargs):
+        """Create the task as usual and record its lifetime (creation to completion) when it finishes."""
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+        name = getattr(coro, '__qualname__', type(coro).__name__)
+        created = time.perf_counter()
+
+        def done(_):
+            seconds = time.perf_counter() - created
+            entry = self.tasks.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+        task.add_done_callback(done)
+        return task
+
+    def write_artifacts(self):
+        self.profile.dump_stats(os.path.join(self.out_dir, 'run.prof'))
+        self.start_snapshot.dump(os.path.join(self.out_dir, 'alloc-start.snapshot'))
+        self.end_snapshot.dump(os.path.join(self.out_dir, 'alloc-end.snapshot'))
+        with open(os.path.join(self.out_dir, 'summary.txt'), 'w', encoding='utf-8') as f:
+            f.write(self.summary())
+        logging.info(f"Profile written to {self.out_dir} ({self.wall_seconds:.1f}s wall, "
+                     f"peak {self.peak_bytes / 2 ** 20:.1f} MiB traced)")
+
+    def summary(self):
+        out = io.StringIO()
+        out.write(f"Wall time: {self.wall_seconds:.2f}s\nPeak traced memory: {self.peak_bytes / 2 ** 20:.1f} MiB\n")
+        for sort in ('cumulative', 'tottime'):
+            out.write(f"\n=== Top {self.top_n} functions by {sort} time ===\n")
+            pstats.Stats(self.profile, stream=out).strip_dirs().sort_stats(sort).print_stats(self.top_n)
+
+        out.write(f"\n=== Top {self.top_n} allocation sites at exit ===\n")
+        for stat in self.end_snapshot.statistics('lineno')[:self.top_n]:
+            out.write(f"{stat}\n")
+        out.write(f"\n=== Top {self.top_n} allocation growth over the run ===\n")
+        for stat in self.end_snapshot.compare_to(self.start_snapshot, 'lineno')[:self.top_n]:
+            out.write(f"{stat}\n")
+
+        if self.task_timing:
+            out.write("\n=== Asyncio tasks by total lifetime ===\n")
+            out.write(f"{'task':<60} {'count':>6} {'total s':>9} {'max s':>8}\n")
+            ranked = sorted(self.tasks.items(), key=lambda item: item[1][1], reverse=True)
+            for name, (count, total, longest) in ranked[:self.top_n]:
+                out.write(f"{name[:60]:<60} {count:>6} {total:>9.3f} {longest:>8.3f}\n")
+        return out.getvalue()
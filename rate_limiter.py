@@ -0,0 +1,106 @@
+# rate_limiter.py
+import asyncio
+import time
+
+from config import (TELEGRAM_GLOBAL_RATE, TELEGRAM_GLOBAL_BURST, TELEGRAM_CHAT_RATE,
+                    TELEGRAM_CHAT_BURST, TELEGRAM_GROUP_RATE_PER_MINUTE, TELEGRAM_GROUP_BURST)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """Seconds until one token is available."""
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def consume(self):
+        self.tokens -= 1
+
+    def block(self, seconds):
+        """Empty the bucket and refuse tokens for `seconds` (Telegram asked us to back off)."""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = 0
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class TelegramRateLimiter:
+    """Models Telegram's bot limits: one global bucket plus one bucket per chat.
+
+    Private chats get TELEGRAM_CHAT_RATE messages per second; groups and channels
+    (negative chat ids) get TELEGRAM_GROUP_RATE_PER_MINUTE. A send waits only as long
+    as the tightest of its two buckets requires, so several chats can be served at once.
+    """
+
+    def __init__(self, global_rate=TELEGRAM_GLOBAL_RATE, global_burst=TELEGRAM_GLOBAL_BURST,
+                 chat_rate=TELEGRAM_CHAT_RATE, chat_burst=TELEGRAM_CHAT_BURST,
+                 group_rate_per_minute=TELEGRAM_GROUP_RATE_PER_MINUTE, group_burst=TELEGRAM_GROUP_BURST):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate_per_minute / 60.0
+        self.group_burst = group_burst
+        self.chat_buckets = {}
+        self.lock = asyncio.Lock()
+
+    def _chat_bucket(self, chat_id):
+        key = str(chat_id)
+        bucket = self.chat_buckets.get(key)
+        if bucket is None:
+            if key.startswith('-'):
+                bucket = TokenBucket(self.group_rate, self.group_burst)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self.chat_buckets[key] = bucket
+        return bucket
+
+    async def acquire(self, chat_id):
+        """Wait until a message may be sent to chat_id, then take the tokens."""
+        while True:
+            async with self.lock:
+                now = time.monotonic()
+                chat_bucket = self._chat_bucket(chat_id)
+                wait = max(self.global_bucket.delay(now), chat_bucket.delay(now))
+                if wait <= 0:
+                    self.global_bucket.consume()
+                    chat_bucket.consume()
+                    return
+            await asyncio.sleep(wait)
+
+    def retry_after(self, chat_id, seconds):
+        """Hold back every send to chat_id for the delay Telegram asked for."""
+        self._chat_bucket(chat_id).block(seconds)
+
+
+def retry_after_seconds(error):
+    """RetryAfter.retry_after is an int in python-telegram-bot 20 and a timedelta in later versions."""
+    retry_after = error.retry_after
+    if hasattr(retry_after, 'total_seconds'):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+_limiter = None
+
+
+def get_rate_limiter():
+    """Return the process-wide limiter, so every sender shares the same global bucket."""
+    global _limiter
+    if _limiter is None:
+        _limiter = TelegramRateLimiter()
+    return _limiter
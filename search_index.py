@@ -0,0 +1,167 @@
+# search_index.py
+"""Static, sharded search index for the published site (docs/search/).
+
+    docs/search/meta.json            shard list, document count, tokenizer settings
+    docs/search/shards/<key>.json    {token: [doc ids]} for every token whose shard key is <key>
+    docs/search/docs/<n>.json        documents n*SEARCH_DOC_CHUNK ... as [date, source, chinese, english, url]
+    docs/search/state.json           how many items of each date are already indexed, and which
+                                     of them were indexed before their translation arrived
+
+Tokens are the ones headline_index.tokenize produces (CJK bigrams, English words) plus every
+CJK character, so a one-character query is a single lookup in its own shard. The
+shard key of a token is its first character for ASCII tokens and "u" plus the hex code
+point of its first character without the last two digits for CJK tokens, so search.html
+fetches only the shards of the query's tokens plus the document chunks of the hits.
+
+Items are only ever appended to a date in headlines.json, so each run indexes just the
+items past the recorded count and rewrites only the shards and chunks they touch. Items
+indexed while still pending_translation are remembered by position; once their English
+title is filled in, their document is updated and its English tokens are added.
+"""
+import json
+import logging
+import os
+
+from config import SEARCH_DIR, SEARCH_DOC_CHUNK
+from headline_index import STOPWORDS, tokenize
+
+FORMAT_VERSION = 2
+
+
+def shard_key(token):
+    first = token[0]
+    if first.isascii():
+        return first
+    return f"u{ord(first) >> 8:x}"
+
+
+class SearchIndexWriter:
+    """Appends new headlines to the sharded index under docs_dir/SEARCH_DIR."""
+
+    def __init__(self, docs_dir):
+        self.root = os.path.join(docs_dir, SEARCH_DIR)
+        self.state = self._read('state.json') or {}
+        self.stale = bool(self.state) and self.state.get('format') != FORMAT_VERSION
+        if self.state.get('format') != FORMAT_VERSION:
+            self.state = {'format': FORMAT_VERSION, 'doc_count': 0, 'indexed': {}, 'pending': {}}
+        self.shards = {}   # key -> {token: [doc ids]}, loaded on demand
+        self.chunks = {}   # chunk number -> [documents], loaded on demand
+        self.dirty_shards = set()
+        self.dirty_chunks = set()
+        self.rebuilding = False
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _read(self, name):
+        try:
+            with open(self._path(name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, name, payload):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(path + '.tmp', path)
+
+    def _shard(self, key):
+        if key not in self.shards:
+            self.shards[key] = {} if self.rebuilding else self._read(f"shards/{key}.json") or {}
+        return self.shards[key]
+
+    def _chunk(self, number):
+        if number not in self.chunks:
+            self.chunks[number] = [] if self.rebuilding else self._read(f"docs/{number}.json") or []
+        return self.chunks[number]
+
+    def update(self, headlines):
+        """Index items not yet indexed; rebuilds from scratch if a date lost items. Returns the number added."""
+        indexed = self.state['indexed']
+        self.state.setdefault('pending', {})
+        if self.stale or any(len(headlines.get(date, [])) < count for date, count in indexed.items()):
+            logging.warning("Search index is in an older format or ahead of headlines.json; rebuilding it from scratch")
+            self.state = {'format': FORMAT_VERSION, 'doc_count': 0, 'indexed': {}, 'pending': {}}
+            self.rebuilding = True
+            self.shards = {key: {} for key in self._existing_shards()}  # Overwritten, emptied if unused
+            self.chunks = {}
+            self.dirty_shards.update(self.shards)
+            indexed = self.state['indexed']
+
+        updated = self._update_translated(headlines)
+        added = 0
+        for date in sorted(headlines):
+            start = indexed.get(date, 0)
+            for position, item in enumerate(headlines[date][start:], start):
+                self._add(date, position, item)
+                added += 1
+            indexed[date] = len(headlines[date])
+        if added or updated or self.rebuilding or not os.path.exists(self._path('meta.json')):
+            self._flush()
+        logging.info(f"Search index: {added} new items, {updated} translations filled in, {self.state['doc_count']} total, "
+                     f"{len(self.dirty_shards)} shards and {len(self.dirty_chunks)} document chunks rewritten")
+        return added
+
+    def _add(self, date, position, item):
+        doc_id = self.state['doc_count']
+        self.state['doc_count'] += 1
+        number = doc_id // SEARCH_DOC_CHUNK
+        self._chunk(number).append([date, item['source'], item['chinese_title'], item['english_title'], item['url']])
+        self.dirty_chunks.add(number)
+        self._add_tokens(doc_id, tokenize(item.get('chinese_title'), True) | tokenize(item.get('english_title'), True))
+        if item.get('pending_translation'):
+            self.state['pending'].setdefault(date, {})[str(position)] = doc_id
+
+    def _add_tokens(self, doc_id, tokens):
+        for token in tokens:
+            key = shard_key(token)
+            self._shard(key).setdefault(token, []).append(doc_id)
+            self.dirty_shards.add(key)
+
+    def _update_translated(self, headlines):
+        """Update the documents of remembered pending items whose translation has arrived. Returns how many."""
+        updated = 0
+        pending = self.state['pending']
+        for date in list(pending):
+            items = headlines.get(date, [])
+            for position, doc_id in list(pending[date].items()):
+                item = items[int(position)] if int(position) < len(items) else None
+                if item is not None and item.get('pending_translation'):
+                    continue
+                del pending[date][position]
+                if item is None:
+                    continue
+                number = doc_id // SEARCH_DOC_CHUNK
+                self._chunk(number)[doc_id % SEARCH_DOC_CHUNK][3] = item['english_title']
+                self.dirty_chunks.add(number)
+                self._add_tokens(doc_id, tokenize(item.get('english_title'), True) - tokenize(item.get('chinese_title'), True))
+                updated += 1
+            if not pending[date]:
+                del pending[date]
+        return updated
+
+    def _existing_shards(self):
+        meta = self._read('meta.json') or {}
+        return meta.get('shards', [])
+
+    def _flush(self):
+        for key in self.dirty_shards:
+            self._write(f"shards/{key}.json", self.shards[key])
+        for number in self.dirty_chunks:
+            self._write(f"docs/{number}.json", self.chunks[number])
+        known = set() if self.rebuilding else set(self._existing_shards())
+        shards = sorted(known | {key for key, shard in self.shards.items() if shard})
+        self._write('meta.json', {
+            'format': FORMAT_VERSION,
+            'docs': self.state['doc_count'],
+            'doc_chunk': SEARCH_DOC_CHUNK,
+            'shards': shards,
+            'stopwords': sorted(STOPWORDS),
+        })
+        self._write('state.json', self.state)
+
+
+def update_search_index(docs_dir, headlines):
+    return SearchIndexWriter(docs_dir).update(headlines)
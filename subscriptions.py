@@ -0,0 +1,132 @@
+# subscriptions.py
+import html
+import json
+import logging
+import os
+from collections import defaultdict
+
+import config
+
+
+class Subscription:
+    """One chat and the subset of items it wants.
+
+    Empty sources means every source; empty keywords means every item from those
+    sources. With both set, an item must come from one of the sources AND mention
+    one of the keywords (in either title, case-insensitive).
+    """
+
+    def __init__(self, chat_id, name=None, sources=None, keywords=None):
+        self.chat_id = str(chat_id)
+        self.name = name or self.chat_id
+        self.sources = set(sources or [])
+        self.keywords = [k.lower() for k in (keywords or []) if k]
+
+
+class SubscriptionRegistry:
+    """Routes items to subscriptions through inverted indexes instead of testing every subscription.
+
+    source -> subscriptions and keyword -> subscriptions are plain dicts; keywords are
+    additionally bucketed by their first character so a title is scanned once,
+    checking only the keywords that can start at each position.
+    """
+
+    def __init__(self, subscriptions):
+        self.subscriptions = list(subscriptions)
+        self._index()
+
+    def _index(self):
+        self.by_source = defaultdict(set)
+        self.any_source = set()
+        self.by_keyword = defaultdict(set)
+        self.any_keyword = set()
+        self.keywords_by_first_char = defaultdict(set)
+
+        for index, subscription in enumerate(self.subscriptions):
+            if subscription.sources:
+                for source in subscription.sources:
+                    self.by_source[source].add(index)
+            else:
+                self.any_source.add(index)
+            if subscription.keywords:
+                for keyword in subscription.keywords:
+                    self.by_keyword[keyword].add(index)
+                    self.keywords_by_first_char[keyword[0]].add(keyword)
+            else:
+                self.any_keyword.add(index)
+
+    def unsubscribe(self, chat_id):
+        """Drop every subscription of chat_id and rebuild the indexes. Returns how many were dropped."""
+        kept = [subscription for subscription in self.subscriptions if subscription.chat_id != str(chat_id)]
+        dropped = len(self.subscriptions) - len(kept)
+        if dropped:
+            self.subscriptions = kept
+            self._index()
+            logging.info(f"Unsubscribed chat {chat_id} ({dropped} subscriptions)")
+        return dropped
+
+    def save(self, path=None):
+        """Write the subscriptions back in the format load_subscriptions reads."""
+        path = path or config.SUBSCRIPTIONS_FILE
+        entries = [{"chat_id": s.chat_id, "name": s.name, "sources": sorted(s.sources), "keywords": s.keywords}
+                   for s in self.subscriptions]
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({"subscriptions": entries}, f, ensure_ascii=False, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def _matched_keywords(self, text):
+        found = set()
+        for position, char in enumerate(text):
+            for keyword in self.keywords_by_first_char.get(char, ()):
+                if text.startswith(keyword, position):
+                    found.add(keyword)
+        return found
+
+    def match(self, item):
+        """Return the indexes of the subscriptions that want item."""
+        candidates = self.by_source.get(item.get('source'), set()) | self.any_source
+        if not candidates:
+            return set()
+        wanted = candidates & self.any_keyword
+        if candidates - wanted and self.keywords_by_first_char:
+            text = html.unescape(f"{item.get('chinese_title', '')}\n{item.get('english_title', '')}").lower()
+            for keyword in self._matched_keywords(text):
+                wanted |= candidates & self.by_keyword[keyword]
+        return wanted
+
+    def route(self, items_by_site):
+        """Split {site: [items]} into {chat_id: {site: [items]}}, keeping site and item order."""
+        routed = defaultdict(lambda: defaultdict(list))
+        counts = [0] * len(self.subscriptions)
+        for site_name, items in items_by_site.items():
+            for item in items:
+                chat_ids = set()
+                for index in self.match(item):
+                    counts[index] += 1
+                    chat_ids.add(self.subscriptions[index].chat_id)
+                for chat_id in chat_ids:  # A chat with several matching subscriptions gets the item once
+                    routed[chat_id][site_name].append(item)
+        for subscription, count in zip(self.subscriptions, counts):
+            logging.info(f"Subscription '{subscription.name}' ({subscription.chat_id}): {count} matching items")
+        return {chat_id: dict(items) for chat_id, items in routed.items()}
+
+
+def load_subscriptions(path=None):
+    """Load the registry from SUBSCRIPTIONS_FILE, or fall back to TELEGRAM_CHAT_ID receiving everything."""
+    path = path or config.SUBSCRIPTIONS_FILE
+    subscriptions = []
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f).get('subscriptions', [])
+            for entry in entries:
+                subscriptions.append(Subscription(entry['chat_id'], entry.get('name'),
+                                                  entry.get('sources'), entry.get('keywords')))
+            logging.info(f"Loaded {len(subscriptions)} subscriptions from {path}")
+        except (OSError, ValueError, KeyError) as e:
+            logging.error(f"Error loading subscriptions from {path}: {e}")
+            subscriptions = []
+
+    if not subscriptions and config.TELEGRAM_CHAT_ID:
+        subscriptions.append(Subscription(config.TELEGRAM_CHAT_ID, name="default"))
+    return SubscriptionRegistry(subscriptions)
@@ -0,0 +1,178 @@
+# telegram_stub_server.py
+"""Local stand-in for the part of the Telegram Bot API this bot uses (getMe, sendMessage).
+
+Point the bot at it with TELEGRAM_API_BASE_URL, e.g.
+
+    python telegram_stub_server.py --port 8081 --retry-after-rate 0.05 --latency 0.05
+    TELEGRAM_API_BASE_URL=http://127.0.0.1:8081/bot TELEGRAM_TOKEN=123:stub python main.py
+
+Failures can be injected: a share of sendMessage calls answered with 429 (RetryAfter),
+a share answered with 400 (BadRequest), and a fixed latency plus jitter per call.
+Messages longer than Telegram's limit are rejected the way Telegram rejects them.
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+from message_layout import telegram_length
+
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096  # Telegram's own limit; the bot packs to the smaller config.MAX_MESSAGE_LENGTH
+
+
+class StubTelegramServer:
+    """Bot API stand-in running on a background thread; counts calls and keeps sent messages."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, retry_after_rate=0.0,
+                 retry_after=1, bad_request_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.bad_request_rate = bad_request_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = Counter()  # "method" and "method:status" -> count
+        self.messages = []      # (chat_id, text) accepted by sendMessage
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        """Value for TELEGRAM_API_BASE_URL / Bot(base_url=...); the token is appended to it."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+            self.messages.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                method = self.path.rsplit('/', 1)[-1]
+                length = int(self.headers.get('Content-Length') or 0)
+                status, payload = server.handle(method, self.headers.get('Content-Type', ''), self.rfile.read(length))
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST
+
+            def log_message(self, format, *args):
+                logging.debug(f"Stub Telegram API: {format % args}")
+
+        return Handler
+
+    def handle(self, method, content_type, body):
+        """Answer one Bot API call; returns (HTTP status, JSON payload)."""
+        if content_type.startswith('application/json'):
+            params = json.loads(body or b'{}')
+        else:
+            params = dict(parse_qsl(body.decode('utf-8')))
+
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if method == 'getMe':
+            return self._result(method, {"id": 1, "is_bot": True, "first_name": "Stub", "username": "stub_bot"})
+        if method != 'sendMessage':
+            return self._error(method, 404, "Not Found")
+
+        with self.lock:
+            roll = self.rng.random()
+        if roll < self.retry_after_rate:
+            return self._error(method, 429, f"Too Many Requests: retry after {self.retry_after}",
+                               {"retry_after": self.retry_after})
+        if roll < self.retry_after_rate + self.bad_request_rate:
+            return self._error(method, 400, "Bad Request: can't parse entities: injected failure")
+
+        text = params.get('text', '')
+        if not text.strip():
+            return self._error(method, 400, "Bad Request: message text is empty")
+        length = telegram_length(text) if params.get('parse_mode') == 'HTML' else len(text.encode('utf-16-le')) // 2
+        if length > TELEGRAM_MAX_MESSAGE_LENGTH:
+            return self._error(method, 400, "Bad Request: message is too long")
+
+        chat_id = params.get('chat_id')
+        with self.lock:
+            self.messages.append((chat_id, text))
+            message_id = len(self.messages)
+        chat_id = int(chat_id) if str(chat_id).lstrip('-').isdigit() else chat_id
+        return self._result(method, {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "channel" if str(chat_id).startswith('-') else "private"},
+            "text": text,
+        })
+
+    def _result(self, method, result):
+        with self.lock:
+            self.calls[method] += 1
+            self.calls[f"{method}:200"] += 1
+        return 200, {"ok": True, "result": result}
+
+    def _error(self, method, code, description, parameters=None):
+        with self.lock:
+            self.calls[method] += 1
+            self.calls[f"{method}:{code}"] += 1
+        payload = {"ok": False, "error_code": code, "description": description}
+        if parameters:
+            payload["parameters"] = parameters
+        return code, payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay, up to this many seconds")
+    parser.add_argument("--retry-after-rate", type=float, default=0.0, help="share of sendMessage calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after seconds in injected 429s")
+    parser.add_argument("--bad-request-rate", type=float, default=0.0, help="share of sendMessage calls answered with 400")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = StubTelegramServer(args.host, args.port, args.latency, args.jitter, args.retry_after_rate,
+                                args.retry_after, args.bad_request_rate)
+    logging.info(f"Stub Telegram Bot API listening; set TELEGRAM_API_BASE_URL={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        logging.info(f"Calls served: {dict(server.calls)}")
+
+
+if __name__ == "__main__":
+    main()
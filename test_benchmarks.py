@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+
+import pytest
+
+from benchmarks import data_scale, parsers
+from config import WEBSITES
+
+FIXTURES = parsers.FIXTURES_DIR
+
+
+def test_synthetic_data_is_deterministic_and_unique():
+    data = data_scale.synthetic_data(500, per_day=50)
+    assert data == data_scale.synthetic_data(500, per_day=50)
+    items = [item for day in data["headlines"].values() for item in day]
+    assert len(items) == 500 and len(data["headlines"]) == 10
+    assert len({item["url"] for item in items}) == 500 == len(data["processed_urls"])
+    assert {item["source"] for item in items} <= set(WEBSITES)
+
+
+def test_data_scale_run_writes_results_and_compares_to_a_baseline(tmp_path, monkeypatch, capsys):
+    first, second = tmp_path / "first.json", tmp_path / "second.json"
+    cwd = os.getcwd()
+    for output, extra in ((first, []), (second, ["--baseline", str(first)])):
+        monkeypatch.setattr(sys, "argv", ["data_scale", "--scales", "300", "--paths", "load", "save", "dedup",
+                                          "--per-day", "100", "--output", str(output)] + extra)
+        data_scale.main()
+    assert os.getcwd() == cwd  # Ran in a scratch directory
+    results = json.loads(second.read_text(encoding="utf-8"))["scales"]["300"]
+    assert results["file_bytes"] > 0
+    assert set(results) == {"file_bytes", "load", "save", "dedup"}
+    assert all(results[path]["seconds"] >= 0 and results[path]["peak_bytes"] > 0 for path in ("load", "save", "dedup"))
+    assert "%)" in capsys.readouterr().out.splitlines()[-2]  # Change against the baseline
+
+
+def test_every_fixture_belongs_to_a_selector_family():
+    with open(os.path.join(FIXTURES, "index.json"), encoding="utf-8") as f:
+        index = json.load(f)
+    families = parsers.selector_families()
+    assert set(index) <= set(families)
+    for family, fixture in index.items():
+        assert fixture["site"] in families[family][1]
+        assert os.path.exists(os.path.join(FIXTURES, fixture["file"]))
+
+
+@pytest.mark.parametrize("family", sorted(parsers._load_index(FIXTURES)))
+def test_parser_benchmark_over_each_fixture(family):
+    fixture = parsers._load_index(FIXTURES)[family]
+    with open(os.path.join(FIXTURES, fixture["file"]), "rb") as f:
+        content = f.read()
+    result = parsers.bench(fixture["site"], fixture["url"], content, "html.parser", seconds=0.01)
+    assert result["links"] > 0
+    assert result["bytes"] == len(content)
+    assert result["ops_per_sec"] > 0 and result["blocks"] > 0
@@ -0,0 +1,82 @@
+import json
+import marshal
+import os
+
+import pytest
+
+import data_manager
+from data_manager import add_headlines, ensure_groups, load_previous_data, mark_dirty, save_data
+
+
+def _item(n, source):
+    return {"chinese_title": f"标题{n}", "english_title": f"Headline {n}", "source": source,
+            "url": f"https://example.gov.cn/{n}.htm", "date": "2024-05-20 08:00:00"}
+
+
+@pytest.fixture
+def grouped(tmp_path, monkeypatch):
+    """Count the dates grouped from scratch, in a scratch directory."""
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    group = data_manager._group
+    monkeypatch.setattr(data_manager, '_group', lambda items: calls.append(len(items)) or group(items))
+    return calls
+
+
+def _saved():
+    data = {"headlines": {}, "processed_urls": set(), "last_run": ""}
+    add_headlines(data, "2024-05-19", [_item(1, "SC"), _item(2, "TAO"), _item(3, "SC")])
+    add_headlines(data, "2024-05-20", [_item(4, "TAO")])
+    save_data(data)
+    return data
+
+
+def test_groups_are_saved_beside_headlines_json(grouped):
+    _saved()
+    with open('headlines.json', encoding='utf-8') as f:
+        assert set(json.load(f)) == {"headlines", "processed_urls", "last_run"}
+    with open(data_manager.GROUPS_FILE, 'rb') as f:
+        assert marshal.load(f) == {"2024-05-19": (3, {"SC": [0, 2], "TAO": [1]}), "2024-05-20": (1, {"TAO": [0]})}
+
+
+def test_load_reuses_saved_groups(grouped):
+    _saved()
+    data = load_previous_data()
+    assert grouped == []
+    assert data["groups"]["2024-05-19"] == {"SC": [0, 2], "TAO": [1]}
+    assert "dirty_dates" not in data
+
+
+def test_load_regroups_only_dates_whose_count_changed(grouped):
+    _saved()
+    with open('headlines.json', encoding='utf-8') as f:
+        stored = json.load(f)
+    stored["headlines"]["2024-05-20"].append(_item(5, "SC"))  # Written by a run that lost the groups file update
+    with open('headlines.json', 'w', encoding='utf-8') as f:
+        json.dump(stored, f)
+    data = load_previous_data()
+    assert grouped == [2]
+    assert data["groups"]["2024-05-20"] == {"TAO": [0], "SC": [1]}
+
+
+@pytest.mark.parametrize("damage", ["remove", "truncate"])
+def test_missing_or_broken_groups_file_groups_everything(grouped, damage):
+    _saved()
+    if damage == "remove":
+        os.remove(data_manager.GROUPS_FILE)
+    else:
+        with open(data_manager.GROUPS_FILE, 'r+b') as f:
+            f.truncate(10)
+    assert load_previous_data()["groups"]["2024-05-19"] == {"SC": [0, 2], "TAO": [1]}
+    assert sorted(grouped) == [1, 3]
+
+
+def test_only_dirty_dates_are_checked_again(grouped):
+    data = _saved()
+    data.pop("dirty_dates")  # As after the pages were generated
+    data["headlines"]["2024-05-19"].append(_item(6, "MFA"))  # Behind the buckets' back
+    ensure_groups(data)
+    assert grouped == []
+    mark_dirty(data, "2024-05-19")
+    assert ensure_groups(data)["2024-05-19"] == {"SC": [0, 2], "TAO": [1], "MFA": [3]}
+    assert grouped == [4]
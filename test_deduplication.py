@@ -5,6 +5,7 @@ import time
 from datetime import datetime
 from data_manager import load_previous_data, save_data, deduplicate_items
 from scraper import scrape_site
+from translator import translate_items
 from notifier import prepare_telegram_messages
 import config
 
@@ -37,6 +38,8 @@ async def run_real_scrape_test(run_number):
             all_new_items_by_site[name] = items
             logging.info(f"Found {len(items)} items from {name}")
 
+    translate_items([item for items in all_new_items_by_site.values() for item in items])
+
     # Prepare telegram messages
     if all_new_items_by_site:
         messages = await prepare_telegram_messages(all_new_items_by_site)
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import pytest
+import pytz
+
+import digest
+from digest import DigestStore
+
+NEW_YORK = pytz.timezone("America/New_York")  # DST began 2024-03-10 02:00
+
+
+def _item(n, source="SC", chinese=None):
+    return {"chinese_title": chinese or f"国务院召开第{n}次常务会议", "english_title": f"State Council meeting {n}",
+            "url": f"https://www.gov.cn/content_{n}.htm", "source": source}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(digest, 'DIGEST_TIMEZONE', "America/New_York")
+    monkeypatch.setattr(digest, 'DIGEST_SCHEDULE', "08:00")
+    store = DigestStore(str(tmp_path / "digest.sqlite3"))
+    yield store
+    store.close()
+
+
+def _at(*args):
+    return NEW_YORK.localize(datetime(*args))
+
+
+def test_first_run_starts_collecting_without_a_digest(store):
+    assert store.due(_at(2024, 5, 20, 9, 0)) is False
+    assert store.due(_at(2024, 5, 20, 23, 0)) is False  # The 08:00 slot passed before collecting began
+    assert store.due(_at(2024, 5, 21, 8, 0)) is True
+
+
+def test_due_once_per_scheduled_time(store):
+    store.mark_emitted(_at(2024, 5, 20, 8, 5), clear=False)
+    assert store.due(_at(2024, 5, 21, 7, 59)) is False
+    assert store.due(_at(2024, 5, 21, 8, 0)) is True
+    store.mark_emitted(_at(2024, 5, 21, 8, 0))
+    assert store.due(_at(2024, 5, 21, 20, 0)) is False
+
+
+def test_schedule_uses_the_offset_of_its_own_date_across_dst(store):
+    # Last digest went out before Saturday's 08:00 EST slot; on Sunday morning (now EDT) it is still owed
+    store.mark_emitted(_at(2024, 3, 9, 7, 30), clear=False)
+    assert store.due(_at(2024, 3, 10, 7, 30)) is True
+    store.mark_emitted(_at(2024, 3, 10, 7, 31), clear=False)
+    assert store.due(_at(2024, 3, 10, 7, 59)) is False
+    assert store.due(datetime(2024, 3, 10, 12, 0, tzinfo=pytz.utc)) is True  # 08:00 EDT
+
+
+def test_build_merges_titles_and_ranks_by_source_count(store):
+    store.add([_item(1), _item(2), _item(3, "MFA", chinese=_item(1)["chinese_title"])])
+    assert store.add([_item(2)]) == 0  # Already queued
+    items_by_source, pending = store.build()
+    assert pending == 3
+    assert [item["url"][-6:] for item in items_by_source["SC"]] == ["_1.htm", "_2.htm"]  # Reported twice: first
+    assert "MFA" not in items_by_source
+
+
+def test_build_applies_the_caps(store, monkeypatch):
+    monkeypatch.setattr(digest, 'DIGEST_MAX_ITEMS', 3)
+    monkeypatch.setattr(digest, 'DIGEST_MAX_ITEMS_PER_SOURCE', 2)
+    store.add([_item(n) for n in range(3)] + [_item(n, "MFA") for n in range(10, 13)])
+    items_by_source, pending = store.build()
+    assert pending == 6
+    assert {source: len(items) for source, items in items_by_source.items()} in ({"SC": 2, "MFA": 1}, {"SC": 1, "MFA": 2})
+
+
+def test_already_digested_titles_are_left_out(store):
+    store.add([_item(1), _item(2)])
+    items_by_source, _ = store.build()
+    store.mark_emitted(_at(2024, 5, 20, 8, 0), sent_items=items_by_source["SC"])
+    assert store.build() == ({}, 0)
+
+    republished = dict(_item(1), url="https://www.gov.cn/content_1_new.htm")
+    store.add([republished, _item(4)])
+    items_by_source, pending = store.build()
+    assert pending == 1
+    assert [item["url"][-6:] for item in items_by_source["SC"]] == ["_4.htm"]
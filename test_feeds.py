@@ -0,0 +1,76 @@
+import json
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import feeds
+from data_manager import ensure_groups
+from feeds import ATOM_NS, FeedWriter, recent_items, slugify, update_feeds
+
+
+def _item(n, date, source):
+    return {"chinese_title": f"标题{n}", "english_title": f"Headline {n}", "source": source,
+            "url": f"https://example.gov.cn/{n}.htm", "date": f"{date} 08:{n % 60:02d}:00"}
+
+
+@pytest.fixture(autouse=True)
+def sources(monkeypatch):
+    monkeypatch.setattr(feeds, 'WEBSITES', {"Busy": "https://busy.example", "Quiet": "https://quiet.example"})
+
+
+def _headlines(days=10, per_day=4):
+    headlines = {}
+    n = 0
+    for day in range(1, days + 1):
+        date = f"2024-05-{day:02d}"
+        headlines[date] = []
+        for _ in range(per_day):
+            headlines[date].append(_item(n, date, "Busy"))
+            n += 1
+    headlines["2024-05-01"].append(_item(n, "2024-05-01", "Quiet"))
+    return headlines
+
+
+def _urls(items):
+    return [int(item["url"].rsplit("/", 1)[1].split(".")[0]) for item in items]
+
+
+@pytest.mark.parametrize("use_groups", [True, False])
+def test_recent_items_newest_first(use_groups):
+    headlines = _headlines()
+    groups = ensure_groups({"headlines": headlines}) if use_groups else None
+    overall, per_source = recent_items(headlines, groups, limit=6)
+    assert _urls(overall) == [39, 38, 37, 36, 35, 34]
+    assert _urls(per_source["Busy"]) == [39, 38, 37, 36, 35, 34]
+    assert _urls(per_source["Quiet"]) == [40]
+
+
+def test_walk_is_capped_by_date():
+    headlines = _headlines()
+    overall, per_source = recent_items(headlines, ensure_groups({"headlines": headlines}), limit=50, max_dates=3)
+    assert _urls(overall) == list(range(39, 27, -1))
+    assert per_source["Quiet"] == []  # Its only item is older than the dates visited
+
+
+def test_unchanged_feeds_are_not_rewritten(tmp_path):
+    headlines = _headlines()
+    assert update_feeds(str(tmp_path), headlines) == 3
+    assert update_feeds(str(tmp_path), headlines) == 0
+
+    headlines["2024-05-10"].append(_item(41, "2024-05-10", "Busy"))
+    writer = FeedWriter(str(tmp_path))
+    assert sorted(slug for slug, *_ in writer.plan(headlines)) == ["all", slugify("Busy")]
+
+
+def test_feed_contents(tmp_path):
+    update_feeds(str(tmp_path), _headlines())
+    root = os.path.join(str(tmp_path), "feeds")
+    atom = ET.parse(os.path.join(root, "quiet.atom.xml")).getroot()
+    entries = atom.findall(f"{{{ATOM_NS}}}entry")
+    assert [entry.find(f"{{{ATOM_NS}}}id").text for entry in entries] == ["https://example.gov.cn/40.htm"]
+    assert atom.find(f"{{{ATOM_NS}}}updated").text == "2024-05-01T08:40:00+00:00"
+    with open(os.path.join(root, "index.json"), encoding="utf-8") as f:
+        index = {feed["slug"]: feed for feed in json.load(f)["feeds"]}
+    assert sorted(index) == ["all", "busy", "quiet"]
+    assert index["all"]["items"] == 41
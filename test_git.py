@@ -1,12 +1,118 @@
+import subprocess
+
+import pytest
+
 from git_manager import GitManager
-import logging
 
-logging.basicConfig(level=logging.INFO)
 
-def test_git_push():
-    git_manager = GitManager()
-    result = git_manager.push_changes()
-    print(f"Push successful: {result}")
+def _git(*args):
+    return subprocess.run(['git', *args], check=True, capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _git('init', '-q')
+    _git('config', 'user.email', 'bot@example.com')
+    _git('config', 'user.name', 'bot')
+    (tmp_path / 'docs').mkdir()
+    (tmp_path / 'docs' / 'index.html').write_text('<p>index</p>\n')
+    (tmp_path / 'docs' / 'old.html').write_text('<p>old</p>\n')
+    _git('add', '.')
+    _git('commit', '-q', '-m', 'init')
+    return tmp_path
+
+
+def test_unchanged_tree_has_no_changes(repo):
+    (repo / 'docs' / 'index.html').write_text('<p>index</p>\n')  # Rewritten with the same content
+    assert GitManager()._changed_files(['docs']) == []
+
+
+def test_modified_added_and_deleted_files(repo):
+    (repo / 'docs' / 'index.html').write_text('<p>new index</p>\n')
+    (repo / 'docs' / 'days').mkdir()
+    (repo / 'docs' / 'days' / '2024-01-01.html').write_text('<p>day</p>\n')
+    (repo / 'docs' / 'old.html').unlink()
+    (repo / 'outside.txt').write_text('not published\n')
+    changed = dict((path, status) for status, path in GitManager()._changed_files(['docs']))
+    assert changed == {'docs/index.html': 'M', 'docs/days/2024-01-01.html': '??', 'docs/old.html': 'D'}
+
+
+def test_rename_lists_both_paths(repo):
+    _git('mv', 'docs/old.html', 'docs/new.html')
+    assert sorted(path for _, path in GitManager()._changed_files(['docs'])) == ['docs/new.html', 'docs/old.html']
+
+
+def test_paths_with_spaces_and_unicode(repo):
+    (repo / 'docs' / '新闻 page.html').write_text('<p>新闻</p>\n')
+    assert GitManager()._changed_files(['docs']) == [('??', 'docs/新闻 page.html')]
+
+
+def test_publish_commits_a_rename(repo, tmp_path_factory, monkeypatch):
+    remote = tmp_path_factory.mktemp('remote')
+    _git('init', '-q', '--bare', str(remote))
+    _git('remote', 'add', 'origin', str(remote))
+    monkeypatch.setattr('git_manager.GIT_DATA_FILES', [])
+    _git('mv', 'docs/old.html', 'docs/new.html')
+    (repo / 'docs' / 'index.html').unlink()
+    report = GitManager().publish_changes()
+    assert report['files'] == 3
+    assert GitManager()._changed_files(['docs']) == []
+    tree = subprocess.run(['git', 'ls-tree', '-r', '--name-only', 'HEAD'], capture_output=True, text=True).stdout
+    assert tree.split() == ['docs/new.html']
+
+
+@pytest.fixture
+def remote(repo, tmp_path_factory, monkeypatch):
+    remote = tmp_path_factory.mktemp('remote')
+    _git('init', '-q', '--bare', str(remote))
+    _git('remote', 'add', 'origin', str(remote))
+    _git('push', '-q', 'origin', 'HEAD')
+    monkeypatch.setattr('git_manager.GIT_DATA_FILES', ['headlines.json', 'headline_groups.marshal'])
+    return remote
+
+
+def test_unchanged_run_creates_no_commit(repo, remote):
+    (repo / 'headlines.json').write_text('{"headlines": {}}')
+    GitManager().publish_changes()
+    head, data = _git('rev-parse', 'HEAD'), _git('rev-parse', 'data')
+    (repo / 'docs' / 'index.html').write_text('<p>index</p>\n')  # Re-rendered identically
+    report = GitManager().publish_changes()
+    assert report == {"files": 0, "bytes": 0, "data_bytes": 0, "data_squashed": False}
+    assert (_git('rev-parse', 'HEAD'), _git('rev-parse', 'data')) == (head, data)
+
+
+def test_data_files_go_to_the_data_branch_and_are_restored(repo, remote):
+    (repo / 'headlines.json').write_text('{"headlines": {"2024-05-20": []}}')
+    (repo / 'headline_groups.marshal').write_bytes(b'\xe3\x00binary')
+    report = GitManager().publish_changes()
+    assert report['files'] == 0 and report['data_bytes'] == len('{"headlines": {"2024-05-20": []}}') + 8
+    assert 'headlines.json' not in _git('ls-tree', '--name-only', 'HEAD')  # Not in the published history
+    assert _git('--git-dir', str(remote), 'ls-tree', '--name-only', 'data').split() == \
+        ['headline_groups.marshal', 'headlines.json']
+
+    (repo / 'headlines.json').write_text('{"headlines": {"2024-05-21": []}}')
+    GitManager().publish_changes()
+    assert _git('rev-list', '--count', 'data') == '2'
+
+    (repo / 'headlines.json').unlink()
+    (repo / 'headline_groups.marshal').unlink()
+    _git('update-ref', '-d', 'refs/heads/data')  # A fresh checkout only has the remote's branch
+    assert GitManager().restore_data_files() is True
+    assert (repo / 'headlines.json').read_text() == '{"headlines": {"2024-05-21": []}}'
+    assert (repo / 'headline_groups.marshal').read_bytes() == b'\xe3\x00binary'
+
+
+def test_old_data_branch_is_squashed(repo, remote, monkeypatch):
+    (repo / 'headlines.json').write_text('{"headlines": {}}')
+    GitManager().publish_changes()
+    monkeypatch.setattr('git_manager.GIT_DATA_SQUASH_DAYS', -1)
+    (repo / 'headlines.json').write_text('{"headlines": {"2024-05-20": []}}')
+    assert GitManager().publish_changes()['data_squashed'] is True
+    assert _git('--git-dir', str(remote), 'rev-list', '--count', 'data') == '1'
+
 
-if __name__ == "__main__":
-    test_git_push() 
\ No newline at end of file
+def test_restore_without_a_data_branch_keeps_the_working_tree(repo, remote):
+    (repo / 'headlines.json').write_text('{"local": true}')
+    assert GitManager().restore_data_files() is False
+    assert (repo / 'headlines.json').read_text() == '{"local": true}'
@@ -0,0 +1,115 @@
+import json
+import os
+
+from headline_index import HeadlineIndex, tokenize
+
+
+def _item(n, chinese, english, source="SC"):
+    return {"chinese_title": chinese, "english_title": english, "source": source,
+            "url": f"https://www.gov.cn/content_{n}.htm"}
+
+
+DATA = {"headlines": {
+    "2024-05-19": [_item(1, "国务院召开常务会议", "State Council holds executive meeting"),
+                   _item(2, "外交部发言人答记者问", "Foreign Ministry spokesperson answers questions", "MFA")],
+    "2024-05-20": [_item(3, "国务院发布统计数据", "State Council releases statistics"),
+                   _item(4, "台&amp;办", "TAO &amp; briefing", "TAO")],
+}}
+
+
+def test_tokenize_bigrams_words_and_unigrams():
+    assert tokenize("国务院 meets the Press") == {"国务", "务院", "meets", "press"}
+    assert tokenize("台&amp;办") == {"台", "办"}
+
+
+def test_bigram_search_newest_first():
+    index = HeadlineIndex()
+    assert index.add_data(DATA) == 4
+    assert [item["url"][-6:] for _, item in index.search("国务院")] == ["_3.htm", "_1.htm"]
+    assert [date for date, _ in index.search("务院 statistics")] == ["2024-05-20"]
+    assert index.search("国务院 外交") == []
+
+
+def test_single_character_query_matches_inside_bigrams():
+    index = HeadlineIndex()
+    index.add_data(DATA)
+    assert {item["url"][-6:] for _, item in index.search("院")} == {"_1.htm", "_3.htm"}
+    assert {item["url"][-6:] for _, item in index.search("办")} == {"_4.htm"}  # Indexed as a unigram
+    assert index.search("省") == []
+
+
+def test_readding_only_reindexes_changed_titles():
+    index = HeadlineIndex()
+    index.add_data(DATA)
+    assert index.add_data(DATA) == 0
+
+    pending = _item(5, "商务部召开新闻发布会", "商务部召开新闻发布会")
+    index.add(pending, "2024-05-20")
+    assert index.search("commerce") == []
+    translated = dict(pending, english_title="Ministry of Commerce holds press conference")
+    assert index.add(translated, "2024-05-20") is True
+    assert len(index.docs) == 5
+    assert [item for _, item in index.search("commerce")] == [translated]
+    assert [item for _, item in index.search("新闻")] == [translated]
+
+
+def test_latest_day_and_source_lookup():
+    index = HeadlineIndex()
+    index.add_data(DATA)
+    assert index.find_sources("sc") == ["SC"]
+    assert [item["url"][-6:] for _, item in index.latest("SC")] == ["_3.htm", "_1.htm"]
+    assert [item["url"][-6:] for _, item in index.day("2024-05-19")] == ["_2.htm", "_1.htm"]
+    assert index.day("2024-01-01") == []
+
+
+def test_add_data_indexes_only_appended_items_and_filled_translations():
+    index = HeadlineIndex()
+    data = {"headlines": {date: list(items) for date, items in DATA["headlines"].items()}}
+    index.add_data(data)
+    pending = dict(_item(5, "商务部召开新闻发布会", "商务部召开新闻发布会", "MOFCOM"), pending_translation=True)
+    data["headlines"]["2024-05-20"].append(pending)
+    data["headlines"]["2024-05-21"] = [_item(6, "国务院常务会议", "State Council executive meeting")]
+    assert index.add_data(data) == 2
+    assert index.pending == {"2024-05-20": {2}}
+
+    translated = {key: value for key, value in pending.items() if key != "pending_translation"}
+    data["headlines"]["2024-05-20"][2] = dict(translated, english_title="Ministry of Commerce holds press conference")
+    assert index.add_data(data) == 1
+    assert index.pending == {}
+    assert [item["url"][-6:] for _, item in index.search("commerce")] == ["_5.htm"]
+    assert index.add_data(data) == 0
+
+
+def test_latest_stays_newest_first_when_an_older_date_grows():
+    index = HeadlineIndex()
+    data = {"headlines": {date: list(items) for date, items in DATA["headlines"].items()}}
+    index.add_data(data)
+    data["headlines"]["2024-05-19"].append(_item(7, "国务院新闻", "State Council news"))
+    index.add_data(data)
+    assert index.by_source["SC"] == [0, 4, 2]
+    assert [item["url"][-6:] for _, item in index.latest("SC")] == ["_3.htm", "_7.htm", "_1.htm"]
+    assert [item["url"][-6:] for _, item in index.latest("a")] == ["_4.htm", "_2.htm"]  # TAO and MFA merged
+    assert [item["url"][-6:] for _, item in index.search("国务")] == ["_3.htm", "_7.htm", "_1.htm"]
+
+
+def test_service_refreshes_incrementally_and_pages_from_remembered_results(tmp_path):
+    from bot_commands import HeadlineService, format_page
+
+    path = tmp_path / "headlines.json"
+    path.write_text(json.dumps(DATA), encoding="utf-8")
+    service = HeadlineService(str(path))
+    service.refresh()
+    results = service.run("search", "国务院")
+    query_id = service.remember("search", "国务院", results)
+
+    grown = {"headlines": dict(DATA["headlines"], **{"2024-05-21": [_item(8, "国务院公报", "State Council gazette")]})}
+    path.write_text(json.dumps(grown), encoding="utf-8")
+    os.utime(path, (1, 1))
+    service.refresh()
+    assert len(service.index.docs) == 5
+    assert service.index.indexed == {"2024-05-19": 2, "2024-05-20": 2, "2024-05-21": 1}
+
+    command, argument, remembered = service.queries[query_id]
+    assert remembered is results and len(remembered) == 2
+    text, pages = format_page(command, argument, remembered, 0)
+    assert pages == 1 and "State Council releases statistics" in text
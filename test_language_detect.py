@@ -0,0 +1,33 @@
+import pytest
+
+import language_detect
+from language_detect import cjk_ratios, needs_translation
+
+
+def test_ratios_per_title_in_one_pass():
+    ratios = cjk_ratios(["国务院召开常务会议", "China's economy grows 5%", "", "第3季度 GDP 增长"])
+    assert ratios[0] == 1.0
+    assert ratios[1] == 0.0
+    assert ratios[2] == 0.0
+    assert ratios[3] == pytest.approx(5 / 8)
+
+
+def test_newlines_inside_a_title_do_not_shift_the_others():
+    assert cjk_ratios(["国务院\n召开会议", "Xi meets Biden"]) == [1.0, 0.0]
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("外交部发言人答记者问", True),
+    ("Global Times editorial on tariffs", False),
+    ("Wang Yi: 'Taiwan is part of China' in Munich", False),
+    ("Experts hail 新质生产力 as growth engine for the decade ahead", True),  # Low ratio, but a CJK run
+    ("Xi (习) meets delegation", False),  # A lone ideograph is not worth a call
+    ("𠮷野家 opens new stores", True),  # Extension B ideographs count as CJK
+])
+def test_needs_translation(title, expected):
+    assert needs_translation([title], ["GT China Politics"]) == [expected]
+
+
+def test_site_override_wins(monkeypatch):
+    monkeypatch.setattr(language_detect, 'TRANSLATION_OVERRIDES', {"Always": True, "Never": False})
+    assert needs_translation(["English title", "中文标题", "中文标题"], ["Always", "Never", "Other"]) == [True, False, True]
@@ -0,0 +1,66 @@
+import asyncio
+import re
+
+from config import MAX_MESSAGE_LENGTH
+from message_layout import item_fragment, pack_messages, site_header, telegram_length
+from notifier import prepare_telegram_messages
+
+URL = "https://www.gov.cn/lianbo/fabu/202405/content_{}.htm"
+
+
+def _item(n, title="国务院召开常务会议", english="State Council holds executive meeting"):
+    return {"chinese_title": title, "english_title": english, "url": URL.format(n), "source": "SC"}
+
+
+def _sites(message):
+    return re.findall(r"Updates from (S\d)", message)
+
+
+def test_length_counts_visible_utf16_units():
+    assert telegram_length("<b>News</b> &amp; <a href='x'>more</a>") == len("News & more")
+    assert telegram_length("📰 新闻") == 5  # The emoji is a surrogate pair
+
+
+def test_sections_packed_first_fit_decreasing():
+    capacity = 1000
+    base = site_header("S0").length + item_fragment(_item(0, english="")).length
+
+    def site(n, length):
+        return [_item(n, english="x" * (length - base))]
+
+    # Next-fit in this order needs three parts; first-fit decreasing pairs 550+400 and 500+450
+    items_by_site = {"S0": site(0, 550), "S1": site(1, 450), "S2": site(2, 500), "S3": site(3, 400)}
+    messages = pack_messages(items_by_site, capacity)
+    assert [_sites(message) for message in messages] == [["S0", "S3"], ["S1", "S2"]]
+    assert all(telegram_length(message) <= capacity for message in messages)
+
+
+def test_large_site_split_into_continuation_parts():
+    items = [_item(n, english=f"Headline {n} " + "policy " * 20) for n in range(120)]
+    messages = pack_messages({"S0": items, "S1": [_item(999)]})
+    assert len(messages) > 2
+    assert all(telegram_length(message) <= MAX_MESSAGE_LENGTH for message in messages)
+    assert "(cont.)" not in messages[0] and all("(cont.)" in message for message in messages[1:] if "S0" in message)
+    urls = re.findall(r"content_(\d+)\.htm", "".join(messages))
+    assert sorted(map(int, urls)) == list(range(120)) + [999]
+    assert [int(url) for url in urls if url != "999"] == list(range(120))  # Reading order is kept
+
+
+def test_parts_stay_under_telegram_limit_with_entities_and_emoji():
+    items = [_item(n, title="中国&amp;世界📈" * 8, english="Markets &amp; trade 🚢 " * 6) for n in range(200)]
+    messages = asyncio.run(prepare_telegram_messages({"S0": items[:120], "S1": items[120:]},
+                                                     heading="<b>📬 Digest</b>\n\n"))
+    assert messages[0].startswith("<b>📬 Digest</b>")
+    assert all(telegram_length(message) <= MAX_MESSAGE_LENGTH < 4096 for message in messages)
+    assert sum(message.count("Read more") for message in messages) == 200
+
+
+def test_item_too_long_for_any_part_is_skipped():
+    messages = pack_messages({"S0": [_item(0, english="x" * (MAX_MESSAGE_LENGTH + 1)), _item(1)]})
+    assert len(messages) == 1
+    assert URL.format(1) in messages[0] and URL.format(0) not in messages[0]
+
+
+def test_duplicate_urls_sent_once():
+    messages = asyncio.run(prepare_telegram_messages({"S0": [_item(1)], "S1": [_item(1), _item(2)]}))
+    assert "".join(messages).count(URL.format(1)) == 1
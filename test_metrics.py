@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+
+import metrics
+from config import METRICS_PREFIX
+from metrics import Metrics, timed
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = Metrics()
+    monkeypatch.setattr(metrics, '_metrics', registry)
+    return registry
+
+
+def test_timer_records_even_when_the_block_raises(registry):
+    with pytest.raises(ValueError):
+        with registry.timer("scrape_fetch", site="SC"):
+            raise ValueError("boom")
+    registry.observe("scrape_fetch", 0.5, site="SC")
+    count, total, longest = registry.timers[("scrape_fetch", (("site", "SC"),))]
+    assert count == 2 and total >= 0.5 and longest == 0.5
+
+
+def test_timed_wraps_functions_and_coroutines(registry):
+    @timed("save_data")
+    def save():
+        return "saved"
+
+    @timed("deliver", chat="1")
+    async def deliver():
+        return "delivered"
+
+    assert save() == "saved"
+    assert asyncio.run(deliver()) == "delivered"
+    assert registry.timers[("save_data", ())][0] == 1
+    assert registry.timers[("deliver", (("chat", "1"),))][0] == 1
+
+
+def test_report_splits_sites_from_stages(registry, tmp_path):
+    registry.observe("scrape_fetch", 1.25, site="SC")
+    registry.observe("pipeline_wait", 0.5, stage="translate")
+    registry.inc("scrape_bytes", 2048, site="SC")
+    registry.inc("telegram_parts", 3, status="sent")
+    path = tmp_path / "run_report.json"
+    registry.write_report(str(path))
+    report = json.loads(path.read_text(encoding="utf-8"))
+    assert report["sites"] == {"SC": {"scrape_fetch_seconds": 1.25, "scrape_bytes": 2048}}
+    assert report["stages"]["pipeline_wait[stage=translate]"]["count"] == 1
+    assert report["counters"] == [{"name": "telegram_parts", "labels": {"status": "sent"}, "value": 3}]
+
+
+def test_prometheus_families_are_typed_once_and_contiguous(registry, tmp_path):
+    registry.observe("scrape_fetch", 0.5, site="A")
+    registry.observe("scrape_fetch", 0.25, site='B "quoted"')
+    registry.observe("generate_pages", 2.0)
+    registry.inc("scrape_bytes", 10, site="A")
+    path = tmp_path / "metrics.prom"
+    registry.write_prometheus(str(path))
+    lines = path.read_text(encoding="utf-8").splitlines()
+
+    families = {}
+    current = None
+    for line in lines:
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            assert name not in families
+            families[name] = kind
+            current = name
+        else:
+            sample = line.split("{")[0].split(" ")[0]
+            assert sample.startswith(current)  # Every sample follows its own family's TYPE line
+
+    fetch = f"{METRICS_PREFIX}_scrape_fetch_seconds"
+    assert families[fetch] == "summary"
+    assert families[f"{fetch}_max"] == "gauge"
+    assert families[f"{METRICS_PREFIX}_scrape_bytes_total"] == "counter"
+    assert f'{fetch}_sum{{site="A"}} 0.500000' in lines
+    assert f'{fetch}_count{{site="B \\"quoted\\""}} 1' in lines
+
+
+def test_pipeline_publishes_queue_depth_gauges_at_close(registry, tmp_path):
+    from pipeline import TranslationPipeline
+
+    translated = []
+    pipeline = TranslationPipeline(maxsize=4, workers=1, batch_size=2, batch_wait=0.01, translate=translated.extend)
+    pipeline.start()
+    for n in range(6):
+        pipeline.submit({"n": n})
+    pipeline.close()
+    assert len(translated) == 6
+
+    gauges = {(name, dict(labels)["stage"]): value for (name, labels), value in registry.gauges.items()}
+    assert set(gauges) == {(f"pipeline_queue_depth_{kind}", stage) for kind in ("max", "avg") for stage in ("scrape", "translate")}
+    assert 1 <= gauges[("pipeline_queue_depth_max", "scrape")] <= 4
+    assert gauges[("pipeline_queue_depth_avg", "scrape")] <= gauges[("pipeline_queue_depth_max", "scrape")]
+
+    path = tmp_path / "metrics.prom"
+    registry.write_prometheus(str(path))
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert f"# TYPE {METRICS_PREFIX}_pipeline_queue_depth_max gauge" in lines
+    assert f'{METRICS_PREFIX}_pipeline_queue_depth_max{{stage="scrape"}} {gauges[("pipeline_queue_depth_max", "scrape")]}' in lines
+    report = registry.report()
+    assert {"name": "pipeline_queue_depth_max", "labels": {"stage": "translate"},
+            "value": gauges[("pipeline_queue_depth_max", "translate")]} in report["gauges"]
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from telegram.error import BadRequest
+
+from notifier import deliver_outbox
+from outbox import FAILED, READY, SENT, STAGED, Outbox
+from rate_limiter import TelegramRateLimiter
+
+
+def _part(n):
+    return f"• <b>Headline {n}</b>\n  <a href='https://www.gov.cn/content_{n}.htm?a=1&amp;b=2'>Read more</a>\n\n"
+
+
+class FakeBot:
+    """Records accepted messages; `failures` maps message text to the exception to raise once."""
+
+    def __init__(self, failures=None):
+        self.sent = []
+        self.failures = dict(failures or {})
+
+    async def send_message(self, chat_id, text, **kwargs):
+        error = self.failures.pop(text, None)
+        if error:
+            raise error
+        self.sent.append((chat_id, text))
+
+
+def _deliver(bot, outbox):
+    async def run():
+        limiter = TelegramRateLimiter(global_rate=1000, global_burst=1000, chat_rate=1000, chat_burst=1000)
+        return await deliver_outbox(bot, outbox, limiter)
+    return asyncio.run(run())
+
+
+def _statuses(outbox):
+    return [status for status, in outbox.conn.execute("SELECT status FROM parts ORDER BY id")]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'outbox.sqlite3')
+
+
+def test_staged_parts_wait_for_commit(path):
+    outbox = Outbox(path)
+    outbox.stage("run-1", {"100": [_part(1), "  "], "-200": [_part(2)]})
+    assert _statuses(outbox) == [STAGED, STAGED]
+    assert outbox.pending() == {}
+    outbox.commit_run("run-1")
+    assert sorted(outbox.pending()) == ["-200", "100"]
+
+
+def test_recovery_after_crash_before_commit(path):
+    outbox = Outbox(path)
+    outbox.stage("run-1", {"100": [_part(1), _part(2)]})
+    outbox.close()  # The run died before commit_run
+
+    outbox = Outbox(path)
+    # Only item 1 made it into the saved data (stored URLs are compared normalized)
+    outbox.recover({"HTTPS://WWW.GOV.CN/content_1.htm?a=1&b=2#top"})
+    assert [text for _, text in outbox.pending()["100"]] == [_part(1)]
+    assert _statuses(outbox) == [READY]
+
+
+def test_delivery_is_idempotent(path):
+    outbox = Outbox(path)
+    outbox.stage("run-1", {"100": [_part(1), _part(2)], "200": [_part(3)]})
+    outbox.commit_run("run-1")
+    bot = FakeBot()
+    assert _deliver(bot, outbox) == 3
+    assert _deliver(bot, outbox) == 0
+    assert sorted(bot.sent) == [("100", _part(1)), ("100", _part(2)), ("200", _part(3))]
+    assert _statuses(outbox) == [SENT, SENT, SENT]
+
+
+def test_resume_in_order_after_transient_failure(path):
+    outbox = Outbox(path)
+    outbox.stage("run-1", {"100": [_part(1), _part(2), _part(3)]})
+    outbox.commit_run("run-1")
+    bot = FakeBot({_part(2): RuntimeError("connection reset")})
+    assert _deliver(bot, outbox) == 1
+    outbox.close()
+
+    outbox = Outbox(path)  # Next run
+    assert _deliver(bot, outbox) == 2
+    assert [text for _, text in bot.sent] == [_part(1), _part(2), _part(3)]
+
+
+def test_rejected_part_is_retired_and_delivery_continues(path):
+    outbox = Outbox(path)
+    outbox.stage("run-1", {"100": [_part(1), _part(2)]})
+    outbox.commit_run("run-1")
+    bot = FakeBot({_part(1): BadRequest("Message is too long")})
+    assert _deliver(bot, outbox) == 1
+    assert _statuses(outbox) == [FAILED, SENT]
+    assert outbox.pending() == {}
+
+
+def test_part_fails_after_max_attempts(path, monkeypatch):
+    monkeypatch.setattr('outbox.OUTBOX_MAX_ATTEMPTS', 2)
+    outbox = Outbox(path)
+    outbox.stage("run-1", {"100": [_part(1)]})
+    outbox.commit_run("run-1")
+    (part_id, _), = outbox.pending()["100"]
+    outbox.fail(part_id)
+    assert _statuses(outbox) == [READY]
+    outbox.fail(part_id)
+    assert _statuses(outbox) == [FAILED]
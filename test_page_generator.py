@@ -0,0 +1,184 @@
+import functools
+import json
+import os
+import shutil
+
+import pytest
+from jinja2 import Environment, Template
+
+import page_generator
+import render_scheduler
+from config import COMPRESS_MANIFEST_FILE, JINJA_BYTECODE_CACHE_DIR, RENDER_PARALLEL_MIN_JOBS, WEBSITES
+from data_manager import add_headlines, ensure_groups, mark_dirty
+from page_generator import PageGenerator
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+DATES = ["2024-05-18", "2024-05-19", "2024-05-20"]
+
+
+def _item(n, date, english=None):
+    return {"chinese_title": f"国务院召开第{n}次常务会议", "english_title": english or f"State Council meeting {n}",
+            "url": f"https://www.gov.cn/content_{n}.htm", "source": "State Council News Releases",
+            "date": f"{date} 08:00:00"}
+
+
+def _data():
+    return {"headlines": {date: [_item(i * 10 + j, date) for j in range(3)] for i, date in enumerate(DATES)}}
+
+
+@pytest.fixture
+def render(tmp_path, monkeypatch):
+    """Generate the site in a scratch directory; each call returns the day pages it rendered."""
+    shutil.copytree(os.path.join(REPO_ROOT, 'templates'), tmp_path / 'templates')
+    monkeypatch.chdir(tmp_path)
+    original = PageGenerator.run_job
+
+    def run(data):
+        rendered = []
+
+        def run_job(self, kind, args):
+            if kind == 'day':
+                rendered.append(args[2])
+            return original(self, kind, args)
+
+        monkeypatch.setattr(PageGenerator, 'run_job', run_job)
+        PageGenerator('docs').generate_pages(data)
+        return sorted(rendered)
+    return run
+
+
+def _page(date):
+    with open(os.path.join('docs', 'days', f"{date}.html"), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_cold_render_writes_every_day_and_the_manifest(render):
+    assert render(_data()) == DATES
+    with open(os.path.join('docs', 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert set(manifest) == {'templates', 'pages', 'days'}
+    assert manifest['days']["2024-05-19"] == [3, "2024-05-20", "2024-05-18"]
+    assert "days/2024-05-20.html" in manifest['pages']
+
+
+def test_unchanged_data_renders_nothing(render):
+    render(_data())
+    stamps = {name: os.stat(os.path.join('docs', name)).st_mtime_ns for name in ('index.html', 'manifest.json')}
+    assert render(_data()) == []
+    assert {name: os.stat(os.path.join('docs', name)).st_mtime_ns for name in stamps} == stamps
+
+
+def test_appended_items_rerender_only_their_day(render):
+    data = _data()
+    render(data)
+    add_headlines(data, "2024-05-19", [_item(99, "2024-05-19")])
+    assert render(data) == ["2024-05-19"]
+    assert "content_99" in _page("2024-05-19")
+    assert "dirty_dates" not in data
+
+
+def test_translation_filled_in_place_rerenders_its_day(render):
+    data = _data()
+    ensure_groups(data)
+    render(data)
+    data["headlines"]["2024-05-18"][0]["english_title"] = "Premier chairs State Council executive meeting"
+    mark_dirty(data, "2024-05-18")
+    assert render(data) == ["2024-05-18"]
+    assert "Premier chairs" in _page("2024-05-18")
+
+
+def test_new_date_rerenders_its_older_neighbour(render):
+    data = _data()
+    render(data)
+    add_headlines(data, "2024-05-21", [_item(40, "2024-05-21")])
+    assert render(data) == ["2024-05-20", "2024-05-21"]  # 05-20 gains a "newer" link
+
+
+def test_template_change_rerenders_everything(render):
+    render(_data())
+    with open(os.path.join('templates', 'day.html'), 'a', encoding='utf-8') as f:
+        f.write("{# edited #}\n")
+    assert render(_data()) == DATES
+
+
+def test_removed_date_loses_its_page(render):
+    data = _data()
+    render(data)
+    del data["headlines"]["2024-05-18"]
+    data.pop("groups", None)
+    assert render(data) == ["2024-05-19"]  # Its "older" link is gone
+    assert not os.path.exists(os.path.join('docs', 'days', '2024-05-18.html'))
+
+
+def test_later_runs_load_templates_from_the_bytecode_cache(render, monkeypatch):
+    render(_data())
+    assert os.listdir(JINJA_BYTECODE_CACHE_DIR)
+    compiled = []
+    original = Environment.compile
+
+    def compile(self, source, name=None, *args, **kwargs):
+        compiled.append(name)
+        return original(self, source, name, *args, **kwargs)
+
+    monkeypatch.setattr(Environment, 'compile', compile)
+    data = _data()
+    add_headlines(data, "2024-05-20", [_item(99, "2024-05-20")])
+    assert render(data) == ["2024-05-20"]
+    assert compiled == []
+    shutil.rmtree(JINJA_BYTECODE_CACHE_DIR)
+    add_headlines(data, "2024-05-20", [_item(98, "2024-05-20")])
+    render(data)
+    assert "day.html" in compiled  # Without the cache the same run compiles
+
+
+def test_pages_are_streamed_to_disk(render, monkeypatch):
+    def render_whole(self, *args, **kwargs):
+        raise AssertionError("pages must be written from Template.generate")
+
+    monkeypatch.setattr(Template, 'render', render_whole)
+    render(_data())
+    assert "State Council meeting 12" in _page("2024-05-19")
+    assert not [name for name in os.listdir(os.path.join('docs', 'days')) if name.endswith('.tmp')]
+
+
+def _tree(root):
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if filename != COMPRESS_MANIFEST_FILE:  # Records mtimes
+                with open(path, 'rb') as f:
+                    files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+def test_process_pool_and_serial_render_write_identical_sites(tmp_path, monkeypatch, caplog):
+    shutil.copytree(os.path.join(REPO_ROOT, 'templates'), tmp_path / 'templates')
+    monkeypatch.chdir(tmp_path)
+    dates = [f"2024-04-{day:02d}" for day in range(1, 31)] + [f"2024-05-{day:02d}" for day in range(1, 11)]
+    sources = list(WEBSITES)  # Every source feed gets items, so none is stamped with the current time
+    trees = {}
+    for workers in (1, 2):
+        monkeypatch.setattr(page_generator, 'run_jobs', functools.partial(render_scheduler.run_jobs, workers=workers))
+        data = {"headlines": {date: [dict(_item(i * 10 + j, date), source=sources[(i * 2 + j) % len(sources)])
+                                     for j in range(2)] for i, date in enumerate(dates)}}
+        with caplog.at_level('INFO'):
+            PageGenerator(f"docs{workers}").generate_pages(data)
+        trees[workers] = _tree(f"docs{workers}")
+    assert any("2 processes" in record.message for record in caplog.records)
+    assert len(trees[1]) > RENDER_PARALLEL_MIN_JOBS
+    assert trees[1] == trees[2]
+
+
+def test_precompress_without_brotli_warns_once(tmp_path, monkeypatch, caplog):
+    import assets
+
+    monkeypatch.setattr(assets, 'brotli', None)
+    monkeypatch.setattr(assets, '_brotli_warned', False)
+    (tmp_path / 'index.html').write_text('<p>headline</p>' * 200, encoding='utf-8')
+    with caplog.at_level('WARNING'):
+        assets.precompress(str(tmp_path))
+        assets.precompress(str(tmp_path))
+    assert [r.message for r in caplog.records if 'brotli' in r.message] == \
+        ["brotli is not installed; writing .gz siblings only (pip install brotli for .br)"]
+    assert (tmp_path / 'index.html.gz').exists() and not (tmp_path / 'index.html.br').exists()
@@ -0,0 +1,34 @@
+import asyncio
+import os
+import pstats
+import tracemalloc
+
+from profiler import RunProfiler
+
+
+async def _scrape(n):
+    await asyncio.sleep(0.01)
+    return [str(i) * 100 for i in range(n)]
+
+
+async def _run():
+    results = await asyncio.gather(*(_scrape(n) for n in range(3)))
+    return sum(len(result) for result in results)
+
+
+def test_profiler_writes_its_artifacts(tmp_path):
+    profiler = RunProfiler(out_dir=str(tmp_path), top_n=5, task_timing=True)
+    assert profiler.run(_run) == 3
+    assert sorted(os.listdir(profiler.out_dir)) == ["alloc-end.snapshot", "alloc-start.snapshot", "run.prof", "summary.txt"]
+
+    stats = pstats.Stats(os.path.join(profiler.out_dir, "run.prof"))
+    assert any(name == "_scrape" for _, _, name in stats.stats)
+    snapshot = tracemalloc.Snapshot.load(os.path.join(profiler.out_dir, "alloc-end.snapshot"))
+    assert snapshot.traces
+
+    with open(os.path.join(profiler.out_dir, "summary.txt"), encoding="utf-8") as f:
+        summary = f.read()
+    assert "=== Top 5 functions by cumulative time ===" in summary
+    assert "=== Asyncio tasks by total lifetime ===" in summary
+    assert profiler.tasks["_scrape"][0] == 3
+    assert not tracemalloc.is_tracing()
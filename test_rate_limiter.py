@@ -0,0 +1,96 @@
+import asyncio
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from rate_limiter import TelegramRateLimiter, TokenBucket, retry_after_seconds
+
+
+def _bucket(rate, capacity):
+    bucket = TokenBucket(rate, capacity)
+    bucket.updated = 0.0
+    return bucket
+
+
+def test_burst_then_steady_rate():
+    bucket = _bucket(rate=2, capacity=3)
+    for _ in range(3):
+        assert bucket.delay(0.0) == 0
+        bucket.consume()
+    assert bucket.delay(0.0) == pytest.approx(0.5)
+    assert bucket.delay(0.5) == 0
+
+
+def test_refill_is_capped_at_capacity():
+    bucket = _bucket(rate=10, capacity=2)
+    bucket.consume()
+    bucket.consume()
+    bucket.delay(100.0)
+    assert bucket.tokens == 2
+
+
+def test_block_empties_and_holds_the_bucket():
+    bucket = TokenBucket(rate=100, capacity=5)
+    bucket.block(3)
+    now = time.monotonic()
+    assert bucket.tokens == 0
+    assert 2.9 < bucket.delay(now) <= 3
+
+
+def test_chat_and_group_buckets():
+    limiter = TelegramRateLimiter(chat_rate=1, chat_burst=1, group_rate_per_minute=20, group_burst=1)
+    assert limiter._chat_bucket(12345).rate == 1
+    assert limiter._chat_bucket("-100123").rate == pytest.approx(20 / 60)
+    assert limiter._chat_bucket("12345") is limiter._chat_bucket(12345)
+
+
+def test_sends_wait_for_the_tightest_bucket():
+    async def send(limiter, chat_id, count):
+        for _ in range(count):
+            await limiter.acquire(chat_id)
+
+    async def run():
+        # Created inside the loop: on Python 3.9 asyncio.Lock binds to the loop current at creation
+        limiter = TelegramRateLimiter(global_rate=100, global_burst=100, chat_rate=10, chat_burst=1)
+        started = time.monotonic()
+        await send(limiter, 1, 4)  # 1 burst token, then 10 per second
+        private = time.monotonic() - started
+        started = time.monotonic()
+        await asyncio.gather(send(limiter, 2, 1), send(limiter, 3, 1), send(limiter, 4, 1))  # Separate chats do not wait on each other
+        return private, time.monotonic() - started
+
+    private, parallel = asyncio.run(run())
+    assert 0.25 < private < 0.6
+    assert parallel < 0.05
+
+
+def test_global_bucket_limits_all_chats():
+    async def run():
+        limiter = TelegramRateLimiter(global_rate=20, global_burst=2, chat_rate=100, chat_burst=100)
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.acquire(chat_id) for chat_id in range(6)))
+        return time.monotonic() - started
+
+    assert 0.15 < asyncio.run(run()) < 0.5
+
+
+def test_retry_after_holds_only_that_chat():
+    async def timed(limiter, chat_id):
+        started = time.monotonic()
+        await limiter.acquire(chat_id)
+        return time.monotonic() - started
+
+    async def run():
+        limiter = TelegramRateLimiter(global_rate=100, global_burst=100, chat_rate=100, chat_burst=100)
+        limiter.retry_after(1, 0.3)
+        return await asyncio.gather(timed(limiter, 1), timed(limiter, 2))
+
+    held, free = asyncio.run(run())
+    assert held > 0.25 and free < 0.05
+
+
+@pytest.mark.parametrize("value", [5, timedelta(seconds=5)])
+def test_retry_after_seconds_accepts_int_and_timedelta(value):
+    assert retry_after_seconds(SimpleNamespace(retry_after=value)) == 5.0
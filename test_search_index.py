@@ -0,0 +1,106 @@
+import json
+import os
+
+from config import SEARCH_DIR
+from headline_index import tokenize
+from search_index import SearchIndexWriter, shard_key, update_search_index
+
+
+def _item(n, chinese, english, pending=False):
+    item = {"chinese_title": chinese, "english_title": english, "source": "SC",
+            "url": f"https://www.gov.cn/content_{n}.htm"}
+    if pending:
+        item["pending_translation"] = True
+    return item
+
+
+def _read(docs_dir, name):
+    with open(os.path.join(docs_dir, SEARCH_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def search(docs_dir, query):
+    """What search.html does: intersect the postings of the query's shards, then fetch the documents."""
+    meta = _read(docs_dir, "meta.json")
+    matches = None
+    for token in tokenize(query):
+        key = shard_key(token)
+        postings = set(_read(docs_dir, f"shards/{key}.json").get(token, [])) if key in meta["shards"] else set()
+        matches = postings if matches is None else matches & postings
+    return [_read(docs_dir, f"docs/{doc_id // meta['doc_chunk']}.json")[doc_id % meta["doc_chunk"]][4]
+            for doc_id in sorted(matches or ())]
+
+
+def test_shard_keys():
+    assert shard_key("economy") == "e"
+    assert shard_key("国务") == f"u{ord('国') >> 8:x}"
+    assert shard_key("国务") == shard_key("图片")  # Neighbouring code points share a shard
+
+
+def test_index_and_search(tmp_path):
+    docs = str(tmp_path)
+    headlines = {"2024-05-20": [_item(1, "国务院召开常务会议", "State Council holds executive meeting"),
+                                _item(2, "外交部答记者问", "Foreign Ministry answers questions")]}
+    assert update_search_index(docs, headlines) == 2
+    assert search(docs, "国务院") == ["https://www.gov.cn/content_1.htm"]
+    assert search(docs, "council meeting") == ["https://www.gov.cn/content_1.htm"]
+    assert search(docs, "外交 council") == []
+
+
+def test_only_new_items_are_indexed(tmp_path):
+    docs = str(tmp_path)
+    headlines = {"2024-05-20": [_item(1, "国务院召开常务会议", "State Council holds executive meeting")]}
+    update_search_index(docs, headlines)
+    assert update_search_index(docs, headlines) == 0
+
+    headlines["2024-05-20"].append(_item(2, "外交部答记者问", "Foreign Ministry answers questions"))
+    writer = SearchIndexWriter(docs)
+    assert writer.update(headlines) == 1
+    assert writer.dirty_shards == {shard_key(token) for token in tokenize("外交部答记者问 Foreign Ministry answers questions", True)}
+    assert _read(docs, "meta.json")["docs"] == 2
+    assert search(docs, "国务院") == ["https://www.gov.cn/content_1.htm"]
+
+
+def test_filled_translation_updates_document_and_tokens(tmp_path):
+    docs = str(tmp_path)
+    headlines = {"2024-05-20": [_item(1, "商务部召开新闻发布会", "商务部召开新闻发布会", pending=True)]}
+    update_search_index(docs, headlines)
+    assert search(docs, "commerce") == []
+    assert _read(docs, "state.json")["pending"] == {"2024-05-20": {"0": 0}}
+
+    headlines["2024-05-20"][0] = _item(1, "商务部召开新闻发布会", "Ministry of Commerce holds press conference")
+    assert update_search_index(docs, headlines) == 0
+    assert search(docs, "commerce") == ["https://www.gov.cn/content_1.htm"]
+    assert _read(docs, "docs/0.json")[0][3] == "Ministry of Commerce holds press conference"
+    assert _read(docs, "state.json")["pending"] == {}
+
+
+def test_rebuilds_when_a_date_lost_items(tmp_path):
+    docs = str(tmp_path)
+    update_search_index(docs, {"2024-05-20": [_item(1, "国务院召开常务会议", "State Council meets"),
+                                              _item(2, "外交部答记者问", "Foreign Ministry answers")]})
+    assert update_search_index(docs, {"2024-05-20": [_item(2, "外交部答记者问", "Foreign Ministry answers")]}) == 1
+    assert search(docs, "国务院") == []
+    assert search(docs, "外交") == ["https://www.gov.cn/content_2.htm"]
+
+
+def test_one_character_query_matches_either_bigram_position(tmp_path):
+    docs = str(tmp_path)
+    update_search_index(docs, {"2024-05-20": [_item(1, "国务院召开常务会议", "State Council holds executive meeting"),
+                                              _item(2, "外交部答记者问", "Foreign Ministry answers questions")]})
+    assert search(docs, "院") == ["https://www.gov.cn/content_1.htm"]  # Only ever the second character of a bigram
+    assert search(docs, "部") == ["https://www.gov.cn/content_2.htm"]
+    assert search(docs, "议") == ["https://www.gov.cn/content_1.htm"]  # Last character of the title
+
+
+def test_older_format_is_rebuilt(tmp_path):
+    docs = str(tmp_path)
+    headlines = {"2024-05-20": [_item(1, "国务院召开常务会议", "State Council holds executive meeting")]}
+    update_search_index(docs, headlines)
+    state = _read(docs, "state.json")
+    state["format"] = 1
+    with open(os.path.join(docs, SEARCH_DIR, "state.json"), "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    assert update_search_index(docs, headlines) == 1
+    assert _read(docs, "meta.json")["docs"] == 1
+    assert search(docs, "院") == ["https://www.gov.cn/content_1.htm"]
@@ -0,0 +1,67 @@
+import json
+
+from subscriptions import Subscription, SubscriptionRegistry, load_subscriptions
+
+
+def _item(n, source, chinese="国务院召开常务会议", english="State Council holds executive meeting"):
+    return {"chinese_title": chinese, "english_title": english, "source": source,
+            "url": f"https://www.gov.cn/content_{n}.htm"}
+
+
+ITEMS = {
+    "TAO": [_item(1, "TAO", "国台办：反对台独", "TAO opposes independence")],
+    "SC": [_item(2, "SC"), _item(3, "SC", "国务院任免国家工作人员", "State Council appoints officials")],
+    "MFA": [_item(4, "MFA", "外交部谈台湾问题", "MFA on the Taiwan &amp; question")],
+}
+
+
+def _urls(routed, chat_id):
+    return [item["url"][-6:] for items in routed.get(chat_id, {}).values() for item in items]
+
+
+def test_source_filter():
+    registry = SubscriptionRegistry([Subscription("1", sources=["TAO", "MFA"])])
+    assert _urls(registry.route(ITEMS), "1") == ["_1.htm", "_4.htm"]
+
+
+def test_keyword_filter_checks_both_titles_case_insensitively():
+    registry = SubscriptionRegistry([Subscription("1", keywords=["任免"]), Subscription("2", keywords=["TAIWAN &"])])
+    routed = registry.route(ITEMS)
+    assert _urls(routed, "1") == ["_3.htm"]
+    assert _urls(routed, "2") == ["_4.htm"]  # Matched against the unescaped title
+
+
+def test_source_and_keyword_filters_must_both_match():
+    registry = SubscriptionRegistry([Subscription("1", sources=["SC", "MFA"], keywords=["appoint", "台湾"])])
+    assert _urls(registry.route(ITEMS), "1") == ["_3.htm", "_4.htm"]
+    assert registry.match(_item(5, "TAO", "台湾", "Taiwan")) == set()
+
+
+def test_chat_matching_several_subscriptions_gets_each_item_once():
+    registry = SubscriptionRegistry([
+        Subscription("1", name="taiwan", sources=["TAO"]),
+        Subscription("1", name="taiwan-mentions", keywords=["台", "taiwan"]),
+        Subscription("2"),
+    ])
+    routed = registry.route(ITEMS)
+    assert routed["1"] == {"TAO": ITEMS["TAO"], "MFA": ITEMS["MFA"]}
+    assert _urls(routed, "2") == ["_1.htm", "_2.htm", "_3.htm", "_4.htm"]
+
+
+def test_unsubscribe_drops_every_subscription_of_the_chat(tmp_path):
+    registry = SubscriptionRegistry([
+        Subscription("1", sources=["TAO"]),
+        Subscription("2", keywords=["任免"]),
+        Subscription("1", keywords=["appoint"]),
+    ])
+    assert registry.unsubscribe(1) == 2
+    assert registry.unsubscribe("1") == 0
+    routed = registry.route(ITEMS)
+    assert set(routed) == {"2"}
+    assert _urls(routed, "2") == ["_3.htm"]
+
+    path = str(tmp_path / "subscriptions.json")
+    registry.save(path)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"subscriptions": [{"chat_id": "2", "name": "2", "sources": [], "keywords": ["任免"]}]}
+    assert _urls(load_subscriptions(path).route(ITEMS), "2") == ["_3.htm"]
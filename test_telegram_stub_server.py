@@ -0,0 +1,39 @@
+import pytest
+import requests
+
+from telegram_stub_server import TELEGRAM_MAX_MESSAGE_LENGTH, StubTelegramServer
+
+
+@pytest.fixture
+def stub():
+    with StubTelegramServer() as server:
+        yield server
+
+
+def _send(server, text, **params):
+    response = requests.post(f"{server.base_url}123:stub/sendMessage", json=dict(chat_id="-100", text=text, **params),
+                             timeout=5)
+    return response.status_code, response.json()
+
+
+def test_message_length_limit_is_telegrams(stub):
+    assert _send(stub, "a" * TELEGRAM_MAX_MESSAGE_LENGTH)[0] == 200
+    status, payload = _send(stub, "a" * (TELEGRAM_MAX_MESSAGE_LENGTH + 1))
+    assert status == 400 and payload["description"] == "Bad Request: message is too long"
+    assert _send(stub, "🗞" * (TELEGRAM_MAX_MESSAGE_LENGTH // 2 + 1))[0] == 400  # Two UTF-16 units each
+
+
+def test_html_markup_does_not_count_towards_the_limit(stub):
+    text = "<b>" + "&amp;" * TELEGRAM_MAX_MESSAGE_LENGTH + "</b>"
+    assert _send(stub, text, parse_mode="HTML")[0] == 200
+    assert _send(stub, text)[0] == 400  # Without parse_mode every character counts
+    assert stub.messages == [("-100", text)]
+    assert stub.calls["sendMessage:200"] == 1 and stub.calls["sendMessage:400"] == 1
+
+
+def test_injected_retry_after(stub):
+    stub.retry_after_rate = 1.0
+    stub.retry_after = 3
+    status, payload = _send(stub, "hello")
+    assert status == 429 and payload["parameters"] == {"retry_after": 3}
+    assert stub.messages == []
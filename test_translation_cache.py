@@ -0,0 +1,71 @@
+import itertools
+
+import pytest
+
+import translation_cache
+from translation_cache import TranslationCache, normalize_text
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(translation_cache.time, 'time', lambda: float(next(ticks)))
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = TranslationCache(str(tmp_path / 'cache.sqlite3'), max_entries=2)
+    yield cache
+    cache.close()
+
+
+def _last_used(cache, text):
+    return cache.conn.execute("SELECT last_used FROM translations WHERE source_text = ?", (text,)).fetchone()[0]
+
+
+def test_normalized_lookup(cache):
+    cache.put("国务院　召开 会议", "State Council holds meeting")
+    assert normalize_text("国务院　召开 会议") == "国务院 召开 会议"
+    assert cache.get(" 国务院 召开\n会议 ") == "State Council holds meeting"
+    assert cache.get("外交部答记者问") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_hits_are_buffered_until_flush(cache):
+    cache.put("北京", "Beijing")
+    stored = _last_used(cache, "北京")
+    cache.get("北京")
+    assert _last_used(cache, "北京") == stored
+    cache.flush()
+    assert _last_used(cache, "北京") > stored
+    assert cache.touched == {}
+
+
+def test_eviction_sees_buffered_hits(cache):
+    cache.put("北京", "Beijing")
+    cache.put("上海", "Shanghai")
+    cache.get("北京")  # Only in the buffer when the next put evicts
+    cache.put("天津", "Tianjin")
+    assert cache.size == 2
+    assert cache.get("上海") is None
+    assert cache.get("北京") == "Beijing"
+
+
+def test_put_many_without_overwrite_keeps_existing(cache):
+    cache.put("北京", "Beijing")
+    assert cache.put_many([("北京", "Peking"), ("", "empty"), ("上海", "")], overwrite=False) == 0
+    assert cache.get("北京") == "Beijing"
+
+
+def test_entries_survive_reopening(tmp_path, clock):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = TranslationCache(path)
+    cache.put("福建", "Fujian")
+    cache.get("福建")
+    cache.close()
+    reopened = TranslationCache(path)
+    try:
+        assert reopened.size == 1
+        assert reopened.get("福建") == "Fujian"
+    finally:
+        reopened.close()
@@ -0,0 +1,88 @@
+from translation_memory import TranslationMemory, TranslationMemoryStore, build_translation_memory
+
+PAIRS = [
+    ("北京发布一批干部任前公示通告", "Beijing issues a batch of pre-appointment announcements for cadres"),
+    ("上海发布一批干部任前公示通告", "Shanghai issues a batch of pre-appointment announcements for cadres"),
+    ("内蒙古发布一批干部任前公示通告", "Inner Mongolia issues a batch of pre-appointment announcements for cadres"),
+    ("天津市委常委会召开会议", "Tianjin Municipal Standing Committee holds a meeting"),
+    ("天津调研经济运行情况", "Tianjin inspects the economy"),
+]
+
+
+def test_slot_filled_from_another_template():
+    memory = TranslationMemory().learn(PAIRS)
+    assert memory.match("天津发布一批干部任前公示通告") is None  # 天津 has no agreeing translation yet
+    memory = TranslationMemory().learn(PAIRS + [
+        ("天津召开全体会议研究部署下一阶段重点工作", "Tianjin holds a plenary meeting on the next stage of work"),
+        ("重庆召开全体会议研究部署下一阶段重点工作", "Chongqing holds a plenary meeting on the next stage of work"),
+    ])
+    assert memory.match("天津发布一批干部任前公示通告") == \
+        "Tianjin issues a batch of pre-appointment announcements for cadres"
+
+
+def test_known_slot_value_matches_its_own_template():
+    memory = TranslationMemory().learn(PAIRS)
+    assert memory.match("内蒙古发布一批干部任前公示通告") == \
+        "Inner Mongolia issues a batch of pre-appointment announcements for cadres"
+    assert memory.hits == 1
+    assert memory.chars_saved == len("内蒙古发布一批干部任前公示通告")
+
+
+def test_unknown_slot_or_frame_is_not_guessed():
+    memory = TranslationMemory().learn(PAIRS)
+    assert memory.match("新疆发布一批干部任前公示通告") is None
+    assert memory.match("外交部发言人答记者问") is None
+    assert memory.hits == 0
+
+
+def test_single_pair_is_not_a_template():
+    memory = TranslationMemory().learn(PAIRS[:1])
+    assert memory.templates == {}
+    assert memory.match("上海发布一批干部任前公示通告") is None
+
+
+def test_build_skips_untranslated_and_pending_items(monkeypatch, tmp_path):
+    monkeypatch.setattr('translation_memory._memory', None)  # Restored after the test
+    items = [{"chinese_title": chinese, "english_title": english} for chinese, english in PAIRS[:3]]
+    items += [
+        {"chinese_title": "福建发布一批干部任前公示通告", "english_title": "福建发布一批干部任前公示通告"},
+        {"chinese_title": "海南发布一批干部任前公示通告", "english_title": "[Translation Error]"},
+        {"chinese_title": "云南发布一批干部任前公示通告", "english_title": "Yunnan", "pending_translation": True},
+    ]
+    memory = build_translation_memory({"headlines": {"2024-05-20": items}}, str(tmp_path / "cache.sqlite3"))
+    assert memory.match("福建发布一批干部任前公示通告") is None
+    template = next(iter(memory.templates.values()))
+    assert sorted(template.slots) == ["上海", "内蒙古", "北京"]
+
+
+MORE = [
+    ("天津召开全体会议研究部署下一阶段重点工作", "Tianjin holds a plenary meeting on the next stage of work"),
+    ("重庆召开全体会议研究部署下一阶段重点工作", "Chongqing holds a plenary meeting on the next stage of work"),
+]
+
+
+FILLER = [(f"会议纪要第{n}号文件", f"Meeting minutes no. {n}") for n in range(30)]
+
+
+def _templates(memory):
+    return {frame: (t.prefix, t.suffix, t.slots) for frame, t in memory.templates.items()}
+
+
+def test_stored_templates_are_updated_incrementally(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    store = TranslationMemoryStore(path)
+    assert _templates(TranslationMemory().load(store, FILLER + PAIRS)) == _templates(TranslationMemory().learn(PAIRS))
+    store.close()
+
+    store = TranslationMemoryStore(path)  # Templates survive between runs
+    assert store.update(dict(FILLER + PAIRS)) == 0
+
+    memory = TranslationMemory().load(store, FILLER + PAIRS + MORE)  # Few enough to relearn frame by frame
+    assert _templates(memory) == _templates(TranslationMemory().learn(FILLER + PAIRS + MORE))
+    assert memory.match("天津发布一批干部任前公示通告") == \
+        "Tianjin issues a batch of pre-appointment announcements for cadres"
+
+    memory = TranslationMemory().load(store, FILLER + PAIRS[1:] + MORE)  # 北京 dropped out of the exemplars
+    assert _templates(memory) == _templates(TranslationMemory().learn(FILLER + PAIRS[1:] + MORE))
+    assert memory.match("北京发布一批干部任前公示通告") is None
+    store.close()
@@ -0,0 +1,140 @@
+import threading
+import time
+
+import pytest
+import requests
+
+import translator
+from metrics import Metrics
+from translation_cache import TranslationCache
+from translator import CharacterThrottle, TranslationThrottled
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code}")
+
+    def json(self):
+        return self.payload
+
+
+class RecordingThrottle:
+    def __init__(self):
+        self.acquired = []
+        self.pauses = []
+
+    def acquire(self, chars):
+        self.acquired.append(chars)
+        return 0.0
+
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """Route translator requests to a scripted list of responses; returns the list of posted bodies."""
+    posted = []
+    responses = []
+
+    def post(url, params=None, headers=None, json=None, timeout=None):
+        posted.append(json)
+        return responses.pop(0)
+
+    cache = TranslationCache(str(tmp_path / 'cache.sqlite3'))
+    monkeypatch.setattr(translator.requests, 'post', post)
+    monkeypatch.setattr(translator, '_throttle', RecordingThrottle())
+    monkeypatch.setattr(translator, '_request_limiter', translator.IntervalLimiter(0))
+    monkeypatch.setattr(translator, 'MS_TRANSLATOR_KEY', 'key')
+    monkeypatch.setattr(translator, 'TRANSLATOR_MAX_RETRIES', 2)
+    monkeypatch.setattr(translator, 'get_translation_cache', lambda: cache)
+    monkeypatch.setattr(translator, 'get_translation_memory', lambda: None)
+    yield posted, responses
+    cache.close()
+
+
+def test_throttle_admits_requests_within_the_window():
+    throttle = CharacterThrottle(100, window_seconds=0.3)
+    assert throttle.acquire(60) < 0.05
+    assert throttle.acquire(40) < 0.05
+    assert throttle.total == 100
+
+
+def test_throttle_waits_for_the_window_to_slide():
+    throttle = CharacterThrottle(100, window_seconds=0.3)
+    throttle.acquire(80)
+    waited = throttle.acquire(30)
+    assert 0.2 < waited < 0.6
+    assert throttle.total == 30
+
+
+def test_oversized_request_goes_out_alone():
+    throttle = CharacterThrottle(100, window_seconds=0.3)
+    assert throttle.acquire(250) < 0.05
+    assert throttle.acquire(1) > 0.2
+
+
+def test_pause_holds_every_caller():
+    throttle = CharacterThrottle(1000, window_seconds=60)
+    throttle.pause(0.3)
+    waits = []
+    threads = [threading.Thread(target=lambda: waits.append(throttle.acquire(10))) for _ in range(3)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - started >= 0.25
+    assert len(waits) == 3 and min(waits) >= 0.2
+
+
+def test_post_retries_429_as_retry_after_asks(api):
+    posted, responses = api
+    responses += [FakeResponse(429, headers={'Retry-After': '7'}),
+                  FakeResponse(200, [{'translations': [{'text': 'Beijing'}]}])]
+    assert translator._post([{'text': '北京'}]) == [{'translations': [{'text': 'Beijing'}]}]
+    assert len(posted) == 2
+    assert translator._throttle.pauses == [7.0]
+    assert translator._throttle.acquired == [2, 2]  # Every attempt counts against the window
+
+
+def test_post_gives_up_after_the_retries(api):
+    _, responses = api
+    responses += [FakeResponse(429) for _ in range(3)]
+    with pytest.raises(TranslationThrottled):
+        translator._post([{'text': '北京'}])
+    assert translator._throttle.pauses == [2.0, 4.0, 8.0]
+
+
+def test_throttled_batch_is_left_pending(api):
+    posted, responses = api
+    responses += [FakeResponse(429) for _ in range(3)]
+    assert translator._translate_texts(['北京', '上海']) == [None, None]
+    assert len(posted) == 3  # The batch's retries only; no per-title requests
+
+
+def test_missing_batch_elements_are_retried_singly(api):
+    posted, responses = api
+    responses += [FakeResponse(200, [{'translations': [{'text': 'Beijing'}]}, {}]),
+                  FakeResponse(200, [{'translations': [{'text': 'Shanghai'}]}])]
+    assert translator._translate_texts(['北京', '上海']) == ['Beijing', 'Shanghai']
+    assert posted[1] == [{'text': '上海'}]
+    assert translator._translate_texts(['上海']) == ['Shanghai']  # From the cache
+    assert len(posted) == 2
+
+
+def test_translation_calls_and_requests_are_timed(api, monkeypatch):
+    _, responses = api
+    metrics = Metrics()
+    monkeypatch.setattr('metrics._metrics', metrics)
+    responses += [FakeResponse(429, headers={'Retry-After': '1'}),
+                  FakeResponse(200, [{'translations': [{'text': 'Beijing'}]}])]
+    translator._translate_texts(['北京'])
+    timers = {name: count for (name, _), (count, _, _) in metrics.timers.items()}
+    assert timers == {'translate_texts': 1, 'translator_post': 1, 'translator_request': 2}
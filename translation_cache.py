@@ -0,0 +1,165 @@
+# translation_cache.py
+import sqlite3
+import logging
+import threading
+import time
+import html
+import re
+import unicodedata
+
+from config import TRANSLATION_CACHE_FILE, TRANSLATION_CACHE_MAX_ENTRIES
+
+DEFAULT_LANG_PAIR = "zh-Hans:en"
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """Normalize source text so trivially different spellings share one cache entry."""
+    text = unicodedata.normalize('NFKC', text)
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+class TranslationCache:
+    """Size-bounded LRU cache of translations, persisted in SQLite."""
+
+    def __init__(self, path=TRANSLATION_CACHE_FILE, max_entries=TRANSLATION_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                source_text TEXT NOT NULL,
+                lang_pair TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (source_text, lang_pair)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)")
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+        # Hits not yet written back: (source_text, lang_pair) -> last_used. Written in one
+        # transaction by flush() (called per translation batch, before eviction and at close)
+        # so lookups on the hot path do not each cost a write and a commit.
+        self.touched = {}
+
+        # Per-run statistics
+        self.hits = 0
+        self.misses = 0
+        self.chars_saved = 0
+
+    def get(self, text, lang_pair=DEFAULT_LANG_PAIR):
+        """Return the cached translation for text, or None. A hit refreshes the entry's LRU position on the next flush()."""
+        key = normalize_text(text)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT translation FROM translations WHERE source_text = ? AND lang_pair = ?",
+                (key, lang_pair)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.touched[(key, lang_pair)] = time.time()
+            self.hits += 1
+            self.chars_saved += len(text)
+            return row[0]
+
+    def put(self, text, translation, lang_pair=DEFAULT_LANG_PAIR):
+        self.put_many([(text, translation)], lang_pair)
+
+    def put_many(self, pairs, lang_pair=DEFAULT_LANG_PAIR, overwrite=True):
+        """Store (source_text, translation) pairs, then evict least recently used entries over the limit."""
+        verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+        now = time.time()
+        rows = [(normalize_text(text), lang_pair, translation, now)
+                for text, translation in pairs if text and translation]
+        if not rows:
+            return 0
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                f"{verb} INTO translations (source_text, lang_pair, translation, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            written = self.conn.total_changes - before
+            self._write_touches()
+            self.size = self.conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            self._evict()
+            self.conn.commit()
+        return written
+
+    def flush(self):
+        """Write the LRU positions of buffered hits."""
+        with self.lock:
+            if self.touched:
+                self._write_touches()
+                self.conn.commit()
+
+    def _write_touches(self):
+        self.conn.executemany(
+            "UPDATE translations SET last_used = ? WHERE source_text = ? AND lang_pair = ?",
+            [(last_used, key, lang_pair) for (key, lang_pair), last_used in self.touched.items()]
+        )
+        self.touched.clear()
+
+    def _evict(self):
+        excess = self.size - self.max_entries
+        if excess <= 0:
+            return
+        self.conn.execute(
+            "DELETE FROM translations WHERE rowid IN "
+            "(SELECT rowid FROM translations ORDER BY last_used ASC LIMIT ?)",
+            (excess,)
+        )
+        self.size -= excess
+        logging.info(f"Evicted {excess} least recently used translations from cache")
+
+    def warm_from_headlines(self, data):
+        """Import the english_title values already stored in headlines.json."""
+        pairs = []
+        for items in data.get("headlines", {}).values():
+            for item in items:
+                chinese_title = item.get('chinese_title')
+                english_title = item.get('english_title')
+                if (not chinese_title or not english_title or english_title == chinese_title
+                        or english_title == "[Translation Error]" or item.get('pending_translation')):
+                    continue
+                pairs.append((html.unescape(chinese_title), html.unescape(english_title)))
+        imported = self.put_many(pairs, overwrite=False)
+        logging.info(f"Warmed translation cache with {imported} entries from headlines data ({len(pairs)} candidates)")
+        return imported
+
+    def report(self):
+        """Log and return this run's hit rate and characters saved."""
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        logging.info(f"Translation cache: {self.hits}/{lookups} hits ({hit_rate:.1%}), "
+                     f"{self.chars_saved} characters saved, {self.size} entries stored")
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": hit_rate,
+            "chars_saved": self.chars_saved,
+            "entries": self.size,
+        }
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_translation_cache():
+    """Return the process-wide cache, opening it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranslationCache()
+        return _cache
@@ -0,0 +1,347 @@
+# translation_memory.py
+import hashlib
+import html
+import json
+import logging
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+
+from config import (TM_MIN_SUPPORT, TM_MIN_FIXED_CHARS, TM_MAX_SLOT_CHARS,
+                    TM_MAX_SLOT_WORDS, TM_MAX_EXEMPLARS, TRANSLATION_CACHE_FILE)
+
+_SLOT = "\0"  # Marks the variable part of a Chinese frame
+_CJK_RE = re.compile(r'^[一-鿿]+$')
+_MAX_PAIRS_PER_FRAME = 20  # Exemplars compared when voting on a frame's English pattern
+
+
+def _frames(title):
+    """Yield (frame, slot) for every way of cutting a short CJK run out of title."""
+    for length in range(1, TM_MAX_SLOT_CHARS + 1):
+        if len(title) - length < TM_MIN_FIXED_CHARS:
+            break
+        for start in range(len(title) - length + 1):
+            slot = title[start:start + length]
+            if _CJK_RE.match(slot):
+                yield title[:start] + _SLOT + title[start + length:], slot
+
+
+def _slot(frame, title):
+    """The slot value title has in frame, or None if title is not a cut of frame."""
+    before, after = frame.split(_SLOT)
+    if not (title.startswith(before) and title.endswith(after)):
+        return None
+    slot = title[len(before):len(title) - len(after)]
+    if not 0 < len(slot) <= TM_MAX_SLOT_CHARS or not _CJK_RE.match(slot):
+        return None
+    return slot
+
+
+def _frame_key(frame):
+    """Stable 64-bit key for a frame; stored instead of the frame text to keep the index small."""
+    return int.from_bytes(hashlib.blake2b(frame.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+def _recent(pairs):
+    """The most recent TM_MAX_EXEMPLARS distinct pairs as a dict. Later pairs win on duplicates."""
+    exemplars = dict(pairs)
+    if len(exemplars) > TM_MAX_EXEMPLARS:
+        exemplars = dict(list(exemplars.items())[-TM_MAX_EXEMPLARS:])
+    return exemplars
+
+
+def _learn_all(exemplars):
+    """{frame: Template} for every frame of exemplars that makes a template."""
+    by_frame = defaultdict(dict)
+    for chinese, english in exemplars.items():
+        for frame, slot in _frames(chinese):
+            by_frame[frame][slot] = english
+    templates = {}
+    for frame, slots in by_frame.items():
+        template = _template(frame, slots)
+        if template is not None:
+            templates[frame] = template
+    return templates
+
+
+def _common_prefix_len(a, b):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def _english_pattern(english_a, english_b):
+    """Words shared at the start and end of two translations, or None if nothing varies or nothing is shared."""
+    a, b = english_a.split(), english_b.split()
+    p = _common_prefix_len(a, b)
+    q = _common_prefix_len(a[p:][::-1], b[p:][::-1])
+    if p + q == 0 or len(a) - p - q < 1 or len(b) - p - q < 1:
+        return None
+    return tuple(a[:p]), tuple(a[len(a) - q:])
+
+
+def _english_slot(english, prefix, suffix):
+    words = english.split()
+    if len(words) <= len(prefix) + len(suffix):
+        return None
+    if tuple(words[:len(prefix)]) != prefix or tuple(words[len(words) - len(suffix):]) != suffix:
+        return None
+    middle = words[len(prefix):len(words) - len(suffix)]
+    return " ".join(middle) if len(middle) <= TM_MAX_SLOT_WORDS else None
+
+
+class Template:
+    """One learned frame, e.g. "{X}发布一批干部任前公示" -> "{X} issued a number of ..."."""
+
+    def __init__(self, frame, prefix, suffix, slots):
+        self.frame = frame
+        self.prefix = prefix
+        self.suffix = suffix
+        self.slots = slots  # {chinese slot value: english slot value}
+
+    @property
+    def support(self):
+        return len(self.slots)
+
+    def fill(self, english_slot):
+        return " ".join(list(self.prefix) + [english_slot] + list(self.suffix))
+
+
+def _template(frame, slots):
+    """The Template for frame given its {chinese slot: english title} exemplars, or None."""
+    if len(slots) < TM_MIN_SUPPORT:
+        return None
+    values = list(slots)
+    # A frame whose slot values all share an edge character is a wider cut of a tighter frame
+    if len({v[0] for v in values}) == 1 or len({v[-1] for v in values}) == 1:
+        return None
+
+    sample = list(slots.items())[:_MAX_PAIRS_PER_FRAME]
+    votes = Counter()
+    for i in range(len(sample)):
+        for j in range(i + 1, len(sample)):
+            pattern = _english_pattern(sample[i][1], sample[j][1])
+            if pattern:
+                votes[pattern] += 1
+    if not votes:
+        return None
+    prefix, suffix = votes.most_common(1)[0][0]
+
+    agreeing = {}
+    for slot, english in slots.items():
+        english_slot = _english_slot(english, prefix, suffix)
+        if english_slot:
+            agreeing[slot] = english_slot
+    if len(agreeing) < TM_MIN_SUPPORT:
+        return None
+
+    return Template(frame, prefix, suffix, agreeing)
+
+
+class TranslationMemory:
+    """Slot templates learned from past (chinese_title, english_title) pairs.
+
+    Templates are indexed by their Chinese frame, so matching a new title is one dict
+    lookup per candidate cut. A match is only used when the template has enough
+    agreeing exemplars and the slot value's English is already known.
+    """
+
+    def __init__(self):
+        self.templates = {}
+        self.slot_translations = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.chars_saved = 0
+
+    def learn(self, pairs):
+        """Build templates from (chinese, english) pairs. Later pairs win on duplicates."""
+        exemplars = _recent(pairs)
+        self.templates = _learn_all(exemplars)
+        self._index_slots()
+        logging.info(f"Translation memory learned {len(self.templates)} templates and "
+                     f"{len(self.slot_translations)} slot values from {len(exemplars)} pairs")
+        return self
+
+    def load(self, store, pairs):
+        """Bring store's frames up to date with pairs (as learn() would see them) and use its templates."""
+        exemplars = _recent(pairs)
+        store.update(exemplars)
+        self.templates = store.templates()
+        self._index_slots()
+        logging.info(f"Translation memory loaded {len(self.templates)} templates and "
+                     f"{len(self.slot_translations)} slot values for {len(exemplars)} pairs")
+        return self
+
+    def _index_slots(self):
+        # Slot values shared across templates; single characters are too ambiguous to reuse
+        slot_votes = defaultdict(Counter)
+        for template in self.templates.values():
+            for slot, english_slot in template.slots.items():
+                slot_votes[slot][english_slot] += 1
+        self.slot_translations = {slot: votes.most_common(1)[0][0]
+                                  for slot, votes in slot_votes.items() if len(slot) > 1}
+
+    def match(self, title):
+        """Return a confident translation for title, or None."""
+        best = None
+        for frame, slot in _frames(title):
+            template = self.templates.get(frame)
+            if template is None:
+                continue
+            english_slot = template.slots.get(slot) or self.slot_translations.get(slot)
+            if english_slot is None:
+                continue
+            # Prefer the most widely attested template, then the tightest cut
+            rank = (template.support, -len(slot))
+            if best is None or rank > best[0]:
+                best = (rank, template.fill(english_slot))
+        if best is None:
+            return None
+        with self.lock:
+            self.hits += 1
+            self.chars_saved += len(title)
+        return best[1]
+
+    def report(self):
+        logging.info(f"Translation memory: {self.hits} titles filled from templates "
+                     f"(API calls avoided), {self.chars_saved} characters saved")
+        return {"hits": self.hits, "chars_saved": self.chars_saved, "templates": len(self.templates)}
+
+
+class TranslationMemoryStore:
+    """Exemplar pairs, a frame -> pair index and the learned templates, kept in SQLite.
+
+    Frames are indexed by a 64-bit key of their text; the pairs behind a key are checked
+    against the frame itself when it is relearned. update() relearns only the frames of
+    pairs that were added, retranslated or dropped out of the exemplar window.
+    """
+
+    def __init__(self, path=TRANSLATION_CACHE_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tm_pairs (
+                id INTEGER PRIMARY KEY,
+                chinese TEXT NOT NULL UNIQUE,
+                english TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tm_frames (
+                frame_key INTEGER NOT NULL,
+                pair_id INTEGER NOT NULL,
+                PRIMARY KEY (frame_key, pair_id)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS tm_templates (frame TEXT PRIMARY KEY, template TEXT NOT NULL)")
+        self.conn.commit()
+
+    def update(self, exemplars):
+        """Make the stored pairs equal exemplars ({chinese: english}) and relearn the frames that changed.
+
+        Returns the number of pairs added, changed or removed.
+        """
+        stored = {chinese: (pair_id, english)
+                  for pair_id, chinese, english in self.conn.execute("SELECT id, chinese, english FROM tm_pairs")}
+        removed = [(pair_id, chinese) for chinese, (pair_id, _) in stored.items() if chinese not in exemplars]
+        changed = [(english, stored[chinese][0], chinese) for chinese, english in exemplars.items()
+                   if chinese in stored and stored[chinese][1] != english]
+        added = [(chinese, english) for chinese, english in exemplars.items() if chinese not in stored]
+        updates = len(removed) + len(changed) + len(added)
+        if not updates:
+            return 0
+
+        touched = set()
+        with self.conn:
+            for pair_id, chinese in removed:
+                frames = {frame for frame, _ in _frames(chinese)}
+                self.conn.executemany("DELETE FROM tm_frames WHERE frame_key = ? AND pair_id = ?",
+                                      [(_frame_key(frame), pair_id) for frame in frames])
+                self.conn.execute("DELETE FROM tm_pairs WHERE id = ?", (pair_id,))
+                touched |= frames
+            self.conn.executemany("UPDATE tm_pairs SET english = ? WHERE id = ?",
+                                  [(english, pair_id) for english, pair_id, _ in changed])
+            for _, _, chinese in changed:
+                touched.update(frame for frame, _ in _frames(chinese))
+            first_id = max((pair_id for pair_id, _ in stored.values()), default=0) + 1
+            self.conn.executemany("INSERT INTO tm_pairs (id, chinese, english) VALUES (?, ?, ?)",
+                                  [(pair_id, chinese, english) for pair_id, (chinese, english) in enumerate(added, first_id)])
+            rows = []
+            for pair_id, (chinese, _) in enumerate(added, first_id):
+                frames = {frame for frame, _ in _frames(chinese)}
+                rows.extend((_frame_key(frame), pair_id) for frame in frames)
+                touched |= frames
+            self.conn.executemany("INSERT OR IGNORE INTO tm_frames (frame_key, pair_id) VALUES (?, ?)", rows)
+
+            if updates * 10 > len(exemplars):
+                # First run or a large change: learning everything in memory is cheaper than frame by frame
+                self.conn.execute("DELETE FROM tm_templates")
+                self._save_templates(_learn_all(exemplars).values())
+            else:
+                for frame in touched:
+                    self._relearn(frame)
+        logging.info(f"Translation memory store: {len(added)} pairs added, {len(changed)} changed, "
+                     f"{len(removed)} removed, {len(touched)} frames relearned")
+        return updates
+
+    def _relearn(self, frame):
+        slots = {}
+        for chinese, english in self.conn.execute(
+                "SELECT p.chinese, p.english FROM tm_frames f JOIN tm_pairs p ON p.id = f.pair_id "
+                "WHERE f.frame_key = ? ORDER BY p.id", (_frame_key(frame),)):
+            slot = _slot(frame, chinese)
+            if slot is not None:
+                slots[slot] = english
+        template = _template(frame, slots)
+        if template is None:
+            self.conn.execute("DELETE FROM tm_templates WHERE frame = ?", (frame,))
+        else:
+            self._save_templates([template])
+
+    def _save_templates(self, templates):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO tm_templates (frame, template) VALUES (?, ?)",
+            [(t.frame, json.dumps([t.prefix, t.suffix, t.slots], ensure_ascii=False)) for t in templates]
+        )
+
+    def templates(self):
+        templates = {}
+        for frame, stored in self.conn.execute("SELECT frame, template FROM tm_templates"):
+            prefix, suffix, slots = json.loads(stored)
+            templates[frame] = Template(frame, tuple(prefix), tuple(suffix), slots)
+        return templates
+
+    def close(self):
+        self.conn.close()
+
+
+_memory = None
+
+
+def build_translation_memory(data, path=TRANSLATION_CACHE_FILE):
+    """Update the templates stored beside the translation cache from the headlines already
+    stored, and make them available to the translator."""
+    global _memory
+    pairs = []
+    for items in data.get("headlines", {}).values():
+        for item in items:
+            chinese_title = item.get('chinese_title')
+            english_title = item.get('english_title')
+            if (not chinese_title or not english_title or english_title == chinese_title
+                    or english_title == "[Translation Error]" or item.get('pending_translation')):
+                continue
+            pairs.append((html.unescape(chinese_title), html.unescape(english_title)))
+    store = TranslationMemoryStore(path)
+    try:
+        _memory = TranslationMemory().load(store, pairs)
+    finally:
+        store.close()
+    return _memory
+
+
+def get_translation_memory():
+    """Return the memory built for this run, or None if build_translation_memory was not called."""
+    return _memory
@@ -1,35 +1,151 @@
 # translator.py
 import requests
 import logging
+import html
+import threading
+import time
+from collections import deque
 from config import (MS_TRANSLATOR_KEY, MS_TRANSLATOR_REGION,
-                    TRANSLATOR_API_VERSION, TRANSLATOR_TIMEOUT)
+                    TRANSLATOR_API_VERSION, TRANSLATOR_TIMEOUT,
+                    TRANSLATOR_MAX_BATCH_ELEMENTS, TRANSLATOR_MAX_BATCH_CHARS,
+                    TRANSLATOR_CHARS_PER_MINUTE, TRANSLATOR_MAX_RETRIES,
+                    TRANSLATION_REQUESTS_PER_SECOND)
+from translation_cache import get_translation_cache
+from translation_memory import get_translation_memory
+from language_detect import needs_translation
+from metrics import get_metrics, timed
+from data_manager import mark_dirty
 
-def translate_text(text):
-    """Translates text from Chinese (Simplified) to English using Microsoft Translator."""
-    if not MS_TRANSLATOR_KEY:
-        logging.warning("No Microsoft Translator key configured - returning original text.")
-        return text
-    if not text or text.isspace():
-        logging.debug("Skipping translation for empty text.")
-        return text
-
-    endpoint = "https://api.cognitive.microsofttranslator.com/translate"
-    params = {
+TRANSLATOR_ENDPOINT = "https://api.cognitive.microsofttranslator.com/translate"
+
+
+class TranslationThrottled(Exception):
+    """The API kept answering 429 after all retries."""
+
+
+class CharacterThrottle:
+    """Sliding-window limit on characters sent to the Translator, shared by all threads.
+
+    acquire() blocks until the request fits in the window instead of dropping it, and
+    pause() holds every caller back after a 429 until Retry-After has elapsed.
+    """
+
+    def __init__(self, chars_per_window, window_seconds=60):
+        self.limit = chars_per_window
+        self.window = window_seconds
+        self.cond = threading.Condition()
+        self.sent = deque()  # (timestamp, chars)
+        self.total = 0
+        self.paused_until = 0.0
+
+    def _prune(self, now):
+        while self.sent and self.sent[0][0] <= now - self.window:
+            self.total -= self.sent.popleft()[1]
+
+    def acquire(self, chars):
+        """Wait until chars can be sent without exceeding the window. Returns seconds waited."""
+        needed = min(chars, self.limit)  # An oversized request goes out alone in an empty window
+        started = time.monotonic()
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self._prune(now)
+                    if self.total + needed <= self.limit:
+                        self.sent.append((now, chars))
+                        self.total += chars
+                        return now - started
+                    wait = self.sent[0][0] + self.window - now
+                self.cond.wait(wait)
+
+    def pause(self, seconds):
+        with self.cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.cond.notify_all()
+
+
+class IntervalLimiter:
+    """Spaces out calls so that at most `rate` start per second across all threads (0 = unlimited)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_throttle = CharacterThrottle(TRANSLATOR_CHARS_PER_MINUTE)
+_request_limiter = IntervalLimiter(TRANSLATION_REQUESTS_PER_SECOND)
+
+
+def _request_params():
+    return {
         'api-version': TRANSLATOR_API_VERSION,
         'from': 'zh-Hans',
         'to': 'en'
     }
-    headers = {
+
+
+def _request_headers():
+    return {
         'Ocp-Apim-Subscription-Key': MS_TRANSLATOR_KEY,
         'Ocp-Apim-Subscription-Region': MS_TRANSLATOR_REGION,
         'Content-Type': 'application/json'
     }
-    body = [{'text': text}]
 
+
+def _retry_after_seconds(response, attempt):
     try:
-        response = requests.post(endpoint, params=params, headers=headers, json=body, timeout=TRANSLATOR_TIMEOUT)
+        return max(float(response.headers.get('Retry-After', '')), 1.0)
+    except ValueError:
+        return 2.0 ** (attempt + 1)
+
+
+@timed("translator_post")
+def _post(body):
+    """POST a translate request through the throttles, retrying 429s as Retry-After asks.
+
+    Every attempt counts against both the character window and the request rate.
+    """
+    chars = sum(len(element['text']) for element in body)
+    for attempt in range(TRANSLATOR_MAX_RETRIES + 1):
+        waited = _throttle.acquire(chars)
+        if waited > 1:
+            logging.info(f"Translator throttle held a {chars}-character request for {waited:.1f}s")
+        _request_limiter.wait()
+        with get_metrics().timer("translator_request"):
+            response = requests.post(TRANSLATOR_ENDPOINT, params=_request_params(), headers=_request_headers(),
+                                     json=body, timeout=TRANSLATOR_TIMEOUT)
+        get_metrics().inc("translator_chars", chars)
+        if response.status_code == 429:
+            get_metrics().inc("translator_throttled")
+            retry_after = _retry_after_seconds(response, attempt)
+            logging.warning(f"Translator quota hit (429), retrying in {retry_after:.0f}s "
+                            f"(attempt {attempt + 1}/{TRANSLATOR_MAX_RETRIES + 1})")
+            _throttle.pause(retry_after)
+            continue
         response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-        translation_result = response.json()
+        return response.json()
+    raise TranslationThrottled(f"Translator still throttled after {TRANSLATOR_MAX_RETRIES} retries")
+
+
+def _translate_single(text):
+    """Send one text to the API. Returns the translation, or None on failure."""
+    body = [{'text': text}]
+
+    try:
+        translation_result = _post(body)
 
         if translation_result and isinstance(translation_result, list) and 'translations' in translation_result[0]:
             translated_text = translation_result[0]['translations'][0]['text']
@@ -37,12 +153,179 @@ def translate_text(text):
             return translated_text
         else:
             logging.error(f"Unexpected translation API response format for text: {text[:50]}...")
-            return text # Return original on unexpected format
+            return None
 
+    except TranslationThrottled as e:
+        logging.error(f"Translation deferred: {e}")
+        return None
     except requests.exceptions.RequestException as e:
         logging.error(f"Translation network error: {e}")
-        return text  # Return original text if translation fails
+        return None
     except (KeyError, IndexError, Exception) as e:
         logging.error(f"Translation processing error: {e}")
-        return text # Return original text on other errors
-    
+        return None
+
+
+def _pack_batches(texts):
+    """Split texts into index batches that respect the API's element and character limits."""
+    batches = []
+    current, current_chars = [], 0
+    for index, text in enumerate(texts):
+        text_chars = len(text)
+        if current and (len(current) >= TRANSLATOR_MAX_BATCH_ELEMENTS
+                        or current_chars + text_chars > TRANSLATOR_MAX_BATCH_CHARS):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(index)
+        current_chars += text_chars
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _post_batch(texts):
+    """Send one array request. Returns a list aligned with texts, None where an element failed."""
+    body = [{'text': text} for text in texts]
+    translation_result = _post(body)
+    if not isinstance(translation_result, list):
+        raise ValueError("Unexpected translation API response format for batch")
+
+    results = [None] * len(texts)
+    for index, entry in enumerate(translation_result[:len(texts)]):
+        try:
+            results[index] = entry['translations'][0]['text']
+        except (KeyError, IndexError, TypeError):
+            logging.warning(f"Missing translation for batch element {index}: {texts[index][:50]}...")
+    return results
+
+
+@timed("translate_texts")
+def _translate_texts(texts):
+    """Returns a list aligned with texts, None where no translation could be obtained.
+
+    Cached translations are used first, then translation-memory templates. Elements missing
+    from a batch response, or whose response could not be processed, are retried one by one.
+    When the batch request itself failed (network error or throttling) its elements are left
+    for a later run instead, rather than sending each of them to a failing endpoint.
+    """
+    if not texts:
+        return []
+
+    cache = get_translation_cache()
+    memory = get_translation_memory()
+    translations = [None] * len(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        if not text or text.isspace():
+            translations[i] = text
+            continue
+        cached = cache.get(text)
+        if cached is not None:
+            translations[i] = cached
+            continue
+        templated = memory.match(text) if memory else None
+        if templated is not None:
+            translations[i] = templated
+        else:
+            pending.append(i)
+    cache.flush()
+
+    if not pending:
+        return translations
+    if not MS_TRANSLATOR_KEY:
+        logging.warning("No Microsoft Translator key configured - leaving titles pending translation.")
+        return translations
+
+    batches = _pack_batches([texts[i] for i in pending])
+    logging.info(f"Translating {len(pending)} texts in {len(batches)} batch request(s)")
+
+    for batch in batches:
+        indices = [pending[i] for i in batch]
+        batch_texts = [texts[i] for i in indices]
+        retry_singly = True
+        try:
+            results = _post_batch(batch_texts)
+        except TranslationThrottled as e:
+            logging.error(f"Batch translation deferred: {e}")
+            results = [None] * len(batch_texts)
+            retry_singly = False
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Batch translation network error, leaving {len(batch_texts)} texts pending: {e}")
+            results = [None] * len(batch_texts)
+            retry_singly = False
+        except (ValueError, KeyError, IndexError) as e:
+            logging.error(f"Batch translation processing error, falling back per element: {e}")
+            results = [None] * len(batch_texts)
+
+        fresh = []
+        for index, result in zip(indices, results):
+            if result is None and retry_singly:
+                result = _translate_single(texts[index])
+            if result is not None:
+                translations[index] = result
+                fresh.append((texts[index], result))
+        cache.put_many(fresh)
+
+    return translations
+
+
+@timed("translate_items")
+def translate_items(items):
+    """Fills in english_title for every item that still needs a translation.
+
+    Undecided items are first run through the language detector; titles that are already
+    English are copied over without an API call. Items carry HTML-escaped titles, so the
+    raw text is sent and the result escaped again. Identical titles are translated once.
+    Items that cannot be translated now keep their Chinese title and are flagged
+    pending_translation for fill_pending_translations.
+    """
+    undecided = [item for item in items if item.get('english_title') is None]
+    if undecided:
+        decisions = needs_translation([html.unescape(item['chinese_title']) for item in undecided],
+                                      [item.get('source') for item in undecided])
+        for item, translate in zip(undecided, decisions):
+            if not translate:
+                item['english_title'] = item['chinese_title']
+
+    untranslated = [item for item in items
+                    if item.get('english_title') is None or item.get('pending_translation')]
+    if not untranslated:
+        return items
+
+    unique_texts = list(dict.fromkeys(html.unescape(item['chinese_title']) for item in untranslated))
+    translated = dict(zip(unique_texts, _translate_texts(unique_texts)))
+
+    pending = 0
+    for item in untranslated:
+        english_title = translated.get(html.unescape(item['chinese_title']))
+        if english_title:
+            item['english_title'] = html.escape(english_title)
+            item.pop('pending_translation', None)
+        else:
+            item['english_title'] = item['chinese_title']
+            item['pending_translation'] = True
+            pending += 1
+    if pending:
+        logging.warning(f"{pending} of {len(untranslated)} titles left pending translation")
+    return items
+
+
+def fill_pending_translations(data):
+    """Retry translation for stored headlines flagged pending_translation by earlier runs.
+
+    Dates with a filled-in title are marked dirty so their pages are re-rendered.
+    """
+    pending = [(date, item) for date, items in data.get("headlines", {}).items()
+               for item in items if item.get('pending_translation')]
+    if not pending:
+        return 0
+    pending_items = [item for _, item in pending]
+    logging.info(f"Retrying translation for {len(pending_items)} pending headlines")
+    translate_items(pending_items)
+    filled = 0
+    for date, item in pending:
+        if not item.get('pending_translation'):
+            mark_dirty(data, date)
+            filled += 1
+    logging.info(f"Filled in {filled} of {len(pending_items)} pending translations")
+    return filled